@@ -1,28 +1,21 @@
+import os
+import time
+
 import numpy as np
-import matplotlib.pyplot as plt
 from scipy.integrate import solve_ivp
-from scipy.integrate import cumulative_trapezoid
+
+from atmosphere import standard_atmosphere
 
 # Constants
 g = 9.81  # Gravitational constant (m/s^2)
 lift_coefficient = 0.5  # Lift coefficient *can't seem to find a good source to base this on for lifting body craft
 # so this is bordering on being made up, simply a guess based on range of realworld values that exist.*
-
-# Air density data table pulled from Nasa's website
-data_table = {
-    "Altitude (m)": [-1000, 0, 1000, 2000, 3000, 4000, 5000, 6000, 7000, 8000, 9000, 10000, 15000, 20000, 25000, 30000,
-                     40000, 50000, 60000, 70000, 80000, 90000],
-    "Density (kg/m^3)": [1.347, 1.225, 1.112, 1.007, 0.9093, 0.8194, 0.7364, 0.6601, 0.5900, 0.5258, 0.4671, 0.4135,
-                         0.1948, 0.08891, 0.04008, 0.01841, 0.003996, 0.001027, 0.0003097, 0.00008283, 0.00001846, 0.0]
-}
+drag_coefficient = 0.025  # x-24B experimental lifting body was the basis for this value
 
 
 def air_density_func(y):
-    # Retrieve altitude and density data from the data table
-    altitudes = data_table["Altitude (m)"]
-    densities = data_table["Density (kg/m^3)"]
-    # Interpolate air density based on altitude
-    return np.interp(y, altitudes, densities)
+    # Look up air density in the shared, precomputed atmosphere table
+    return standard_atmosphere(y)
 
 
 # Function to calculate thrust based on air density, velocity, and intake area
@@ -43,26 +36,28 @@ def thrust_function(air_density, velocity, intake_area):
     return T, mass_flow_rate_of_fuel
 
 
-# Function to calculate acceleration
-def acceleration_function(t, state, angle_of_attack, mass, lifting_area, intake_area):
-    v, vertical_positions_values = state  # Unpack state
+# Function to calculate the front cross sectional area, which will be roughly semi-circular with radius equal to
+# 1/4.5 * lifting area
+def cross_sectional_area(lifting_area):
+    return 0.5 * np.pi * (lifting_area / 4.5) ** 2
+
+
+# Function to calculate the forces on the craft. Every operation is element-wise, so state may hold single values or
+# whole arrays of samples and a full trajectory is evaluated in one pass
+def flight_forces(state, angle_of_attack, lifting_area, intake_area):
+    v, vertical_positions_values = state  # Unpack state, speed through the intake and altitude
     theta_rad = np.radians(angle_of_attack)  # Convert angle to radians
     # Calculate air density at current altitude
     air_density = air_density_func(vertical_positions_values)
     # Calculate thrust
     T, mass_flow_rate_of_fuel = thrust_function(air_density, v, intake_area)
-    # Constants
-    drag_coefficient = 0.025  # x-24B experimental lifting body was the basis for this value
-    cross_sectional_area = 0.5 * np.pi * (
-            lifting_area / 4.5) ** 2  # front cross sectional area will be roughly semi-circular with radius
-    # equal to 1/4.5 * lifting area
-    # Adjust the mass
-    mass -= mass_flow_rate_of_fuel
-    # Calculate drag force magnitude
+    # Calculate dynamic pressure, shared by the drag and lift
     v_magnitude = v
-    drag_magnitude = 0.5 * drag_coefficient * air_density * cross_sectional_area * v_magnitude ** 2
+    dynamic_pressure = 0.5 * air_density * v_magnitude ** 2
+    # Calculate drag force magnitude
+    drag_magnitude = drag_coefficient * dynamic_pressure * cross_sectional_area(lifting_area)
     # Calculate lift force magnitude
-    lift_magnitude = 0.5 * lift_coefficient * air_density * lifting_area * v_magnitude ** 2
+    lift_magnitude = lift_coefficient * dynamic_pressure * lifting_area
     # Calculate drag force components *need to revise this in the future since the angle used for the drag should
     # change with velocity components but right now just stays whatever the angle of attack was*
     drag_horizontal = -drag_magnitude * np.cos(theta_rad)
@@ -73,11 +68,107 @@ def acceleration_function(t, state, angle_of_attack, mass, lifting_area, intake_
     # Calculate thrust components
     T_vertical = T * np.sin(theta_rad)
     T_horizontal = T * np.cos(theta_rad)
+    return {"air_density": air_density, "dynamic_pressure": dynamic_pressure, "thrust": T,
+            "mass_flow_rate_of_fuel": mass_flow_rate_of_fuel, "lift": lift_magnitude, "drag": drag_magnitude,
+            "force_horizontal": drag_horizontal + lift_horizontal + T_horizontal,
+            "force_vertical": drag_vertical + lift_vertical + T_vertical}
+
+
+# Function to calculate acceleration, on single values or arrays of samples
+def acceleration_function(t, state, angle_of_attack, mass, lifting_area, intake_area):
+    forces = flight_forces(state, angle_of_attack, lifting_area, intake_area)
     # Calculate acceleration components
-    a_vertical = -g + (drag_vertical + lift_vertical + T_vertical) / mass
-    a_horizontal = (drag_horizontal + lift_horizontal + T_horizontal) / mass
-    return [a_horizontal,
-            a_vertical]  # Return [horizontal acceleration, vertical acceleration, horizontal thrust, vertical thrust]
+    a_vertical = -g + forces["force_vertical"] / mass
+    a_horizontal = forces["force_horizontal"] / mass
+    return [a_horizontal, a_vertical]  # Return [horizontal acceleration, vertical acceleration]
+
+
+# Function to calculate the time derivative of the full state [v_horizontal, v_vertical, x, y, mass]. The craft's
+# mass is integrated here from the fuel flow instead of being adjusted inside acceleration_function, and the altitude
+# handed to the density lookup is the integrated position. state may also be a (5, k) array of k states, as
+# solve_ivp passes with vectorized=True.
+def state_derivative(t, state, angle_of_attack, lifting_area, intake_area):
+    v_horizontal, v_vertical, x, y, mass = state
+    forces = flight_forces([v_horizontal, y], angle_of_attack, lifting_area, intake_area)
+    return np.array([forces["force_horizontal"] / mass, -g + forces["force_vertical"] / mass, v_horizontal,
+                     v_vertical, -forces["mass_flow_rate_of_fuel"]])
+
+
+# Function to calculate the Jacobian of state_derivative with respect to the state [v_horizontal, v_vertical, x, y,
+# mass] for a single state, used by the implicit solve_ivp methods. Every force is the air density times a
+# polynomial in the intake speed v_horizontal (quadratic for lift and drag, linear for thrust and fuel flow), so the
+# derivatives are closed form, with the density gradient taken from the atmosphere table.
+def state_jacobian(t, state, angle_of_attack, lifting_area, intake_area):
+    v_horizontal, v_vertical, x, y, mass = state
+    theta_rad = np.radians(angle_of_attack)
+    air_density = air_density_func(y)
+    density_gradient = standard_atmosphere.gradient(y)
+    # Thrust and fuel flow are linear in both density and speed, so these are their values per unit of each
+    thrust_per_unit, fuel_per_unit = thrust_function(1.0, 1.0, intake_area)
+    # Drag plus lift along each axis per unit of dynamic pressure
+    aerodynamic_horizontal = (-drag_coefficient * cross_sectional_area(lifting_area) * np.cos(theta_rad) -
+                              lift_coefficient * lifting_area * np.sin(theta_rad))
+    aerodynamic_vertical = (-drag_coefficient * cross_sectional_area(lifting_area) * np.sin(theta_rad) +
+                            lift_coefficient * lifting_area * np.cos(theta_rad))
+    # Net forces per unit density and their derivatives with respect to the intake speed
+    force_horizontal = 0.5 * v_horizontal ** 2 * aerodynamic_horizontal + thrust_per_unit * v_horizontal * np.cos(
+        theta_rad)
+    force_vertical = 0.5 * v_horizontal ** 2 * aerodynamic_vertical + thrust_per_unit * v_horizontal * np.sin(
+        theta_rad)
+    force_horizontal_speed = v_horizontal * aerodynamic_horizontal + thrust_per_unit * np.cos(theta_rad)
+    force_vertical_speed = v_horizontal * aerodynamic_vertical + thrust_per_unit * np.sin(theta_rad)
+
+    jacobian = np.zeros((5, 5))
+    jacobian[0] = [air_density * force_horizontal_speed / mass, 0.0, 0.0, density_gradient * force_horizontal / mass,
+                   -air_density * force_horizontal / mass ** 2]
+    jacobian[1] = [air_density * force_vertical_speed / mass, 0.0, 0.0, density_gradient * force_vertical / mass,
+                   -air_density * force_vertical / mass ** 2]
+    jacobian[2, 0] = 1.0
+    jacobian[3, 1] = 1.0
+    jacobian[4] = [-fuel_per_unit * air_density, 0.0, 0.0, -fuel_per_unit * density_gradient * v_horizontal, 0.0]
+    return jacobian
+
+
+# Function to calculate the quantities derived from a solved trajectory in a single vectorized pass over the
+# (5, n) array of states, instead of one Python call per sample
+def derived_quantities(states, angle_of_attack, lifting_area, intake_area):
+    v_horizontal, v_vertical, x, y, mass = states
+    forces = flight_forces([v_horizontal, y], angle_of_attack, lifting_area, intake_area)
+    acceleration_values = np.column_stack([forces["force_horizontal"] / mass, -g + forces["force_vertical"] / mass])
+    return {"acceleration_values": acceleration_values, "thrust_magnitudes": forces["thrust"],
+            "mass_flow_rate_of_fuel": forces["mass_flow_rate_of_fuel"], "lift": forces["lift"],
+            "drag": forces["drag"], "dynamic_pressure": forces["dynamic_pressure"]}
+
+
+# Names of the events solve_flight watches for, in the order they are handed to solve_ivp
+event_names = ("ground_impact", "apogee", "fuel_exhausted", "left_atmosphere")
+# solve_ivp methods solve_flight can use, the implicit ones take the Jacobian
+solver_methods = ("RK45", "RK23", "DOP853", "Radau", "BDF", "LSODA")
+implicit_methods = ("Radau", "BDF", "LSODA")
+
+
+# Function to build the event functions for solve_ivp. Each is zero at its event: the craft coming back down through
+# sea level, the vertical velocity turning negative, the fuel running out, or the craft climbing past the top of the
+# density table where the air breathing engine has nothing left to breathe.
+def flight_events(dry_mass, terminal_events):
+    def ground_impact(t, state):
+        return state[3]
+
+    def apogee(t, state):
+        return state[1]
+
+    def fuel_exhausted(t, state):
+        return state[4] - dry_mass
+
+    def left_atmosphere(t, state):
+        return state[3] - standard_atmosphere.maximum_altitude
+
+    events = [ground_impact, apogee, fuel_exhausted, left_atmosphere]
+    directions = [-1, -1, -1, 1]
+    for event, direction in zip(events, directions):
+        event.terminal = event.__name__ in terminal_events
+        event.direction = direction
+    return events
 
 
 # Main function
@@ -96,113 +187,14 @@ def main():
             intake_area = float(input(
                 "Enter the intake area (m^2) *realistically should be somewhere between .1-1.5 based on scaling nasas "
                 "xf43 experimental ramjet craft to size of the space shuttle but is purely an estimate* : "))
+            fuel_mass = float(input("Enter the mass of fuel on board (kg): "))
         except ValueError:
             print("Invalid input. Please enter numeric values.")
             continue
 
-        # Calculate initial velocity components
-        v_horizontal = velocity_mag * np.cos(np.radians(angle_of_attack))
-        v_vertical = velocity_mag * np.sin(np.radians(angle_of_attack))
-
-        # Define initial vertical position
-        y_initial = 0.0  # Assume starting from sea level
-
-        # Define initial state
-        state_initial = [v_horizontal, v_vertical]
-
-        # Time span for integration (0 to 100 seconds)
-        t_span = [0, 100]
-
-        # Solve the ODE
-        sol = solve_ivp(
-            lambda t, state: acceleration_function(t, state, angle_of_attack, mass, lifting_area, intake_area),
-            t_span,
-            state_initial,
-            method='RK45',
-            t_eval=np.linspace(t_span[0], t_span[1], 100000))
-
-        # Extract velocity
-        v_values = sol.y[:2]
-
-        # Calculate acceleration values
-        acceleration_values = np.array(
-            [acceleration_function(t, sol.y[:, i], angle_of_attack, mass, lifting_area, intake_area) for i, t in
-             enumerate(sol.t)])
-
-        # Calculate thrust magnitude
-        thrust_magnitudes = np.array(
-            [thrust_function(air_density_func(y), v, intake_area) for v, y in zip(v_values[1], sol.y[1])])
-        # Calculate positions by integrating velocities
-        horizontal_position = cumulative_trapezoid(v_values[0], sol.t)
-        vertical_position_values = cumulative_trapezoid(v_values[1], sol.t)
-        time_adjusted = sol.t[:-1]
-
-        # Plot the velocity, position, and acceleration graphs
-        plt.figure(figsize=(12, 12))
-
-        # Velocity plots
-        plt.subplot(3, 2, 1)
-        plt.plot(sol.t, v_values[0], label='Horizontal Velocity')
-        plt.xlabel('Time (s)')
-        plt.ylabel('Horizontal Velocity (m/s)')
-        plt.title('Horizontal Velocity vs Time')
-        plt.grid(True)
-        plt.legend()
-
-        plt.subplot(3, 2, 2)
-        plt.plot(sol.t, v_values[1], label='Vertical Velocity')
-        plt.xlabel('Time (s)')
-        plt.ylabel('Vertical Velocity (m/s)')
-        plt.title('Vertical Velocity vs Time')
-        plt.grid(True)
-        plt.legend()
-
-        # Acceleration plots
-        plt.subplot(3, 2, 3)
-        plt.plot(sol.t, acceleration_values[:, 0], label='Horizontal Acceleration', color='blue')
-        plt.xlabel('Time (s)')
-        plt.ylabel('Horizontal Acceleration (m/s^2)')
-        plt.title('Horizontal Acceleration vs Time')
-        plt.grid(True)
-        plt.legend()
-
-        plt.subplot(3, 2, 4)
-        plt.plot(sol.t, acceleration_values[:, 1], label='Vertical Acceleration', color='green')
-        plt.xlabel('Time (s)')
-        plt.ylabel('Vertical Acceleration (m/s^2)')
-        plt.title('Vertical Acceleration vs Time')
-        plt.grid(True)
-        plt.legend()
-
-        # Position plots
-        plt.subplot(3, 2, 5)
-        plt.plot(time_adjusted, horizontal_position, label='Horizontal Position', color='red')
-        plt.xlabel('Time (s)')
-        plt.ylabel('Horizontal Position (m)')
-        plt.title('Horizontal Position vs Time')
-        plt.grid(True)
-        plt.legend()
-
-        # Plot the vertical position graph
-        plt.subplot(3, 2, 6)
-        plt.plot(time_adjusted, vertical_position_values, label='Vertical Position', color='orange')
-        plt.xlabel('Time (s)')
-        plt.ylabel('Vertical Position (m)')
-        plt.title('Vertical Position vs Time')
-        plt.grid(True)
-        plt.legend()
-
-        # Thrust plot
-        plt.figure(figsize=(6, 6))
-        plt.plot(sol.t, thrust_magnitudes, label='Thrust Magnitude', color='purple')
-        plt.xlabel('Time (s)')
-        plt.ylabel('Thrust Magnitude (N)')
-        plt.title('Thrust Magnitude vs Time')
-        plt.grid(True)
-        plt.legend()
-
-        plt.tight_layout()
-        plt.show()
+        # Solve and plot
+        results = solve_flight(mass, velocity_mag, angle_of_attack, lifting_area, intake_area, fuel_mass)
+        plot_flight(results)
 
         # Ask the user if they want to continue or exit
         choice = input("Do you want to input another set of parameters? (yes/no): ").lower()
@@ -210,6 +202,209 @@ def main():
             break
 
 
+# Function to solve one flight without any user interaction or plotting. Integration stops at the first of the
+# terminal_events to happen (any of event_names), and the times of every event are reported in results["events"].
+# fuel_mass is the mass of fuel on board, so the fuel_exhausted event fires once the craft is down to mass - fuel_mass.
+# There is no default: none of the models knows the craft's dry mass, and with the whole craft counted as fuel the
+# event could never fire.
+# The solver keeps its dense output interpolant in results["solution"], and the returned arrays are sampled at the
+# solver's own steps (only a dozen or so for a typical flight) unless number_of_points or sample_spacing (s) asks for
+# an evenly spaced grid; sample_flight() resamples later at whatever resolution a plot, export or metric needs.
+# method picks any of solver_methods; the implicit ones (Radau, BDF, LSODA) get the analytic state_jacobian unless
+# analytic_jacobian is False, in which case solve_ivp estimates it by vectorized finite differences. The solver's work
+# is reported in results["solver_stats"].
+def solve_flight(mass, velocity_mag, angle_of_attack, lifting_area, intake_area, fuel_mass,
+                 terminal_events=("ground_impact", "fuel_exhausted", "left_atmosphere"), number_of_points=None,
+                 method="RK45", rtol=1e-3, atol=1e-6, analytic_jacobian=True, sample_spacing=None):
+    unknown_events = set(terminal_events) - set(event_names)
+    if unknown_events:
+        raise ValueError(f"Unknown terminal events {sorted(unknown_events)}, expected some of {event_names}")
+    if method not in solver_methods:
+        raise ValueError(f"Unknown method '{method}', expected one of {solver_methods}")
+    if not 0 < fuel_mass <= mass:
+        raise ValueError(f"fuel_mass must be positive and at most the mass of the craft, got {fuel_mass}")
+    dry_mass = mass - fuel_mass
+
+    # Calculate initial velocity components
+    v_horizontal = velocity_mag * np.cos(np.radians(angle_of_attack))
+    v_vertical = velocity_mag * np.sin(np.radians(angle_of_attack))
+
+    # Define initial positions
+    x_initial = 0.0
+    y_initial = 0.0  # Assume starting from sea level
+
+    # Define initial state
+    state_initial = [v_horizontal, v_vertical, x_initial, y_initial, mass]
+
+    # Time span for integration (0 to 100 seconds)
+    t_span = [0, 100]
+
+    # Only the implicit methods use a Jacobian, the others would warn about it
+    jacobian = None
+    if method in implicit_methods and analytic_jacobian:
+        def jacobian(t, state):
+            return state_jacobian(t, state, angle_of_attack, lifting_area, intake_area)
+
+    # Solve the ODE
+    sol = solve_ivp(
+        lambda t, state: state_derivative(t, state, angle_of_attack, lifting_area, intake_area),
+        t_span,
+        state_initial,
+        method=method,
+        dense_output=True,
+        events=flight_events(dry_mass, terminal_events),
+        vectorized=True,
+        rtol=rtol,
+        atol=atol,
+        **({} if jacobian is None else {"jac": jacobian}))
+
+    # Report when each event happened and which one, if any, stopped the integration
+    events = {name: times for name, times in zip(event_names, sol.t_events)}
+    termination_event = None
+    if sol.status == 1:
+        termination_event = next(name for name in event_names if name in terminal_events and len(events[name]))
+
+    results = {"solution": sol.sol, "flight_parameters": (angle_of_attack, lifting_area, intake_area),
+               "events": events, "termination_event": termination_event,
+               "solver_stats": {"method": method, "nfev": int(sol.nfev), "njev": int(sol.njev), "nlu": int(sol.nlu),
+                                "steps": len(sol.t) - 1}}
+    if number_of_points is None and sample_spacing is None:
+        results.update(flight_samples(sol.t, sol.y, angle_of_attack, lifting_area, intake_area))
+        return results
+    return sample_flight(results, number_of_points=number_of_points, spacing=sample_spacing)
+
+
+# Function to solve the same flight with several solve_ivp methods and report the work each one did (solver_stats plus
+# wall clock seconds), to pick the fastest method for a flight regime
+def compare_solver_methods(mass, velocity_mag, angle_of_attack, lifting_area, intake_area, fuel_mass,
+                           methods=solver_methods, **options):
+    comparison = []
+    for method in methods:
+        start = time.perf_counter()
+        results = solve_flight(mass, velocity_mag, angle_of_attack, lifting_area, intake_area, fuel_mass,
+                               method=method, **options)
+        comparison.append({**results["solver_stats"], "seconds": time.perf_counter() - start,
+                           "final_altitude": float(results["vertical_position_values"][-1])})
+    return comparison
+
+
+# Function to resample a solved flight from its dense output. Pass number_of_points for an evenly spaced grid over the
+# whole flight, a spacing (s) for samples every spacing seconds ending with the end of the flight, or an explicit
+# array of time_values inside it. Returns a copy of results with the sampled arrays replaced, so only the samples
+# asked for are ever computed.
+def sample_flight(results, number_of_points=None, time_values=None, spacing=None):
+    solution = results["solution"]
+    if time_values is None:
+        if number_of_points is not None:
+            time_values = np.linspace(solution.t_min, solution.t_max, number_of_points)
+        elif spacing is not None:
+            time_values = np.arange(solution.t_min, solution.t_max, spacing)
+            time_values = np.append(time_values[time_values < solution.t_max - 1e-9 * spacing], solution.t_max)
+        else:
+            raise ValueError("Pass one of number_of_points, spacing or time_values")
+    time_values = np.asarray(time_values, dtype=float)
+    if np.any(time_values < solution.t_min) or np.any(time_values > solution.t_max):
+        raise ValueError(f"time_values must lie within the solved interval [{solution.t_min}, {solution.t_max}]")
+    states = solution(time_values)
+    return {**results, **flight_samples(time_values, states, *results["flight_parameters"])}
+
+
+# Function to unpack sampled states into the named result arrays along with their derived quantities
+def flight_samples(time_values, states, angle_of_attack, lifting_area, intake_area):
+    return {"time_values": time_values, "velocity_values": states[:2], "horizontal_position": states[2],
+            "vertical_position_values": states[3], "mass_values": states[4],
+            **derived_quantities(states, angle_of_attack, lifting_area, intake_area)}
+
+
+# Function to plot the velocity, position, acceleration and thrust graphs of a solved flight, resampled from the
+# dense output to number_of_points per curve, which is plenty for a figure. With a file_name the figures are saved
+# there with the non-interactive Agg backend instead of being shown.
+def plot_flight(results, number_of_points=2000, file_name=None):
+    import matplotlib
+    if file_name is not None:
+        matplotlib.use("Agg")  # render to files without a window
+    import matplotlib.pyplot as plt
+
+    results = sample_flight(results, number_of_points=number_of_points)
+    time_values = results["time_values"]
+    v_values = results["velocity_values"]
+    acceleration_values = results["acceleration_values"]
+
+    figure = plt.figure(figsize=(12, 12))
+
+    # Velocity plots
+    plt.subplot(3, 2, 1)
+    plt.plot(time_values, v_values[0], label='Horizontal Velocity')
+    plt.xlabel('Time (s)')
+    plt.ylabel('Horizontal Velocity (m/s)')
+    plt.title('Horizontal Velocity vs Time')
+    plt.grid(True)
+    plt.legend()
+
+    plt.subplot(3, 2, 2)
+    plt.plot(time_values, v_values[1], label='Vertical Velocity')
+    plt.xlabel('Time (s)')
+    plt.ylabel('Vertical Velocity (m/s)')
+    plt.title('Vertical Velocity vs Time')
+    plt.grid(True)
+    plt.legend()
+
+    # Acceleration plots
+    plt.subplot(3, 2, 3)
+    plt.plot(time_values, acceleration_values[:, 0], label='Horizontal Acceleration', color='blue')
+    plt.xlabel('Time (s)')
+    plt.ylabel('Horizontal Acceleration (m/s^2)')
+    plt.title('Horizontal Acceleration vs Time')
+    plt.grid(True)
+    plt.legend()
+
+    plt.subplot(3, 2, 4)
+    plt.plot(time_values, acceleration_values[:, 1], label='Vertical Acceleration', color='green')
+    plt.xlabel('Time (s)')
+    plt.ylabel('Vertical Acceleration (m/s^2)')
+    plt.title('Vertical Acceleration vs Time')
+    plt.grid(True)
+    plt.legend()
+
+    # Position plots
+    plt.subplot(3, 2, 5)
+    plt.plot(time_values, results["horizontal_position"], label='Horizontal Position', color='red')
+    plt.xlabel('Time (s)')
+    plt.ylabel('Horizontal Position (m)')
+    plt.title('Horizontal Position vs Time')
+    plt.grid(True)
+    plt.legend()
+
+    # Plot the vertical position graph
+    plt.subplot(3, 2, 6)
+    plt.plot(time_values, results["vertical_position_values"], label='Vertical Position', color='orange')
+    plt.xlabel('Time (s)')
+    plt.ylabel('Vertical Position (m)')
+    plt.title('Vertical Position vs Time')
+    plt.grid(True)
+    plt.legend()
+
+    # Thrust plot
+    thrust_figure = plt.figure(figsize=(6, 6))
+    plt.plot(time_values, results["thrust_magnitudes"], label='Thrust Magnitude', color='purple')
+    plt.xlabel('Time (s)')
+    plt.ylabel('Thrust Magnitude (N)')
+    plt.title('Thrust Magnitude vs Time')
+    plt.grid(True)
+    plt.legend()
+
+    plt.tight_layout()
+    if file_name is None:
+        plt.show()
+    else:
+        # The thrust figure goes next to the main one, e.g. run.png and run_thrust.png
+        stem, extension = os.path.splitext(file_name)
+        figure.savefig(file_name)
+        thrust_figure.savefig(f"{stem}_thrust{extension}")
+        plt.close(figure)
+        plt.close(thrust_figure)
+
+
 # Execute the main function
 if __name__ == "__main__":
     main()
@@ -0,0 +1,148 @@
+# Shared air density lookup for the ramjet models. The NASA density table used to be copied into every Project
+# file and handed to np.interp as Python lists on every call, so each call inside the time loop converted the lists
+# to arrays and binary searched them. An Atmosphere is built once: the table is resampled onto a uniform altitude
+# grid held in contiguous float64 arrays, so a lookup is just an index computation and one linear interpolation.
+#
+# The table breakpoints all sit on multiples of 1000 m, so the default 1000 m grid reproduces np.interp on the
+# original table exactly. Like np.interp, altitudes outside the table are clamped to the end values.
+
+import math
+
+import numpy as np
+
+# Air density data table pulled from Nasa's website
+data_table = {
+    "Altitude (m)": [-1000, 0, 1000, 2000, 3000, 4000, 5000, 6000, 7000, 8000, 9000, 10000, 15000, 20000, 25000, 30000,
+                     40000, 50000, 60000, 70000, 80000, 90000],
+    "Density (kg/m^3)": [1.347, 1.225, 1.112, 1.007, 0.9093, 0.8194, 0.7364, 0.6601, 0.5900, 0.5258, 0.4671, 0.4135,
+                         0.1948, 0.08891, 0.04008, 0.01841, 0.003996, 0.001027, 0.0003097, 0.00008283, 0.00001846, 0.0]
+}
+
+
+class Atmosphere:
+    """
+    Air density on a uniform altitude grid with direct-index lookup
+    :param altitudes:           sequence :: table altitudes (m), increasing
+    :param densities:           sequence :: table densities (kg/m^3)
+    :param grid_spacing:        float, optional :: spacing of the uniform lookup grid (m)
+    :param log_interpolation:   bool, optional :: interpolate log(density) between the table breakpoints and between
+                                grid points, which follows the roughly exponential fall-off of the atmosphere better
+                                than straight lines. Table cells ending in a zero density stay linear.
+    """
+
+    def __init__(self, altitudes=data_table["Altitude (m)"], densities=data_table["Density (kg/m^3)"],
+                 grid_spacing=1000.0, log_interpolation=False):
+        altitudes = np.asarray(altitudes, dtype=float)
+        densities = np.asarray(densities, dtype=float)
+        if np.any(np.diff(altitudes) <= 0):
+            raise ValueError("Table altitudes must be strictly increasing")
+        if grid_spacing <= 0:
+            raise ValueError("grid_spacing must be positive")
+
+        self.minimum_altitude = float(altitudes[0])
+        self.maximum_altitude = float(altitudes[-1])
+        self.grid_spacing = float(grid_spacing)
+        self.inverse_spacing = 1.0 / self.grid_spacing
+        self.log_interpolation = log_interpolation
+
+        number_of_points = int(math.ceil((self.maximum_altitude - self.minimum_altitude) * self.inverse_spacing)) + 1
+        self.altitudes = self.minimum_altitude + self.grid_spacing * np.arange(number_of_points)
+        self.altitudes[-1] = min(self.altitudes[-1], self.maximum_altitude)
+        self.densities = np.interp(self.altitudes, altitudes, densities)
+        if log_interpolation:
+            # Grid points inside table cells with two nonzero densities take log-linear values of the table itself,
+            # exp(interp(log(density))), so a coarse grid does not fall back to the straight lines between breakpoints
+            positive = densities > 0
+            table_cells = np.clip(np.searchsorted(altitudes, self.altitudes, side="right") - 1, 0, len(altitudes) - 2)
+            log_grid = positive[table_cells] & positive[table_cells + 1]
+            log_densities = np.log(np.where(positive, densities, 1.0))
+            self.densities[log_grid] = np.exp(np.interp(self.altitudes[log_grid], altitudes, log_densities))
+        self.densities = np.ascontiguousarray(self.densities)
+        self.last_index = number_of_points - 1
+
+        # Per-cell offsets and slopes so a lookup is value = offset + slope * fraction, in either density or
+        # log-density space. Cells touching a zero density fall back to linear interpolation.
+        lower = self.densities[:-1]
+        upper = self.densities[1:]
+        self.offsets = lower.copy()
+        self.slopes = upper - lower
+        self.log_cells = np.zeros(len(lower), dtype=bool)
+        if log_interpolation:
+            self.log_cells = (lower > 0) & (upper > 0)
+            self.offsets[self.log_cells] = np.log(lower[self.log_cells])
+            self.slopes[self.log_cells] = np.log(upper[self.log_cells]) - self.offsets[self.log_cells]
+        self.any_log_cells = bool(np.any(self.log_cells))
+
+        # Python float copies for the scalar path, indexing a list is cheaper than creating NumPy scalars
+        self.scalar_offsets = self.offsets.tolist()
+        self.scalar_slopes = self.slopes.tolist()
+        self.scalar_log_cells = self.log_cells.tolist()
+        self.bottom_density = float(self.densities[0])
+        self.top_density = float(self.densities[-1])
+
+    def __call__(self, y):
+        if np.ndim(y) == 0:
+            return self.density_scalar(float(y))
+        return self.density_array(np.asarray(y, dtype=float))
+
+    def density_scalar(self, y):
+        """
+        Returns the air density at a single altitude
+        :param y:   float :: altitude (m)
+        :return:    float :: air density (kg/m^3)
+        """
+        position = (y - self.minimum_altitude) * self.inverse_spacing
+        if position != position:  # NaN altitude, as np.interp would give
+            return math.nan
+        if position <= 0.0:
+            return self.bottom_density
+        index = int(position)
+        if index >= self.last_index:
+            return self.top_density
+        value = self.scalar_offsets[index] + self.scalar_slopes[index] * (position - index)
+        return math.exp(value) if self.scalar_log_cells[index] else value
+
+    def density_array(self, y):
+        """
+        Returns the air density at every altitude in an array
+        :param y:   NumPy array :: altitudes (m)
+        :return:    NumPy array :: air densities (kg/m^3), same shape as y
+        """
+        position = y - self.minimum_altitude
+        position *= self.inverse_spacing
+        np.clip(position, 0.0, self.last_index, out=position)
+        # A NaN altitude casts to an arbitrary index, which the clip makes valid, and its fraction stays NaN so the
+        # density comes out NaN as np.interp would give
+        with np.errstate(invalid="ignore"):
+            index = position.astype(np.intp)
+        np.clip(index, 0, self.last_index - 1, out=index)
+        position -= index
+        value = self.slopes[index]
+        value *= position
+        value += self.offsets[index]
+        if self.any_log_cells:
+            log_cells = self.log_cells[index]
+            value[log_cells] = np.exp(value[log_cells])
+        return value
+
+    def gradient(self, y):
+        """
+        Returns the rate of change of air density with altitude of the interpolated table, zero outside it
+        :param y:   float or NumPy array :: altitude(s) (m)
+        :return:    float or NumPy array :: d(density)/d(altitude) (kg/m^4), same shape as y
+        """
+        position = (np.asarray(y, dtype=float) - self.minimum_altitude) * self.inverse_spacing
+        inside = (position >= 0.0) & (position < self.last_index)
+        index = np.clip(np.nan_to_num(position), 0, self.last_index - 1).astype(np.intp)
+        slope = self.slopes[index] * self.inverse_spacing
+        if self.any_log_cells:
+            # d/dy exp(offset + slope * fraction) is the density times the log-space slope
+            log_cells = self.log_cells[index]
+            value = np.exp(self.offsets[index] + self.slopes[index] * (position - index))
+            slope = np.where(log_cells, value * slope, slope)
+        gradient = np.where(inside, slope, np.where(np.isnan(position), np.nan, 0.0))
+        return float(gradient) if np.ndim(y) == 0 else gradient
+
+
+# Shared instance used by all the ramjet models
+standard_atmosphere = Atmosphere()
@@ -1,18 +1,13 @@
 import numpy as np
 
+from atmosphere import standard_atmosphere
+
 # Constants
 g = 9.81  # Gravitational constant (m/s^2)
 lift_coefficient = 0.5  # Lift coefficient *can't seem to find a good source to base this on for lifting body craft
 # so this is bordering on being made up, simply a guess based on range of realworld values that exist.*
 x0 = 0.0
 y0 = 0.0
-# Air density data table pulled from Nasa's website
-data_table = {
-    "Altitude (m)": [-1000, 0, 1000, 2000, 3000, 4000, 5000, 6000, 7000, 8000, 9000, 10000, 15000, 20000, 25000, 30000,
-                     40000, 50000, 60000, 70000, 80000, 90000],
-    "Density (kg/m^3)": [1.347, 1.225, 1.112, 1.007, 0.9093, 0.8194, 0.7364, 0.6601, 0.5900, 0.5258, 0.4671, 0.4135,
-                         0.1948, 0.08891, 0.04008, 0.01841, 0.003996, 0.001027, 0.0003097, 0.00008283, 0.00001846, 0.0]
-}
 
 
 # Main function
@@ -35,10 +30,15 @@ def main():
             print("Invalid input. Please enter numeric values.")
             continue
 
-        # Calculate initial velocity components
-        v0_horizontal = velocity_mag * np.cos(np.radians(angle_of_attack))
-        v0_vertical = velocity_mag * np.sin(np.radians(angle_of_attack))
-        return v0_horizontal, v0_vertical, mass, lifting_area, intake_area
+        return initial_conditions(mass, velocity_mag, angle_of_attack, lifting_area, intake_area)
+
+
+# Function to turn a parameter set into initial conditions without prompting, for scripted and batch use
+def initial_conditions(mass, velocity_mag, angle_of_attack, lifting_area, intake_area):
+    # Calculate initial velocity components
+    v0_horizontal = velocity_mag * np.cos(np.radians(angle_of_attack))
+    v0_vertical = velocity_mag * np.sin(np.radians(angle_of_attack))
+    return v0_horizontal, v0_vertical, mass, lifting_area, intake_area
 
 
 # Execute the main function
@@ -47,11 +47,8 @@ if __name__ == "__main__":
 
 
 def air_density_func(y):
-    # Retrieve altitude and density data from the data table
-    altitudes = data_table["Altitude (m)"]
-    densities = data_table["Density (kg/m^3)"]
-    # Interpolate air density based on altitude
-    return np.interp(y, altitudes, densities)
+    # Look up air density in the shared, precomputed atmosphere table
+    return standard_atmosphere(y)
 
 
 # Function to calculate thrust based on air density, velocity, and intake area
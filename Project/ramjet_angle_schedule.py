@@ -0,0 +1,161 @@
+# Angle of attack schedule optimizer for the solve_ivp ramjet model. Both ramjet models fly one constant
+# angle_of_attack for the whole flight. Here the angle follows a piecewise linear schedule over time or altitude,
+# given by its values at a few knots, and the knot values are optimized to maximize the altitude reached or to
+# minimize the fuel burned while still reaching a required altitude.
+#
+# Every evaluation flies a whole batch of schedules at once: the vectorized state_derivative() of the WIP model takes
+# one column per craft, so fly_schedules() steps all of them together with a fixed step RK4 loop (a fixed step keeps
+# the objective smooth enough for finite differences, which adaptive step selection would not). The gradient comes
+# from central differences of every knot, all 2K perturbed schedules and the unperturbed one flown as a single
+# ensemble of 2K + 1 craft, and scipy's L-BFGS-B uses it within the angle bounds.
+#
+# Example, from inside the Project folder:
+#     python ramjet_angle_schedule.py --objective max_altitude --knots 0 25 50 75 100 --initial-angle 5
+
+import argparse
+
+import numpy as np
+from scipy.optimize import minimize
+
+import WIP_ramjet_powered_flight_solveIVP_method as flight_model
+
+# What a schedule can be optimized for
+objective_names = ("max_altitude", "fuel_burned")
+# Quantities a schedule's angle can follow
+schedule_variables = ("time", "altitude")
+
+
+# Function to look up the scheduled angle of every craft. angles holds one row of knot values per craft and points
+# the time or altitude of every craft (or one value shared by all), clamped to the knot range like np.interp.
+def schedule_angles(angles, knots, points):
+    rows = np.arange(angles.shape[0])
+    points = np.clip(np.broadcast_to(points, rows.shape), knots[0], knots[-1])
+    segment = np.clip(np.searchsorted(knots, points, side="right") - 1, 0, len(knots) - 2)
+    fraction = (points - knots[segment]) / (knots[segment + 1] - knots[segment])
+    return angles[rows, segment] * (1 - fraction) + angles[rows, segment + 1] * fraction
+
+
+# Function to fly a batch of schedules together with fixed step RK4, returning the maximum altitude, fuel burned and
+# final speed of every craft. angles is (craft, knots) in degrees, knots in seconds or metres per schedule_variable.
+# Each craft is launched along its own scheduled angle at the start, as solve_flight() launches along the angle.
+def fly_schedules(angles, knots, mass, velocity_mag, lifting_area, intake_area, schedule_variable="time",
+                  t_final=100.0, time_step=0.1):
+    angles = np.atleast_2d(np.asarray(angles, dtype=float))
+    knots = np.asarray(knots, dtype=float)
+    number_of_craft = angles.shape[0]
+
+    def angle_at(t, state):
+        return schedule_angles(angles, knots, t if schedule_variable == "time" else state[3])
+
+    def derivative(t, state):
+        return flight_model.state_derivative(t, state, angle_at(t, state), lifting_area, intake_area)
+
+    launch_angles = np.radians(angle_at(0.0, np.zeros((5, number_of_craft))))
+    state = np.array([velocity_mag * np.cos(launch_angles), velocity_mag * np.sin(launch_angles),
+                      np.zeros(number_of_craft), np.zeros(number_of_craft), np.full(number_of_craft, float(mass))])
+    max_altitude = state[3].copy()
+    number_of_steps = int(round(t_final / time_step))
+    for step in range(number_of_steps):
+        t = step * time_step
+        k1 = derivative(t, state)
+        k2 = derivative(t + time_step / 2, state + time_step / 2 * k1)
+        k3 = derivative(t + time_step / 2, state + time_step / 2 * k2)
+        k4 = derivative(t + time_step, state + time_step * k3)
+        state = state + time_step / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+        np.maximum(max_altitude, state[3], out=max_altitude)
+    return {"max_altitude": max_altitude, "fuel_burned": mass - state[4], "final_speed": np.hypot(state[0], state[1])}
+
+
+# Function to optimize the knot values of an angle of attack schedule. objective "max_altitude" maximizes the highest
+# altitude reached, "fuel_burned" minimizes the fuel burned with a quadratic penalty for falling short of
+# minimum_altitude. Knot angles stay within angle_bounds (degrees). Returns the optimized angles, the metrics of the
+# optimized and the starting schedule, and how many ensembles and craft were flown.
+def optimize_schedule(knots, mass, velocity_mag, lifting_area, intake_area, objective="max_altitude",
+                      schedule_variable="time", initial_angles=5.0, angle_bounds=(-5.0, 20.0), minimum_altitude=0.0,
+                      perturbation=0.05, max_iterations=50, t_final=100.0, time_step=0.1):
+    if objective not in objective_names:
+        raise ValueError(f"Unknown objective '{objective}', expected one of {objective_names}")
+    if schedule_variable not in schedule_variables:
+        raise ValueError(f"Unknown schedule variable '{schedule_variable}', expected one of {schedule_variables}")
+    knots = np.asarray(knots, dtype=float)
+    if len(knots) < 2 or np.any(np.diff(knots) <= 0):
+        raise ValueError("A schedule needs at least two strictly increasing knots")
+    initial_angles = np.broadcast_to(np.asarray(initial_angles, dtype=float), knots.shape).copy()
+    number_of_knots = len(knots)
+    flights = {"ensembles": 0, "craft": 0}
+
+    def fly(angles):
+        angles = np.atleast_2d(angles)
+        flights["ensembles"] += 1
+        flights["craft"] += len(angles)
+        with np.errstate(over="ignore", invalid="ignore"):
+            return fly_schedules(angles, knots, mass, velocity_mag, lifting_area, intake_area, schedule_variable,
+                                 t_final, time_step)
+
+    def cost(metrics):
+        # Smaller is better for the optimizer, divergent flights cost the most
+        if objective == "max_altitude":
+            values = -metrics["max_altitude"]
+        else:
+            shortfall = np.maximum(minimum_altitude - metrics["max_altitude"], 0.0)
+            values = metrics["fuel_burned"] + 1e-3 * shortfall ** 2
+        return np.where(np.isfinite(values), values, np.inf)
+
+    starting_metrics = fly(initial_angles)
+    scale = max(abs(float(cost(starting_metrics)[0])), 1.0)  # keep the optimizer's numbers near one
+
+    def cost_and_gradient(angles):
+        # The schedule itself and both perturbations of every knot, flown as one ensemble
+        perturbations = perturbation * np.eye(number_of_knots)
+        batch = np.vstack([angles, angles + perturbations, angles - perturbations])
+        costs = cost(fly(batch)) / scale
+        gradient = (costs[1:number_of_knots + 1] - costs[number_of_knots + 1:]) / (2 * perturbation)
+        if not np.all(np.isfinite(gradient)):
+            gradient = np.nan_to_num(gradient, nan=0.0, posinf=1e6, neginf=-1e6)
+        return costs[0], gradient
+
+    solution = minimize(cost_and_gradient, initial_angles, jac=True, method="L-BFGS-B",
+                        bounds=[angle_bounds] * number_of_knots, options={"maxiter": max_iterations})
+    optimized_metrics = fly(solution.x)
+    return {"knots": knots, "angles": solution.x, "schedule_variable": schedule_variable,
+            "metrics": {name: float(values[0]) for name, values in optimized_metrics.items()},
+            "starting_metrics": {name: float(values[0]) for name, values in starting_metrics.items()},
+            "iterations": solution.nit, "converged": solution.success, "message": solution.message,
+            "ensembles_flown": flights["ensembles"], "craft_flown": flights["craft"]}
+
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description="Optimize a piecewise linear angle of attack schedule")
+    parser.add_argument("--objective", choices=objective_names, default="max_altitude", help="what to optimize")
+    parser.add_argument("--schedule-variable", choices=schedule_variables, default="time",
+                        help="whether the knots are times (s) or altitudes (m)")
+    parser.add_argument("--knots", type=float, nargs="+", default=[0.0, 25.0, 50.0, 75.0, 100.0],
+                        help="knot positions of the schedule")
+    parser.add_argument("--initial-angle", type=float, default=5.0, help="starting angle at every knot (degrees)")
+    parser.add_argument("--min-angle", type=float, default=-5.0, help="smallest angle allowed (degrees)")
+    parser.add_argument("--max-angle", type=float, default=20.0, help="largest angle allowed (degrees)")
+    parser.add_argument("--minimum-altitude", type=float, default=0.0,
+                        help="altitude the fuel_burned objective still has to reach (m)")
+    parser.add_argument("--mass", type=float, default=20000.0, help="initial mass (kg)")
+    parser.add_argument("--velocity-mag", type=float, default=300.0, help="initial speed (m/s)")
+    parser.add_argument("--lifting-area", type=float, default=31.0, help="lifting area (m^2)")
+    parser.add_argument("--intake-area", type=float, default=0.8, help="intake area (m^2)")
+    arguments = parser.parse_args()
+
+    result = optimize_schedule(arguments.knots, arguments.mass, arguments.velocity_mag, arguments.lifting_area,
+                               arguments.intake_area, objective=arguments.objective,
+                               schedule_variable=arguments.schedule_variable, initial_angles=arguments.initial_angle,
+                               angle_bounds=(arguments.min_angle, arguments.max_angle),
+                               minimum_altitude=arguments.minimum_altitude)
+    unit = "s" if arguments.schedule_variable == "time" else "m"
+    print(f"Optimized schedule ({result['iterations']} iterations, {result['ensembles_flown']} ensembles, "
+          f"{result['craft_flown']} craft flown):")
+    for knot, angle in zip(result["knots"], result["angles"]):
+        print(f"  {knot:g} {unit}: {angle:.3f} degrees")
+    for name in result["metrics"]:
+        print(f"{name}: {result['starting_metrics'][name]:.6g} -> {result['metrics'][name]:.6g}")
+
+
+if __name__ == "__main__":
+    main()
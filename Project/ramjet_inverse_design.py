@@ -0,0 +1,217 @@
+# Inverse design for the ramjet flight model. Rather than hand-tuning intake_area or lifting_area in
+# get_initial_conditions() until the craft reaches a target, an InverseDesignSolver finds the value of one design
+# parameter at which a summary metric crosses the target, with the other parameters held at a base design. The metric
+# is taken to be monotonic in the parameter: the answer is the smallest value meeting the target when the top of the
+# search bracket meets it, and the largest when only the bottom does.
+#
+# The search is a k-section bracketing method: every iteration places several candidates evenly inside the bracket,
+# flies them all at once as one run_ensemble() batch, and shrinks the bracket to the gap between the last candidate
+# that misses the target and the first one that meets it. With the default 8 candidates the bracket shrinks ninefold
+# per ensemble run, compared with twofold per run for bisection. Every flown case is cached on the solver. A case is
+# only answered from the cache when its values match a flown one (to cache_decimals), which catches the bracket ends
+# and the early candidates repeated by every target. The bigger saving is that each solve starts from the tightest
+# bracket the cached cases of the same base design already give, so a second target or a refined tolerance picks up
+# where earlier solves left off instead of searching the whole bracket again.
+#
+# Example, from inside the Project folder:
+#     python ramjet_inverse_design.py --parameter intake_area --metric max_altitude --target 50000 60000 \
+#         --low 0.1 --high 1.5
+
+import argparse
+
+import numpy as np
+
+from final_ramet_powered_flight_model import run_ensemble, initial_velocity_components
+from ramjet_parameter_sweep import parameter_names
+
+# Metrics a target can be set on, all available from run_ensemble() without storing the time series
+target_metrics = ("max_altitude", "final_speed", "fuel_burned")
+# Base design used for the parameters that are not being solved for, matching the examples in the model prompts
+default_design = {"mass0": 20000.0, "velocity_mag": 300.0, "angle_of_attack": 5.0, "lifting_area": 31.0,
+                  "intake_area": 0.8}
+
+
+# Function to fly a batch of cases, in the order of parameter_names, as one ensemble and return their target metrics
+def evaluate_cases(cases):
+    mass0, velocity_mag, angle_of_attack, lifting_area, intake_area = np.atleast_2d(np.asarray(cases, dtype=float)).T
+    v0_horizontal, v0_vertical = initial_velocity_components(velocity_mag, angle_of_attack)
+    with np.errstate(over="ignore", invalid="ignore"):  # divergent designs simply miss the target
+        results = run_ensemble(v0_horizontal, v0_vertical, mass0, lifting_area, intake_area, store_history=False)
+    return {"max_altitude": results["max_altitude"],
+            "final_speed": np.hypot(results["final_velocity"][0], results["final_velocity"][1]),
+            "fuel_burned": mass0 - results["final_mass"]}
+
+
+class InverseDesignSolver:
+    """
+    Bracketing solver for the design parameter value at which a metric crosses a target, with a cache of every
+    flown case
+    :param candidates:      int, optional :: cases flown per iteration inside the bracket
+    :param cache_decimals:  int, optional :: decimals case values are rounded to for cache lookups
+    """
+
+    def __init__(self, candidates=8, cache_decimals=9):
+        if candidates < 1:
+            raise ValueError("candidates must be at least 1")
+        self.candidates = candidates
+        self.cache_decimals = cache_decimals
+        self.cache = {}
+        self.flown = 0  # cases simulated so far
+        self.cache_hits = 0  # cases answered from the cache so far
+
+    def evaluate(self, cases):
+        """
+        Returns the target metrics of every case, flying only the ones not in the cache as a single ensemble
+        :param cases:   array-like(n, 5) :: cases in the order of parameter_names
+        :return:        dict :: metric name to NumPy array(n)
+        """
+        keys = [tuple(np.round(case, self.cache_decimals).tolist()) for case in np.atleast_2d(cases)]
+        missing = list(dict.fromkeys(key for key in keys if key not in self.cache))
+        self.cache_hits += len(keys) - len(missing)
+        if missing:
+            metrics = evaluate_cases(missing)
+            for index, key in enumerate(missing):
+                self.cache[key] = {name: float(metrics[name][index]) for name in target_metrics}
+            self.flown += len(missing)
+        return {name: np.array([self.cache[key][name] for key in keys]) for name in target_metrics}
+
+    def cached_cases(self, base_case, column, metric):
+        """
+        Returns the cached cases that differ from a base case in one parameter only
+        :param base_case:   NumPy array(5) :: case in the order of parameter_names
+        :param column:      int :: index of the parameter allowed to differ
+        :param metric:      str :: one of target_metrics
+        :return:            (NumPy array, NumPy array) :: values of the parameter in increasing order, and the metric
+                            at each of them
+        """
+        if not self.cache:
+            return np.empty(0), np.empty(0)
+        keys = np.array(list(self.cache))
+        others = np.arange(len(base_case)) != column
+        same_design = np.all(keys[:, others] == np.round(base_case, self.cache_decimals)[others], axis=1)
+        values = keys[same_design, column]
+        order = np.argsort(values)
+        metric_values = np.array([self.cache[key][metric] for key in map(tuple, keys[same_design].tolist())])
+        return values[order], metric_values[order]
+
+    def solve(self, parameter, metric, target, low, high, base_design=None, sense="at_least", tolerance=1e-3,
+              max_iterations=50):
+        """
+        Finds where in [low, high] the metric crosses the target. The metric is assumed to be monotonic in parameter
+        over the bracket, so one end meets the target and the other may not. When the high end meets it, the smallest
+        value meeting the target is returned, and when only the low end does (an at_most target on a metric that
+        grows with the parameter, say), the largest one. A metric that is not monotonic gives the first crossing
+        found on the candidate grid.
+        :param parameter:       str :: one of parameter_names to solve for
+        :param metric:          str :: one of target_metrics
+        :param target:          float :: value the metric has to reach
+        :param low:             float :: lower end of the search bracket
+        :param high:            float :: upper end of the search bracket
+        :param base_design:     dict, optional :: values of the other parameters, default_design where missing
+        :param sense:           str, optional :: "at_least" for metric >= target or "at_most" for metric <= target
+        :param tolerance:       float, optional :: bracket width to stop at
+        :param max_iterations:  int, optional :: most ensemble runs
+        :return:                dict :: value (the smallest, or for meets="below" the largest, value found to
+                                meet the target), metric_value there, meets ("above" or "below", the side of value
+                                on which the bracket meets the target), the final bracket, iterations, and the cases
+                                flown and cache hits of this solve
+        """
+        if parameter not in parameter_names:
+            raise ValueError(f"Unknown parameter '{parameter}', expected one of {parameter_names}")
+        if metric not in target_metrics:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {target_metrics}")
+        if sense not in ("at_least", "at_most"):
+            raise ValueError("sense must be 'at_least' or 'at_most'")
+        if not low < high:
+            raise ValueError("low must be below high")
+        design = {**default_design, **(base_design or {})}
+        base_case = np.array([design[name] for name in parameter_names], dtype=float)
+        column = parameter_names.index(parameter)
+        flown_before, hits_before = self.flown, self.cache_hits
+
+        # Function to tell which metric values meet the target
+        def compare(metric_values):
+            with np.errstate(invalid="ignore"):  # NaN from a divergent run never meets the target
+                return metric_values >= target if sense == "at_least" else metric_values <= target
+
+        # Function to fly candidate values of the parameter, returning the metric at each one
+        def fly(values):
+            cases = np.tile(base_case, (len(values), 1))
+            cases[:, column] = values
+            return self.evaluate(cases)[metric]
+
+        metric_values = fly(np.array([low, high]))
+        met = compare(metric_values)
+        if not np.any(met):
+            raise ValueError(f"{metric} does not meet {sense} {target} at either end of [{low}, {high}] for "
+                             f"{parameter}, so the bracket does not contain a crossing of a monotonic metric")
+        meets = "above" if met[1] else "below"
+
+        # Function to tell which metric values lie past the crossing the bracket closes in on: meeting the target when
+        # the high end meets it, missing it when only the low end does
+        def crossed(metric_values):
+            return compare(metric_values) if meets == "above" else ~compare(metric_values)
+
+        low_metric, high_metric = metric_values
+        iterations = 0
+        if meets == "above" and met[0]:
+            high, high_metric = low, low_metric
+        else:
+            # Narrow the bracket to the first crossing among the cases earlier solves flew inside it
+            values, metric_values = self.cached_cases(base_case, column, metric)
+            inside = (values > low) & (values < high)
+            values, metric_values = values[inside], metric_values[inside]
+            past = crossed(metric_values)
+            if np.any(past):
+                first = int(np.argmax(past))
+                high, high_metric = values[first], metric_values[first]
+                values, metric_values = values[:first], metric_values[:first]
+            if len(values):
+                low, low_metric = values[-1], metric_values[-1]
+            while high - low > tolerance and iterations < max_iterations:
+                values = np.linspace(low, high, self.candidates + 2)[1:-1]
+                metric_values = fly(values)
+                past = crossed(metric_values)
+                iterations += 1
+                first = int(np.argmax(past)) if np.any(past) else len(values)
+                if first > 0:
+                    low, low_metric = values[first - 1], metric_values[first - 1]
+                if first < len(values):
+                    high, high_metric = values[first], metric_values[first]
+
+        value, value_metric = (high, high_metric) if meets == "above" else (low, low_metric)
+        return {"value": float(value), "metric_value": float(value_metric), "meets": meets,
+                "bracket": (float(low), float(high)), "iterations": iterations, "flown": self.flown - flown_before,
+                "cache_hits": self.cache_hits - hits_before}
+
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description="Find the design parameter value at which a metric crosses a target")
+    parser.add_argument("--parameter", choices=parameter_names, default="intake_area", help="parameter to solve for")
+    parser.add_argument("--metric", choices=target_metrics, default="max_altitude", help="metric to set a target on")
+    parser.add_argument("--target", type=float, nargs="+", required=True, help="target value(s) of the metric")
+    parser.add_argument("--at-most", action="store_true", help="the metric has to stay at or below the target")
+    parser.add_argument("--low", type=float, required=True, help="lower end of the search bracket")
+    parser.add_argument("--high", type=float, required=True, help="upper end of the search bracket")
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="bracket width to stop at")
+    parser.add_argument("--candidates", type=int, default=8, help="cases flown together per iteration")
+    for name in parameter_names:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=default_design[name],
+                            help=f"base design value of {name}")
+    arguments = parser.parse_args()
+
+    solver = InverseDesignSolver(candidates=arguments.candidates)
+    base_design = {name: getattr(arguments, name) for name in parameter_names}
+    for target in arguments.target:
+        solution = solver.solve(arguments.parameter, arguments.metric, target, arguments.low, arguments.high,
+                                base_design=base_design, sense="at_most" if arguments.at_most else "at_least",
+                                tolerance=arguments.tolerance)
+        print(f"{arguments.metric} {'<=' if arguments.at_most else '>='} {target}: {arguments.parameter} "
+              f"{'>=' if solution['meets'] == 'above' else '<='} {solution['value']:.6g} "
+              f"({arguments.metric} {solution['metric_value']:.6g}), {solution['iterations']} iterations, "
+              f"{solution['flown']} cases flown, {solution['cache_hits']} from the cache")
+
+
+if __name__ == "__main__":
+    main()
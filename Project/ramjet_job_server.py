@@ -0,0 +1,365 @@
+# Local job service for ramjet simulations, so several people can queue runs on one machine instead of each starting
+# an interactive Python process. An asyncio server on localhost accepts parameter sets as newline separated JSON,
+# runs them on a bounded process pool through ramjet_simulation.simulate(), streams progress back to anyone watching
+# a job and saves each finished run with result_store, handing back the run directory as the result handle. Identical
+# requests (same parameters, model and integrator) map to the same job, so a run that is queued, running or done is
+# never started twice while the server remembers it. It remembers the max_finished most recently finished jobs and
+# forgets older ones, whose runs stay on disk under output_dir/job_id. Nothing leaves the machine: the server only
+# listens on 127.0.0.1.
+#
+# Requests, one JSON object per line, each answered with one JSON line (watch keeps answering until the job ends):
+#     {"command": "submit", "params": {...}, "model": "final", "integrator": "euler", "sample_spacing": 0.01}
+# (the solve_ivp model also needs "fuel_mass" in params)
+#     {"command": "status", "job_id": "..."}
+#     {"command": "watch", "job_id": "..."}
+#     {"command": "jobs"}
+#
+# Example, from inside the Project folder:
+#     python ramjet_job_server.py serve --workers 4 --output-dir ramjet_jobs
+#     python ramjet_job_server.py submit runs.json --watch
+
+import argparse
+import asyncio
+import collections
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+import final_ramet_powered_flight_model as final_model
+import ramjet_simulation
+import result_store
+from ramjet_parameter_sweep import summarize_run
+
+default_host = "127.0.0.1"
+default_port = 8765
+finished_states = ("done", "failed")
+# Most samples a solve_ivp job may save over the flight, which bounds how small sample_spacing can be
+max_samples = 1_000_000
+
+
+# Function called by the final model's integrators with the fraction of the flight done, passing it on to the server
+def report_progress(queue, job_id, fraction):
+    queue.put((job_id, fraction))
+
+
+# Function to reduce a run of either model to the summary metrics of a sweep row
+def job_summary(results, params, model):
+    if model == "final":
+        return summarize_run(results, params["mass0"])
+    ground_impact = results["events"]["ground_impact"]
+    return {"max_altitude": float(np.max(results["vertical_position_values"])),
+            "final_speed": float(np.hypot(*results["velocity_values"][:, -1])),
+            "fuel_burned": float(params["mass0"] - results["mass_values"][-1]),
+            "time_to_ground": float(ground_impact[0]) if len(ground_impact) else float("nan")}
+
+
+# Function run inside each worker process: runs one job, saves it under output_dir/job_id and returns the run
+# directory and summary metrics
+def run_job(job_id, params, model, integrator, sample_spacing, output_dir, progress_queue):
+    progress_queue.put((job_id, 0.0))
+    progress = partial(report_progress, progress_queue, job_id) if model == "final" else None
+    with np.errstate(over="ignore", invalid="ignore"):
+        results = ramjet_simulation.simulate(params, model=model, integrator=integrator, progress=progress,
+                                             sample_spacing=sample_spacing)
+    events = {f"event_{name}": times for name, times in results.get("events", {}).items()}
+    directory = os.path.join(output_dir, job_id)
+    result_store.save_run(directory, {**results, **events}, params)
+    return {"result": directory, "summary": job_summary(results, params, model)}
+
+
+# Function to name a job after everything that determines its result, so identical requests share a job
+def job_key(params, model, integrator, sample_spacing):
+    description = json.dumps({"params": params, "model": model,
+                              "integrator": integrator if model == "final" else None,
+                              "sample_spacing": sample_spacing if model == "solve_ivp" else None}, sort_keys=True)
+    return hashlib.sha256(description.encode()).hexdigest()[:16]
+
+
+class Job:
+    """
+    One queued simulation and everything known about it so far
+    :param job_id:          str :: job name from job_key()
+    :param params:          dict :: validated parameter set
+    :param model:           str :: one of ramjet_simulation.model_names
+    :param integrator:      str :: integrator of the final model
+    :param sample_spacing:  float :: seconds between the saved samples of the solve_ivp model
+    """
+
+    def __init__(self, job_id, params, model, integrator, sample_spacing):
+        self.job_id = job_id
+        self.params = params
+        self.model = model
+        self.integrator = integrator
+        self.sample_spacing = sample_spacing
+        self.status = "queued"
+        self.progress = 0.0
+        self.result = None
+        self.summary = None
+        self.error = None
+        self.watchers = set()
+
+    def snapshot(self):
+        return {"job_id": self.job_id, "status": self.status, "progress": self.progress, "result": self.result,
+                "summary": self.summary, "error": self.error}
+
+    def notify(self):
+        snapshot = self.snapshot()
+        for watcher in self.watchers:
+            watcher.put_nowait(snapshot)
+
+
+class JobServer:
+    """
+    asyncio front end and process pool back end of the job service
+    :param output_dir:      str, optional :: directory finished runs are saved under, one directory per job
+    :param workers:         int, optional :: worker processes, all cores if None
+    :param max_pending:     int, optional :: most queued and running jobs accepted at once
+    :param max_finished:    int, optional :: most finished jobs remembered, the oldest are forgotten first
+    """
+
+    def __init__(self, output_dir="ramjet_jobs", workers=None, max_pending=100, max_finished=1000):
+        self.output_dir = output_dir
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.jobs = {}
+        self.finished_jobs = collections.deque()  # in the order they finished
+        self.tasks = set()  # the event loop only keeps weak references to tasks, so running ones are held here
+        self.executor = None
+        self.manager = None
+        self.progress_queue = None
+        self.progress_task = None
+        self.server = None
+
+    async def start(self, host=default_host, port=default_port):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.manager = multiprocessing.Manager()
+        self.progress_queue = self.manager.Queue()
+        self.progress_task = asyncio.create_task(self.pump_progress())
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.progress_queue.put(None)
+        await self.progress_task
+        # Both shutdowns wait for processes to exit, so they run on a thread to keep the event loop responsive
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, partial(self.executor.shutdown, cancel_futures=True))
+        await loop.run_in_executor(None, self.manager.shutdown)
+
+    def submit(self, params, model="final", integrator="euler", sample_spacing=final_model.dt):
+        """
+        Queues a run unless an identical one is already known
+        :return: tuple :: the Job and whether it already existed
+        """
+        if model not in ramjet_simulation.model_names:
+            raise ValueError(f"Unknown model '{model}', expected one of {ramjet_simulation.model_names}")
+        params = ramjet_simulation.validate_parameters(params, model)
+        if integrator not in final_model.integrator_names:
+            raise ValueError(f"Unknown integrator '{integrator}', expected one of {final_model.integrator_names}")
+        sample_spacing = float(sample_spacing)
+        if not 0 < sample_spacing < float("inf"):
+            raise ValueError(f"sample_spacing must be positive and finite, got {sample_spacing}")
+        if final_model.t_max / sample_spacing > max_samples:
+            raise ValueError(f"sample_spacing {sample_spacing} would save more than {max_samples} samples over the "
+                             f"{final_model.t_max} s flight, use at least {final_model.t_max / max_samples}")
+        job_id = job_key(params, model, integrator, sample_spacing)
+        job = self.jobs.get(job_id)
+        if job is not None and job.status != "failed":
+            return job, True
+        if sum(job.status not in finished_states for job in self.jobs.values()) >= self.max_pending:
+            raise RuntimeError(f"Too many pending jobs (at most {self.max_pending}), try again later")
+
+        job = Job(job_id, params, model, integrator, sample_spacing)
+        self.jobs[job_id] = job
+        future = asyncio.get_running_loop().run_in_executor(self.executor, run_job, job_id, params, model,
+                                                            integrator, sample_spacing, self.output_dir,
+                                                            self.progress_queue)
+        task = asyncio.create_task(self.finish(job, future))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return job, False
+
+    async def finish(self, job, future):
+        try:
+            outcome = await future
+        except Exception as error:
+            job.status = "failed"
+            job.error = f"{type(error).__name__}: {error}"
+        else:
+            job.status = "done"
+            job.progress = 1.0
+            job.result = outcome["result"]
+            job.summary = outcome["summary"]
+        job.notify()
+        self.forget_old_jobs(job)
+
+    def forget_old_jobs(self, job):
+        """
+        Records a job as finished and forgets the oldest finished jobs beyond max_finished
+        :param job: Job :: job that just finished
+        """
+        self.finished_jobs.append(job)
+        while len(self.finished_jobs) > self.max_finished:
+            old_job = self.finished_jobs.popleft()
+            if self.jobs.get(old_job.job_id) is old_job:  # a failed job may have been resubmitted since
+                del self.jobs[old_job.job_id]
+
+    async def pump_progress(self):
+        # The manager queue blocks, so it is read on a thread and the updates applied on the event loop
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await loop.run_in_executor(None, self.progress_queue.get)
+            if message is None:
+                return
+            job_id, fraction = message
+            job = self.jobs.get(job_id)
+            if job is None or job.status in finished_states:
+                continue
+            job.status = "running"
+            job.progress = fraction
+            job.notify()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    await self.handle_request(json.loads(line), writer)
+                except (ValueError, KeyError, TypeError, RuntimeError) as error:
+                    await send_message(writer, {"error": f"{type(error).__name__}: {error}"})
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # the client went away or the server is shutting down
+        finally:
+            writer.close()
+
+    async def handle_request(self, request, writer):
+        if not isinstance(request, dict):
+            raise TypeError(f"A request must be a JSON object, got {type(request).__name__}")
+        command = request.get("command")
+        if command == "submit":
+            if not isinstance(request["params"], dict):
+                raise TypeError(f"params must be a JSON object, got {type(request['params']).__name__}")
+            job, deduplicated = self.submit(request["params"], request.get("model", "final"),
+                                            request.get("integrator", "euler"),
+                                            request.get("sample_spacing", final_model.dt))
+            await send_message(writer, {**job.snapshot(), "deduplicated": deduplicated})
+        elif command == "status":
+            await send_message(writer, self.find_job(request["job_id"]).snapshot())
+        elif command == "watch":
+            job = self.find_job(request["job_id"])
+            updates = asyncio.Queue()
+            job.watchers.add(updates)
+            try:
+                snapshot = job.snapshot()
+                while True:
+                    await send_message(writer, snapshot)
+                    if snapshot["status"] in finished_states:
+                        break
+                    snapshot = await updates.get()
+            finally:
+                job.watchers.discard(updates)
+        elif command == "jobs":
+            await send_message(writer, {"jobs": [job.snapshot() for job in self.jobs.values()]})
+        else:
+            raise ValueError(f"Unknown command '{command}'")
+
+    def find_job(self, job_id):
+        if job_id not in self.jobs:
+            raise KeyError(f"No job {job_id}")
+        return self.jobs[job_id]
+
+
+# Function to write one JSON message as a line
+async def send_message(writer, message):
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+
+# Function for clients: sends one request and returns the replies, every update until the job ends for "watch".
+# on_reply, if given, is called with each reply as it arrives.
+async def send_request(request, host=default_host, port=default_port, on_reply=None):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        await send_message(writer, request)
+        replies = []
+        while True:
+            reply = json.loads(await reader.readline())
+            replies.append(reply)
+            if on_reply is not None:
+                on_reply(reply)
+            if request.get("command") != "watch" or "status" not in reply or reply["status"] in finished_states:
+                return replies
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def serve(arguments):
+    server = JobServer(arguments.output_dir, workers=arguments.workers, max_pending=arguments.max_pending,
+                       max_finished=arguments.max_finished)
+    port = await server.start(default_host, arguments.port)
+    print(f"Serving ramjet jobs on {default_host}:{port}, results in {arguments.output_dir}")
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.stop()
+
+
+async def submit(arguments):
+    def show(reply):
+        if "status" not in reply:
+            print(reply["error"])
+        else:
+            print(f"{reply['job_id']}: {reply['status']} {100 * reply['progress']:.0f}%"
+                  + (f" -> {reply['result']}" if reply["result"] else "")
+                  + (" (already submitted)" if reply.get("deduplicated") else ""))
+
+    for params in ramjet_simulation.load_parameter_sets(arguments.parameter_file):
+        request = {"command": "submit", "params": params, "model": arguments.model,
+                   "integrator": arguments.integrator, "sample_spacing": arguments.sample_spacing}
+        reply = (await send_request(request, port=arguments.port, on_reply=show))[0]
+        if arguments.watch and "status" in reply:
+            await send_request({"command": "watch", "job_id": reply["job_id"]}, port=arguments.port, on_reply=show)
+
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description="Local job server for queued ramjet simulations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="run the job server")
+    serve_parser.add_argument("--port", type=int, default=default_port, help="localhost port to listen on")
+    serve_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    serve_parser.add_argument("--max-pending", type=int, default=100, help="most queued and running jobs")
+    serve_parser.add_argument("--max-finished", type=int, default=1000, help="most finished jobs remembered")
+    serve_parser.add_argument("--output-dir", default="ramjet_jobs", help="directory to save finished runs to")
+    submit_parser = commands.add_parser("submit", help="submit the parameter sets of a JSON or CSV file")
+    submit_parser.add_argument("parameter_file", help="JSON or CSV file of parameter sets")
+    submit_parser.add_argument("--port", type=int, default=default_port, help="port the server listens on")
+    submit_parser.add_argument("--model", choices=ramjet_simulation.model_names, default="final",
+                               help="which flight model to run")
+    submit_parser.add_argument("--integrator", choices=final_model.integrator_names, default="euler",
+                               help="time stepping scheme for the final model")
+    submit_parser.add_argument("--sample-spacing", type=float, default=final_model.dt,
+                               help="seconds between the saved samples of the solve_ivp model's dense output")
+    submit_parser.add_argument("--watch", action="store_true", help="follow each job's progress until it ends")
+    arguments = parser.parse_args()
+
+    try:
+        asyncio.run(serve(arguments) if arguments.command == "serve" else submit(arguments))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# Monte Carlo uncertainty propagation for the ramjet flight model. The lift and drag coefficients, the engine's Isp and
+# the methane to oxygen ratio are all flagged as uncertain in the model's own comments, so here they are drawn from
+# distributions and thousands of samples are flown through run_ensemble() in batches. Each batch updates mergeable
+# percentile estimates of altitude, speed and fuel used over time, so memory depends on the batch size and the number
+# of recorded time points, never on the total number of samples.
+#
+# Example, from inside the Project folder:
+#     python ramjet_monte_carlo.py --samples 20000 --intake-area 0.8 --lifting-area 31
+
+import argparse
+
+import numpy as np
+
+import final_ramet_powered_flight_model as flight_model
+
+# Distribution of every uncertain coefficient as (kind, parameter, parameter): ("normal", mean, standard deviation),
+# ("uniform", low, high) or ("fixed", value, None). The spreads are guesses matching the doubts in the model comments.
+default_distributions = {
+    "lift_coefficient": ("uniform", 0.1, 0.4),
+    "drag_coefficient": ("normal", 0.025, 0.005),
+    "specific_impulse": ("normal", 3200.0, 400.0),
+    "methane_to_oxygen_ratio": ("uniform", 0.2, 0.3),
+}
+# Quantities tracked over time
+tracked_quantities = ("altitude", "speed", "fuel_used")
+
+
+# Function to draw samples of every coefficient in distributions
+def sample_coefficients(number_of_samples, distributions, rng):
+    samples = {}
+    for name, (kind, first, second) in distributions.items():
+        if kind == "normal":
+            samples[name] = rng.normal(first, second, number_of_samples)
+        elif kind == "uniform":
+            samples[name] = rng.uniform(first, second, number_of_samples)
+        elif kind == "fixed":
+            samples[name] = np.full(number_of_samples, float(first))
+        else:
+            raise ValueError(f"Unknown distribution '{kind}' for {name}")
+    return samples
+
+
+# Function to read quantiles off rows of sorted weighted points, with the zero-weight points last. Each point sits in
+# the middle of its share of the row's total weight and values between points are interpolated linearly, rows
+# without any weight give NaN. Returns an array(rows, P).
+def weighted_quantiles(values, weights, probabilities):
+    rows, width = values.shape
+    totals = weights.sum(axis=1, keepdims=True)
+    weighted_points = np.count_nonzero(weights, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        positions = np.where(totals > 0, (np.cumsum(weights, axis=1) - weights / 2) / totals, 0.0)
+
+    # Offsetting every row by twice its index turns the positions of all rows into one increasing sequence, so a
+    # single searchsorted finds the points bracketing every probability of every row
+    offsets = 2.0 * np.arange(rows)[:, np.newaxis]
+    upper = np.searchsorted((positions + offsets).ravel(), (probabilities + offsets).ravel()).reshape(rows, -1)
+    upper -= width * np.arange(rows)[:, np.newaxis]
+    upper = np.clip(upper, 1, np.maximum(weighted_points, 2)[:, np.newaxis] - 1)
+    lower = upper - 1
+    lower_position = np.take_along_axis(positions, lower, axis=1)
+    upper_position = np.take_along_axis(positions, upper, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fraction = np.clip((probabilities - lower_position) / (upper_position - lower_position), 0.0, 1.0)
+    fraction = np.where(weighted_points[:, np.newaxis] > 1, fraction, 0.0)
+    lower_value = np.take_along_axis(values, lower, axis=1)
+    upper_value = np.take_along_axis(values, upper, axis=1)
+    estimates = lower_value + fraction * (upper_value - lower_value)
+    return np.where(weighted_points[:, np.newaxis] > 0, estimates, np.nan)
+
+
+class QuantileSketch:
+    """
+    Quantile estimates for every element of an array, updated a whole batch of observations at a time. Every element
+    keeps a sketch of its distribution: its quantiles at resolution evenly spaced levels, each standing for an equal
+    share of the observations seen so far. A batch is merged by sorting the sketch points together with the batch as
+    weighted points and reading the new sketch off the merged distribution, so an update is one sort per element and
+    memory does not grow with the number of observations. Non-finite observations are skipped for the elements they
+    occur in.
+    :param probabilities:   sequence(P) :: quantiles to estimate, between 0 and 1
+    :param shape:           tuple :: shape of one observation
+    :param resolution:      int, optional :: sketch points per element, the estimates are good to a fraction of the
+                            spacing between them
+    """
+
+    def __init__(self, probabilities, shape, resolution=200):
+        self.probabilities = np.asarray(probabilities, dtype=float)
+        self.shape = tuple(shape)
+        self.resolution = resolution
+        self.sketch = np.full((int(np.prod(self.shape)), resolution), np.nan)
+        self.count = np.zeros(self.shape, dtype=int)
+
+    def update(self, observations):
+        """
+        Merges a batch of observations into the sketches
+        :param observations:    NumPy array(*shape, N) :: N observations of every element, along the last axis
+        """
+        observations = np.asarray(observations, dtype=float).reshape(len(self.sketch), -1)
+        finite = np.isfinite(observations)
+        sketch_weights = np.repeat(self.count.reshape(-1, 1) / self.resolution, self.resolution, axis=1)
+        values = np.concatenate([self.sketch, np.where(finite, observations, np.nan)], axis=1)
+        weights = np.concatenate([sketch_weights, finite.astype(float)], axis=1)
+
+        # NaN values, the skipped observations and the sketches of elements without any yet, sort last
+        order = np.argsort(values, axis=1)
+        values = np.take_along_axis(values, order, axis=1)
+        weights = np.take_along_axis(weights, order, axis=1)
+        levels = (np.arange(self.resolution) + 0.5) / self.resolution
+        self.sketch = weighted_quantiles(values, weights, levels)
+        self.count += finite.sum(axis=1).reshape(self.shape)
+
+    def quantiles(self):
+        """
+        Returns the current estimates
+        :return: NumPy array(P, *shape) :: one estimate per quantile and element, NaN for elements without any finite
+                 observation
+        """
+        weights = np.where(self.count.reshape(-1, 1) > 0, 1.0, 0.0) + np.zeros(self.sketch.shape)
+        estimates = weighted_quantiles(self.sketch, weights, self.probabilities)
+        return estimates.T.reshape((len(self.probabilities),) + self.shape)
+
+
+# Function to run the Monte Carlo study for one design. Samples are flown batch_size at a time through
+# run_ensemble(), recording every record_every steps, and each batch is merged into the percentile sketches and
+# running means in one go. Returns the recorded times and, for each tracked quantity, its percentile
+# bands (one row per percentile) and mean over time.
+def run_monte_carlo(number_of_samples, v0_horizontal, v0_vertical, mass0, lifting_area, intake_area,
+                    distributions=None, percentiles=(5, 50, 95), batch_size=1000, record_every=100, seed=None):
+    distributions = default_distributions if distributions is None else {**default_distributions, **distributions}
+    rng = np.random.default_rng(seed)
+
+    number_of_records = int(round(flight_model.t_max / flight_model.dt)) // record_every
+    quantiles = QuantileSketch(np.asarray(percentiles) / 100, (len(tracked_quantities), number_of_records))
+    totals = np.zeros((len(tracked_quantities), number_of_records))
+    finite_counts = np.zeros((len(tracked_quantities), number_of_records))
+
+    time_values = None
+    samples_done = 0
+    while samples_done < number_of_samples:
+        batch = min(batch_size, number_of_samples - samples_done)
+        coefficients = sample_coefficients(batch, distributions, rng)
+        with np.errstate(over="ignore", invalid="ignore"):  # unstable samples are skipped, not fatal
+            results = flight_model.run_ensemble(v0_horizontal, v0_vertical, np.full(batch, float(mass0)),
+                                                lifting_area, intake_area, store_history=True,
+                                                record_every=record_every, **coefficients)
+            velocity = results["velocity_values"]
+            quantities = np.stack([results["position_values"][:, 1], np.hypot(velocity[:, 0], velocity[:, 1]),
+                                   mass0 - results["mass_values"]])  # (quantity, time, sample)
+        time_values = results["time_values"]
+
+        quantiles.update(quantities)
+        finite = np.isfinite(quantities)
+        totals += np.where(finite, quantities, 0.0).sum(axis=2)
+        finite_counts += finite.sum(axis=2)
+        samples_done += batch
+
+    bands = quantiles.quantiles()
+    with np.errstate(invalid="ignore"):
+        means = totals / finite_counts
+    return {"time_values": time_values, "percentiles": tuple(percentiles), "number_of_samples": number_of_samples,
+            "bands": {name: bands[:, index] for index, name in enumerate(tracked_quantities)},
+            "means": {name: means[index] for index, name in enumerate(tracked_quantities)}}
+
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo uncertainty study of the ramjet flight model")
+    parser.add_argument("--samples", type=int, default=10000, help="number of Monte Carlo samples")
+    parser.add_argument("--mass0", type=float, default=20000.0, help="initial mass (kg)")
+    parser.add_argument("--velocity-mag", type=float, default=300.0, help="initial speed (m/s)")
+    parser.add_argument("--angle-of-attack", type=float, default=5.0, help="angle of attack (degrees)")
+    parser.add_argument("--lifting-area", type=float, default=31.0, help="lifting area (m^2)")
+    parser.add_argument("--intake-area", type=float, default=0.8, help="intake area (m^2)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="samples flown together per batch")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    arguments = parser.parse_args()
+
+    v0_horizontal, v0_vertical = flight_model.initial_velocity_components(arguments.velocity_mag,
+                                                                          arguments.angle_of_attack)
+    study = run_monte_carlo(arguments.samples, v0_horizontal, v0_vertical, arguments.mass0, arguments.lifting_area,
+                            arguments.intake_area, batch_size=arguments.batch_size, seed=arguments.seed)
+    print(f"Final values over {study['number_of_samples']} samples "
+          f"(percentiles {', '.join(str(p) for p in study['percentiles'])}):")
+    for name in tracked_quantities:
+        print(f"  {name}: {', '.join(f'{value:.6g}' for value in study['bands'][name][:, -1])}")
+
+
+if __name__ == "__main__":
+    main()
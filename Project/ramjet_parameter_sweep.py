@@ -0,0 +1,230 @@
+# Parameter sweep runner for the ramjet flight model. Instead of typing initial conditions into
+# get_initial_conditions() one run at a time, a sweep takes a grid (or an explicit list) of
+# (mass0, velocity_mag, angle_of_attack, lifting_area, intake_area) cases, spreads them over a process pool and
+# collects one row of summary metrics per run, so a design study can use every core and run unattended.
+#
+# run_sweep_trajectories() also keeps the full time series of every run. Rather than each worker pickling its
+# trajectory arrays back to the parent, the parent preallocates one SharedTrajectoryBlock in shared memory, every
+# worker writes its run's rows into its own slice in place, and the parent reads the results as NumPy views of the
+# block without copying them.
+#
+# Example, from inside the Project folder:
+#     python ramjet_parameter_sweep.py --mass0 20000 --velocity-mag 200 300 --angle-of-attack 5 \
+#         --lifting-area 28 31 --intake-area 0.4 0.8 1.2 --output sweep.csv
+
+import argparse
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import final_ramet_powered_flight_model as flight_model
+from final_ramet_powered_flight_model import run_simulation, initial_velocity_components, integrator_names
+from trajectory_recorder import TrajectoryRecorder, channels, row_width
+
+# Order of the parameters in every sweep case
+parameter_names = ("mass0", "velocity_mag", "angle_of_attack", "lifting_area", "intake_area")
+# Order of the summary metrics reported for every run
+metric_names = ("max_altitude", "final_speed", "fuel_burned", "time_to_ground")
+
+
+# Function to build every combination of the given parameter values, in the order of parameter_names
+def build_grid(mass0, velocity_mag, angle_of_attack, lifting_area, intake_area):
+    return list(itertools.product(*(np.atleast_1d(values).tolist() for values in
+                                     (mass0, velocity_mag, angle_of_attack, lifting_area, intake_area))))
+
+
+# Function to reduce the time series of one run to its summary metrics
+def summarize_run(results, mass0):
+    time_values = results["time_values"]
+    altitude = results["position_values"][:, 1]
+    final_velocity = results["final_velocity"]
+
+    # Time to ground is the first time after apogee the craft is back below its starting altitude, NaN if it never
+    # comes down. A craft sinking slightly at launch before it climbs has not landed.
+    apogee = int(np.argmax(altitude))
+    below_ground = np.flatnonzero(altitude[apogee:] < 0.0)
+    time_to_ground = time_values[apogee + below_ground[0]] if below_ground.size else np.nan
+
+    return {"max_altitude": float(np.max(altitude)),
+            "final_speed": float(np.hypot(final_velocity[0], final_velocity[1])),
+            "fuel_burned": float(mass0 - results["final_mass"]),
+            "time_to_ground": float(time_to_ground)}
+
+
+# Function run inside each worker process: one sweep case in, one row of parameters and metrics out. rtol and atol
+# only apply to the rk45 integrator
+def run_case(case, integrator="euler", rtol=1e-6, atol=1e-6):
+    mass0, velocity_mag, angle_of_attack, lifting_area, intake_area = case
+    v0_horizontal, v0_vertical = initial_velocity_components(velocity_mag, angle_of_attack)
+    with np.errstate(over="ignore", invalid="ignore"):  # divergent designs are reported, not fatal
+        results = run_simulation(v0_horizontal, v0_vertical, mass0, lifting_area, intake_area, integrator=integrator,
+                                 rtol=rtol, atol=atol)
+    row = dict(zip(parameter_names, case))
+    row.update(summarize_run(results, mass0))
+    return row
+
+
+# Function to run every case across a process pool, returning the rows in the same order as the cases
+def run_sweep(cases, processes=None, chunksize=None, integrator="euler", rtol=1e-6, atol=1e-6):
+    cases = [tuple(float(value) for value in case) for case in cases]
+    if processes == 1:
+        return [run_case(case, integrator, rtol, atol) for case in cases]
+    if chunksize is None:
+        # A few chunks per worker keeps the pool busy without paying pickling overhead for every single run
+        chunksize = max(1, len(cases) // (4 * (processes or os.cpu_count() or 1)))
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(partial(run_case, integrator=integrator, rtol=rtol, atol=atol), cases,
+                                 chunksize=chunksize))
+
+
+class SharedTrajectoryBlock:
+    """
+    Recorded rows of every sweep case in one block of shared memory, shaped (cases, rows, row_width) with the columns
+    of trajectory_recorder.channels. The process that creates the block owns it and frees it on close().
+    :param number_of_cases: int :: runs in the sweep
+    :param number_of_rows:  int :: recorded rows per run
+    :param name:            str, optional :: name of an existing block to attach to instead of creating one
+    """
+
+    def __init__(self, number_of_cases, number_of_rows, name=None):
+        self.shape = (number_of_cases, number_of_rows, row_width)
+        self.owner = name is None
+        size = max(1, number_of_cases * number_of_rows * row_width * np.dtype(np.float64).itemsize)
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.name = self.memory.name
+        self.array = np.ndarray(self.shape, dtype=np.float64, buffer=self.memory.buf)
+
+    def results(self):
+        """
+        Returns views of the block under the keys run_simulation() uses, with the case index first. They stay valid
+        until close() is called; copy them to keep them longer.
+        :return: dict :: time_values(cases, rows), acceleration_values(cases, rows, 2), velocity_values,
+                 position_values, thrust_values(cases, rows, 1) and delta_mass_values(cases, rows, 1)
+        """
+        results = {}
+        column = 0
+        for name, width in channels:
+            results[name] = self.array[:, :, column] if name == "time_values" else \
+                self.array[:, :, column:column + width]
+            column += width
+        return results
+
+    def close(self):
+        self.array = None  # the views have to go before the memory can be released
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+# Function to count the rows a fixed step run keeps when recording every record_every steps, which is every
+# record_every-th step plus the last one
+def recorded_rows(integrator, record_every=1):
+    if integrator == "rk45":
+        raise ValueError("Shared trajectory blocks need a fixed number of steps, rk45 adapts its steps")
+    number_of_steps = len(np.arange(0, flight_model.t_max, flight_model.dt))
+    return -(-number_of_steps // record_every) + (1 if (number_of_steps - 1) % record_every else 0)
+
+
+# Function run inside each worker process for run_sweep_trajectories(): flies one case, writes every record_every-th
+# row (and the last) into its slice of the shared block and returns only the summary row. The summary is taken from
+# every step, so it is the same as run_sweep() gives whatever the stride.
+def run_case_shared(indexed_case, block_name, block_shape, integrator="euler", record_every=1):
+    index, case = indexed_case
+    mass0, velocity_mag, angle_of_attack, lifting_area, intake_area = case
+    v0_horizontal, v0_vertical = initial_velocity_components(velocity_mag, angle_of_attack)
+    recorder = TrajectoryRecorder(expected_steps=block_shape[1] * record_every)
+    with np.errstate(over="ignore", invalid="ignore"):
+        results = run_simulation(v0_horizontal, v0_vertical, mass0, lifting_area, intake_area, integrator=integrator,
+                                 recorder=recorder)
+    rows = recorder.rows()
+    kept = np.arange(0, len(rows), record_every)
+    if kept[-1] != len(rows) - 1:
+        kept = np.append(kept, len(rows) - 1)
+    block = SharedTrajectoryBlock(*block_shape[:2], name=block_name)
+    try:
+        block.array[index] = rows[kept]
+    finally:
+        block.close()
+    row = dict(zip(parameter_names, case))
+    row.update(summarize_run(results, mass0))
+    return row
+
+
+# Function to run every case across a process pool keeping each run's time series, recorded every record_every steps,
+# in a SharedTrajectoryBlock. Returns the summary rows in case order and the block, which the caller closes when done
+# with it. Only the fixed step integrators are supported, since the block size has to be known up front.
+def run_sweep_trajectories(cases, processes=None, chunksize=None, integrator="euler", record_every=1):
+    cases = [tuple(float(value) for value in case) for case in cases]
+    block = SharedTrajectoryBlock(len(cases), recorded_rows(integrator, record_every))
+    worker = partial(run_case_shared, block_name=block.name, block_shape=block.shape, integrator=integrator,
+                     record_every=record_every)
+    try:
+        if processes == 1:
+            rows = [worker(indexed_case) for indexed_case in enumerate(cases)]
+        else:
+            if chunksize is None:
+                chunksize = max(1, len(cases) // (4 * (processes or os.cpu_count() or 1)))
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                rows = list(executor.map(worker, enumerate(cases), chunksize=chunksize))
+    except BaseException:
+        block.close()
+        raise
+    return rows, block
+
+
+# Function to write sweep rows to a CSV file with one column per parameter and metric
+def write_sweep_table(rows, file_name):
+    with open(file_name, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=parameter_names + metric_names)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+# Function to read a table written by write_sweep_table() back into rows of floats
+def read_sweep_table(file_name):
+    with open(file_name, newline="") as file:
+        return [{name: float(row[name]) for name in parameter_names + metric_names} for row in csv.DictReader(file)]
+
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description="Run a ramjet flight parameter sweep across a process pool")
+    parser.add_argument("--mass0", type=float, nargs="+", required=True, help="initial masses (kg)")
+    parser.add_argument("--velocity-mag", type=float, nargs="+", required=True, help="initial speeds (m/s)")
+    parser.add_argument("--angle-of-attack", type=float, nargs="+", required=True, help="angles of attack (degrees)")
+    parser.add_argument("--lifting-area", type=float, nargs="+", required=True, help="lifting areas (m^2)")
+    parser.add_argument("--intake-area", type=float, nargs="+", required=True, help="intake areas (m^2)")
+    parser.add_argument("--integrator", choices=integrator_names, default="euler", help="time stepping scheme")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--output", default="ramjet_sweep.csv", help="CSV file to write the summary table to")
+    parser.add_argument("--trajectories", default=None,
+                        help="also save every run's time series to this .npz file (fixed step integrators only)")
+    parser.add_argument("--record-every", type=int, default=1, help="steps between saved trajectory rows")
+    arguments = parser.parse_args()
+
+    cases = build_grid(arguments.mass0, arguments.velocity_mag, arguments.angle_of_attack, arguments.lifting_area,
+                       arguments.intake_area)
+    if arguments.trajectories is None:
+        rows = run_sweep(cases, processes=arguments.processes, integrator=arguments.integrator)
+    else:
+        rows, block = run_sweep_trajectories(cases, processes=arguments.processes, integrator=arguments.integrator,
+                                             record_every=arguments.record_every)
+        with block:
+            np.savez(arguments.trajectories, cases=np.array(cases), **block.results())
+    write_sweep_table(rows, arguments.output)
+    print(f"Wrote {len(rows)} runs to {arguments.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# Multi-fidelity screening of ramjet design sweeps. Most configurations in a sweep are obviously bad, and flying each
+# of them with the full 10,000 step Euler loop wastes most of the sweep's time. screen_cases() first flies every case
+# together as one run_ensemble() batch with a fixed step ten times the model's, ranks the cases on a summary metric
+# and re-runs only the best fraction at full fidelity. Every coarse step is checked for the maximum altitude and the
+# time to ground, so the coarse metrics are within a fraction of a percent of the fine ones rather than read off a
+# handful of adaptive steps. It reports the runs and time each stage took and an estimate of what a full fine sweep
+# would have cost.
+#
+# Example, from inside the Project folder:
+#     python ramjet_screening.py --mass0 20000 --velocity-mag 200 250 300 --angle-of-attack 3 5 8 \
+#         --lifting-area 20 25 31 36 --intake-area 0.2 0.4 0.6 0.8 1.0 1.2 --keep 0.1 --output best.csv
+
+import argparse
+import time
+
+import numpy as np
+
+import final_ramet_powered_flight_model as flight_model
+from final_ramet_powered_flight_model import integrator_names, initial_velocity_components, run_ensemble
+from ramjet_parameter_sweep import metric_names, parameter_names, build_grid, run_sweep, write_sweep_table
+
+# Where runs with a NaN metric are ranked. A NaN time_to_ground means the craft never came down, any other NaN metric
+# means the run diverged. "last" and "first" rank them below or above every other run, "drop" leaves them out.
+nan_policies = ("last", "first", "drop")
+
+
+# Function to fly every case as one ensemble with a fixed step of time_step, returning one row of parameters and
+# metrics per case like run_sweep()
+def coarse_sweep(cases, time_step):
+    mass0, velocity_mag, angle_of_attack, lifting_area, intake_area = np.array(cases, dtype=float).reshape(-1, 5).T
+    v0_horizontal, v0_vertical = initial_velocity_components(velocity_mag, angle_of_attack)
+    with np.errstate(over="ignore", invalid="ignore"):  # divergent designs are reported, not fatal
+        results = run_ensemble(v0_horizontal, v0_vertical, mass0, lifting_area, intake_area, time_step=time_step)
+        metrics = {"max_altitude": results["max_altitude"],
+                   "final_speed": np.hypot(results["final_velocity"][0], results["final_velocity"][1]),
+                   "fuel_burned": mass0 - results["final_mass"], "time_to_ground": results["time_to_ground"]}
+    return [{**dict(zip(parameter_names, case)), **{name: float(metrics[name][index]) for name in metric_names}}
+            for index, case in enumerate(cases)]
+
+
+# Function to rank rows on metric, largest first unless maximize is False, placing the rows whose metric is NaN as
+# nan_policy says. Returns the indices of the rows in ranked order.
+def rank_rows(rows, metric, maximize, nan_policy):
+    scores = np.array([row[metric] for row in rows], dtype=float)
+    missing = np.isnan(scores)
+    order = np.argsort(-scores if maximize else scores, kind="stable")  # NaN sorts last either way
+    if nan_policy == "drop":
+        return order[~missing[order]]
+    if nan_policy == "first":
+        return np.concatenate([order[missing[order]], order[~missing[order]]])
+    return order
+
+
+# Function to screen cases with a coarse pass and re-run the best keep_fraction of them at full fidelity. The coarse
+# pass flies every case with Euler steps of coarse_step, the fine pass uses fine_integrator with its default settings
+# across the process pool. Cases are ranked on metric, largest first unless maximize is False, with NaN metrics
+# placed by nan_policy. Returns the fine rows in ranked order, the coarse rows of every case, the number of coarse
+# runs with a NaN metric and the number of runs and seconds spent in each stage.
+def screen_cases(cases, metric="max_altitude", maximize=True, keep_fraction=0.1, minimum_kept=1,
+                 coarse_step=10 * flight_model.dt, fine_integrator="euler", nan_policy="last", processes=None):
+    if metric not in metric_names:
+        raise ValueError(f"Unknown metric '{metric}', expected one of {metric_names}")
+    if not 0 < keep_fraction <= 1:
+        raise ValueError("keep_fraction must be in (0, 1]")
+    if nan_policy not in nan_policies:
+        raise ValueError(f"Unknown nan_policy '{nan_policy}', expected one of {nan_policies}")
+    if coarse_step <= 0:
+        raise ValueError("coarse_step must be positive")
+    cases = [tuple(float(value) for value in case) for case in cases]
+
+    start = time.perf_counter()
+    coarse_rows = coarse_sweep(cases, coarse_step)
+    coarse_seconds = time.perf_counter() - start
+
+    ranked = rank_rows(coarse_rows, metric, maximize, nan_policy)
+    nan_runs = int(sum(np.isnan(row[metric]) for row in coarse_rows))
+    number_kept = min(len(ranked), max(minimum_kept, int(np.ceil(keep_fraction * len(cases)))))
+    kept = ranked[:number_kept]
+
+    start = time.perf_counter()
+    fine_rows = run_sweep([cases[index] for index in kept], processes=processes, integrator=fine_integrator)
+    fine_seconds = time.perf_counter() - start
+    fine_rows = [fine_rows[index] for index in rank_rows(fine_rows, metric, maximize, nan_policy)]
+
+    return {"rows": fine_rows, "coarse_rows": coarse_rows, "coarse_runs": len(cases), "coarse_nan_runs": nan_runs,
+            "fine_runs": number_kept, "coarse_seconds": coarse_seconds, "fine_seconds": fine_seconds,
+            "estimated_full_fine_seconds": fine_seconds / number_kept * len(cases) if number_kept else np.nan}
+
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description="Screen a ramjet sweep coarsely and re-run the best cases finely")
+    parser.add_argument("--mass0", type=float, nargs="+", required=True, help="initial masses (kg)")
+    parser.add_argument("--velocity-mag", type=float, nargs="+", required=True, help="initial speeds (m/s)")
+    parser.add_argument("--angle-of-attack", type=float, nargs="+", required=True, help="angles of attack (degrees)")
+    parser.add_argument("--lifting-area", type=float, nargs="+", required=True, help="lifting areas (m^2)")
+    parser.add_argument("--intake-area", type=float, nargs="+", required=True, help="intake areas (m^2)")
+    parser.add_argument("--metric", choices=metric_names, default="max_altitude", help="metric to rank cases on")
+    parser.add_argument("--minimize", action="store_true", help="rank the smallest metric values first")
+    parser.add_argument("--keep", type=float, default=0.1, help="fraction of the cases re-run at full fidelity")
+    parser.add_argument("--coarse-step", type=float, default=10 * flight_model.dt,
+                        help="fixed time step of the coarse pass (s)")
+    parser.add_argument("--nan-policy", choices=nan_policies, default="last",
+                        help="where runs with a NaN metric are ranked, or drop them")
+    parser.add_argument("--fine-integrator", choices=integrator_names, default="euler",
+                        help="time stepping scheme of the fine pass")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--output", default="ramjet_screening.csv", help="CSV file to write the fine runs to")
+    arguments = parser.parse_args()
+
+    cases = build_grid(arguments.mass0, arguments.velocity_mag, arguments.angle_of_attack, arguments.lifting_area,
+                       arguments.intake_area)
+    screening = screen_cases(cases, metric=arguments.metric, maximize=not arguments.minimize,
+                             keep_fraction=arguments.keep, coarse_step=arguments.coarse_step,
+                             fine_integrator=arguments.fine_integrator, nan_policy=arguments.nan_policy,
+                             processes=arguments.processes)
+    write_sweep_table(screening["rows"], arguments.output)
+    print(f"Coarse pass: {screening['coarse_runs']} runs in {screening['coarse_seconds']:.2f} s, "
+          f"{screening['coarse_nan_runs']} with a NaN {arguments.metric} (nan policy {arguments.nan_policy})")
+    print(f"Fine pass: {screening['fine_runs']} runs in {screening['fine_seconds']:.2f} s "
+          f"(a full fine sweep would take about {screening['estimated_full_fine_seconds']:.2f} s)")
+    print(f"Wrote the {screening['fine_runs']} fine runs to {arguments.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# Global sensitivity analysis of the ramjet flight model. Sobol indices (first order and total) and Morris elementary
+# effect statistics say which of the uncertain coefficients and design parameters drive the maximum altitude and the
+# fuel burned. Every model evaluation goes through run_ensemble(), which steps thousands of craft at once with its own
+# in-place NumPy kernel of the model's forces (the same update as run_simulation(), with per-craft coefficients), and
+# the sample matrices are generated, flown and reduced to running sums one chunk at a time. Memory therefore depends
+# on the chunk size, never on the number of samples, so tens of thousands of samples run in one process.
+#
+# Example, from inside the Project folder:
+#     python ramjet_sensitivity.py --method sobol --samples 4096
+#     python ramjet_sensitivity.py --method morris --trajectories 500
+
+import argparse
+
+import numpy as np
+from scipy.stats import qmc
+
+import final_ramet_powered_flight_model as flight_model
+
+# Range every parameter is sampled over. specific_impulse_factor scales the model's specific_impulse.
+default_ranges = {
+    "lift_coefficient": (0.1, 0.4),
+    "drag_coefficient": (0.015, 0.035),
+    "specific_impulse_factor": (0.8, 1.2),
+    "intake_area": (0.2, 1.5),
+    "lifting_area": (20.0, 40.0),
+    "mass0": (15000.0, 25000.0),
+}
+# Model outputs the indices are computed for
+output_names = ("max_altitude", "fuel_burned")
+sensitivity_methods = ("sobol", "morris")
+
+
+# Function to fly rows of parameter values (in the order of ranges) as one ensemble, returning (rows, outputs)
+def evaluate_samples(samples, ranges, velocity_mag=300.0, angle_of_attack=5.0):
+    values = dict(zip(ranges, np.asarray(samples, dtype=float).T))
+    v0_horizontal, v0_vertical = flight_model.initial_velocity_components(velocity_mag, angle_of_attack)
+    with np.errstate(over="ignore", invalid="ignore"):  # divergent samples come back as NaN and are dropped
+        results = flight_model.run_ensemble(
+            v0_horizontal, v0_vertical, values["mass0"], values["lifting_area"], values["intake_area"],
+            store_history=False, lift_coefficient=values["lift_coefficient"],
+            drag_coefficient=values["drag_coefficient"],
+            specific_impulse=flight_model.specific_impulse * values["specific_impulse_factor"])
+        outputs = np.column_stack([results["max_altitude"], values["mass0"] - results["final_mass"]])
+    return outputs
+
+
+# Function to scale unit hypercube points to the parameter ranges
+def scale_to_ranges(points, ranges):
+    lower, upper = np.array(list(ranges.values()), dtype=float).T
+    return lower + points * (upper - lower)
+
+
+# Function to estimate Sobol first order and total indices with the Saltelli sampling scheme: base matrices A and B
+# from a scrambled Sobol sequence and, for every parameter i, the matrix AB_i of A with column i taken from B, costing
+# number_of_samples * (d + 2) flights. Base rows are processed chunk_size flights at a time and only running sums are
+# kept; first order indices use the Saltelli (2010) estimator and total indices the Jansen estimator. Rows where any
+# flight diverged are dropped. Returns the indices as (d, outputs) arrays and the number of rows used. evaluate
+# replaces the flight model: it takes rows of parameter values in the order of ranges and returns one column per
+# output_names, like evaluate_samples() does.
+def sobol_indices(number_of_samples, ranges=None, chunk_size=8192, seed=None, velocity_mag=300.0,
+                  angle_of_attack=5.0, evaluate=None):
+    ranges = default_ranges if ranges is None else ranges
+    if evaluate is None:
+        def evaluate(samples):
+            return evaluate_samples(samples, ranges, velocity_mag, angle_of_attack)
+    dimensions = len(ranges)
+    # Sobol points keep their balance properties in blocks of a power of two
+    base_rows_per_chunk = 2 ** int(np.floor(np.log2(max(1, chunk_size // (dimensions + 2)))))
+    sequence = qmc.Sobol(2 * dimensions, seed=seed)
+
+    shift = None
+    used_rows = 0
+    output_sum = np.zeros(len(output_names))
+    output_square_sum = np.zeros(len(output_names))
+    first_order_sum = np.zeros((dimensions, len(output_names)))
+    total_sum = np.zeros((dimensions, len(output_names)))
+    rows_done = 0
+    while rows_done < number_of_samples:
+        rows = min(base_rows_per_chunk, number_of_samples - rows_done)
+        points = sequence.random(base_rows_per_chunk)[:rows]
+        a_matrix = scale_to_ranges(points[:, :dimensions], ranges)
+        b_matrix = scale_to_ranges(points[:, dimensions:], ranges)
+        mixed = np.repeat(a_matrix[np.newaxis], dimensions, axis=0)  # AB_i for every i, (d, rows, d)
+        mixed[np.arange(dimensions), :, np.arange(dimensions)] = b_matrix.T
+        outputs = evaluate(np.vstack([a_matrix, b_matrix, mixed.reshape(-1, dimensions)]))
+        f_a = outputs[:rows]
+        f_b = outputs[rows:2 * rows]
+        f_mixed = outputs[2 * rows:].reshape(dimensions, rows, len(output_names))
+        rows_done += rows
+
+        finite = np.all(np.isfinite(f_a), axis=1) & np.all(np.isfinite(f_b), axis=1)
+        finite &= np.all(np.isfinite(f_mixed), axis=(0, 2))
+        f_a, f_b, f_mixed = f_a[finite], f_b[finite], f_mixed[:, finite]
+        if not len(f_a):
+            continue
+        if shift is None:
+            shift = np.mean(f_a, axis=0)  # centring the sums keeps the variance accurate
+        used_rows += len(f_a)
+        centred = np.vstack([f_a, f_b]) - shift
+        output_sum += centred.sum(axis=0)
+        output_square_sum += (centred ** 2).sum(axis=0)
+        first_order_sum += np.sum(f_b * (f_mixed - f_a), axis=1)
+        total_sum += 0.5 * np.sum((f_a - f_mixed) ** 2, axis=1)
+
+    if used_rows == 0:
+        raise ValueError("Every sample diverged, no indices can be computed")
+    count = 2 * used_rows
+    variance = output_square_sum / count - (output_sum / count) ** 2
+    return {"parameters": tuple(ranges), "outputs": output_names, "first_order": first_order_sum / used_rows / variance,
+            "total": total_sum / used_rows / variance, "rows_used": used_rows,
+            "flights": rows_done * (dimensions + 2)}
+
+
+# Function to compute Morris elementary effect statistics from number_of_trajectories one-at-a-time trajectories on
+# a levels-level grid, each of d + 1 flights. Effects are scaled by the parameter ranges so they are comparable
+# between parameters, and chunk_size flights are flown at a time. Returns mu_star (mean absolute effect), mu and
+# sigma as (d, outputs) arrays. evaluate replaces the flight model as in sobol_indices().
+def morris_indices(number_of_trajectories, ranges=None, levels=4, chunk_size=8192, seed=None, velocity_mag=300.0,
+                   angle_of_attack=5.0, evaluate=None):
+    ranges = default_ranges if ranges is None else ranges
+    if evaluate is None:
+        def evaluate(samples):
+            return evaluate_samples(samples, ranges, velocity_mag, angle_of_attack)
+    dimensions = len(ranges)
+    rng = np.random.default_rng(seed)
+    delta = levels / (2 * (levels - 1))
+    trajectories_per_chunk = max(1, chunk_size // (dimensions + 1))
+
+    effect_sum = np.zeros((dimensions, len(output_names)))
+    absolute_sum = np.zeros((dimensions, len(output_names)))
+    square_sum = np.zeros((dimensions, len(output_names)))
+    counts = np.zeros((dimensions, len(output_names)))
+    trajectories_done = 0
+    while trajectories_done < number_of_trajectories:
+        trajectories = min(trajectories_per_chunk, number_of_trajectories - trajectories_done)
+        # Random start on the lower part of the grid, then one step of +delta per parameter in a random order
+        start = rng.integers(0, levels // 2, (trajectories, dimensions)) / (levels - 1)
+        order = np.argsort(rng.random((trajectories, dimensions)), axis=1)
+        steps = np.zeros((trajectories, dimensions + 1, dimensions))
+        steps[np.arange(trajectories)[:, np.newaxis], np.arange(1, dimensions + 1), order] = delta
+        points = start[:, np.newaxis] + np.cumsum(steps, axis=1)
+        outputs = evaluate(scale_to_ranges(points.reshape(-1, dimensions), ranges)).reshape(
+            trajectories, dimensions + 1, len(output_names))
+        trajectories_done += trajectories
+
+        # Step k of a trajectory moves parameter order[:, k], its effect is the output change over delta
+        effects = np.diff(outputs, axis=1) / delta  # (trajectories, d, outputs)
+        parameter_effects = np.empty_like(effects)
+        parameter_effects[np.arange(trajectories)[:, np.newaxis], order] = effects
+        finite = np.isfinite(parameter_effects)
+        parameter_effects = np.where(finite, parameter_effects, 0.0)
+        effect_sum += parameter_effects.sum(axis=0)
+        absolute_sum += np.abs(parameter_effects).sum(axis=0)
+        square_sum += (parameter_effects ** 2).sum(axis=0)
+        counts += finite.sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu = effect_sum / counts
+        sigma = np.sqrt(np.maximum(square_sum / counts - mu ** 2, 0.0) * counts / (counts - 1))
+        return {"parameters": tuple(ranges), "outputs": output_names, "mu_star": absolute_sum / counts, "mu": mu,
+                "sigma": sigma, "flights": trajectories_done * (dimensions + 1)}
+
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description="Sobol or Morris sensitivity analysis of the ramjet flight model")
+    parser.add_argument("--method", choices=sensitivity_methods, default="sobol", help="sensitivity method")
+    parser.add_argument("--samples", type=int, default=4096, help="Sobol base samples")
+    parser.add_argument("--trajectories", type=int, default=500, help="Morris trajectories")
+    parser.add_argument("--chunk-size", type=int, default=8192, help="flights evaluated together per ensemble")
+    parser.add_argument("--velocity-mag", type=float, default=300.0, help="initial speed (m/s)")
+    parser.add_argument("--angle-of-attack", type=float, default=5.0, help="angle of attack (degrees)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    arguments = parser.parse_args()
+
+    if arguments.method == "sobol":
+        indices = sobol_indices(arguments.samples, chunk_size=arguments.chunk_size, seed=arguments.seed,
+                                velocity_mag=arguments.velocity_mag, angle_of_attack=arguments.angle_of_attack)
+        columns = ("first_order", "total")
+    else:
+        indices = morris_indices(arguments.trajectories, chunk_size=arguments.chunk_size, seed=arguments.seed,
+                                 velocity_mag=arguments.velocity_mag, angle_of_attack=arguments.angle_of_attack)
+        columns = ("mu_star", "sigma")
+    print(f"{arguments.method} indices from {indices['flights']} flights")
+    for output_index, output in enumerate(indices["outputs"]):
+        print(f"{output}:")
+        for parameter_index, parameter in enumerate(indices["parameters"]):
+            print(f"  {parameter:>24}: " + ", ".join(
+                f"{column} {indices[column][parameter_index, output_index]:.4g}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
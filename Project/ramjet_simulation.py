@@ -0,0 +1,181 @@
+# Headless entry point for the ramjet flight models. simulate() takes one parameter set and returns the result
+# arrays without prompting for input or importing matplotlib, so it can be called thousands of times from a batch
+# job. Running this file reads parameter sets from a JSON or CSV file and saves each run to its own .npz file, or
+# with --format npy to its own directory of memory-mappable .npy files and a manifest (see result_store).
+#
+# A parameter set is a mapping with the keys in parameter_names, for example
+#     {"mass0": 20000, "velocity_mag": 300, "angle_of_attack": 5, "lifting_area": 31, "intake_area": 0.8}
+# A JSON file may hold a single parameter set or a list of them, a CSV file holds one parameter set per row. The
+# solve_ivp model also needs the mass of fuel on board, "fuel_mass", for its fuel_exhausted event.
+#
+# Example, from inside the Project folder:
+#     python ramjet_simulation.py runs.json --model final --output-dir results
+#
+# With --checkpoint-dir each run of the final model checkpoints its progress to its own file there, and rerunning the
+# same command with --resume skips runs whose .npz is already written and continues interrupted runs from their last
+# checkpoint.
+
+import argparse
+import csv
+import json
+import os
+
+import numpy as np
+
+import final_ramet_powered_flight_model as final_model
+import result_store
+from simulation_checkpoint import SimulationCheckpoint
+from trajectory_recorder import TrajectoryRecorder, recorder_modes
+import WIP_ramjet_powered_flight_solveIVP_method as solve_ivp_model
+
+# Keys every parameter set has to provide
+parameter_names = ("mass0", "velocity_mag", "angle_of_attack", "lifting_area", "intake_area")
+# Further keys only some models need, kept in any parameter set that provides them
+model_parameter_names = {"final": (), "solve_ivp": ("fuel_mass",)}
+optional_parameter_names = ("fuel_mass",)
+# Models simulate() can run
+model_names = ("final", "solve_ivp")
+# Ways the command line saves runs
+output_formats = ("npz", "npy")
+
+
+# Function to check a parameter set and convert its values to floats. With a model the keys that model needs are
+# required too, and an empty value (a blank CSV cell) counts as missing.
+def validate_parameters(params, model=None):
+    given = tuple(name for name in optional_parameter_names if params.get(name) not in (None, ""))
+    missing = ([name for name in parameter_names if name not in params] +
+               [name for name in model_parameter_names.get(model, ()) if name not in given])
+    if missing:
+        raise KeyError(f"Parameter set is missing {', '.join(missing)}")
+    try:
+        return {name: float(params[name]) for name in parameter_names + given}
+    except (TypeError, ValueError):
+        raise ValueError(f"Parameter values must be numeric, got {params}")
+
+
+# Function to run one flight from a parameter set, returning a dictionary of result arrays. integrator picks the
+# time stepping scheme of the final model (see final_ramet_powered_flight_model.integrator_names), and an optional
+# TrajectoryRecorder bounds how much of its time series is kept, an optional SimulationCheckpoint saves its progress
+# and an optional progress function is called with the fraction of the flight done.
+# plot shows the run's figures, or with a plot_file saves them there without opening a window. ivp_method is the
+# solve_ivp method of the solve_ivp model (see WIP_ramjet_powered_flight_solveIVP_method.solver_methods). Its time
+# series are sampled at the solver's own steps unless sample_spacing asks for samples every sample_spacing seconds;
+# either way results["solution"] keeps the dense output, so sample_flight() can resample on demand. The command line
+# and the job server export on a sample_spacing grid.
+def simulate(params, model="final", plot=False, integrator="euler", recorder=None, checkpoint=None, plot_file=None,
+             ivp_method="RK45", sample_spacing=None, progress=None):
+    params = validate_parameters(params, model)
+
+    if model == "final":
+        v0_horizontal, v0_vertical = final_model.initial_velocity_components(params["velocity_mag"],
+                                                                             params["angle_of_attack"])
+        results = final_model.run_simulation(v0_horizontal, v0_vertical, params["mass0"], params["lifting_area"],
+                                             params["intake_area"], integrator=integrator, recorder=recorder,
+                                             checkpoint=checkpoint, progress=progress)
+        if plot or plot_file is not None:
+            final_model.plot_results(results["time_values"], results["acceleration_values"],
+                                     results["velocity_values"], results["position_values"],
+                                     results["thrust_values"], results["delta_mass_values"], params["mass0"],
+                                     file_name=plot_file)
+    elif model == "solve_ivp":
+        results = solve_ivp_model.solve_flight(params["mass0"], params["velocity_mag"], params["angle_of_attack"],
+                                               params["lifting_area"], params["intake_area"], params["fuel_mass"],
+                                               method=ivp_method, sample_spacing=sample_spacing)
+        if plot or plot_file is not None:
+            solve_ivp_model.plot_flight(results, file_name=plot_file)
+    else:
+        raise ValueError(f"Unknown model '{model}', expected one of {model_names}")
+
+    return results
+
+
+# Function to read a list of parameter sets from a JSON or CSV file
+def load_parameter_sets(file_name):
+    extension = os.path.splitext(file_name)[1].lower()
+    with open(file_name, newline="") as file:
+        if extension == ".json":
+            parameter_sets = json.load(file)
+            if isinstance(parameter_sets, dict):
+                parameter_sets = [parameter_sets]
+        elif extension == ".csv":
+            parameter_sets = list(csv.DictReader(file))
+        else:
+            raise ValueError(f"Parameter file must be .json or .csv, got '{file_name}'")
+    return [validate_parameters(params) for params in parameter_sets]
+
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description="Run ramjet flight simulations from a JSON or CSV parameter file")
+    parser.add_argument("parameter_file", help="JSON or CSV file of parameter sets")
+    parser.add_argument("--model", choices=model_names, default="final", help="which flight model to run")
+    parser.add_argument("--output-dir", default="ramjet_runs", help="directory to write the runs to")
+    parser.add_argument("--format", choices=output_formats, default="npz",
+                        help="one .npz per run, or one directory of memory-mappable .npy files per run")
+    parser.add_argument("--integrator", choices=final_model.integrator_names, default="euler",
+                        help="time stepping scheme for the final model")
+    parser.add_argument("--ivp-method", choices=solve_ivp_model.solver_methods, default="RK45",
+                        help="solve_ivp method for the solve_ivp model")
+    parser.add_argument("--sample-spacing", type=float, default=final_model.dt,
+                        help="seconds between the saved samples of the solve_ivp model's dense output")
+    parser.add_argument("--recorder", choices=recorder_modes, default=None,
+                        help="bound the stored time series of the final model (default: keep every step)")
+    parser.add_argument("--record-every", type=int, default=1, help="steps per kept sample or envelope bucket")
+    parser.add_argument("--record-capacity", type=int, default=None, help="most samples the recorder holds")
+    parser.add_argument("--checkpoint-dir", default=None,
+                        help="directory for per-run checkpoints of the final model (default: no checkpoints)")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="integrator steps between checkpoints")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip runs already written and continue interrupted runs from their checkpoints")
+    parser.add_argument("--plot", action="store_true", help="plot every run (loads matplotlib)")
+    parser.add_argument("--plot-dir", default=None,
+                        help="save every run's figures to this directory instead of showing them")
+    parser.add_argument("--plot-format", choices=("png", "svg"), default="png", help="file type for --plot-dir")
+    arguments = parser.parse_args()
+
+    parameter_sets = load_parameter_sets(arguments.parameter_file)
+    os.makedirs(arguments.output_dir, exist_ok=True)
+    if arguments.checkpoint_dir is not None:
+        os.makedirs(arguments.checkpoint_dir, exist_ok=True)
+    if arguments.plot_dir is not None:
+        os.makedirs(arguments.plot_dir, exist_ok=True)
+    for index, params in enumerate(parameter_sets):
+        if arguments.format == "npz":
+            output_path = os.path.join(arguments.output_dir, f"run_{index:05d}.npz")
+            finished = os.path.exists(output_path)
+        else:
+            output_path = os.path.join(arguments.output_dir, f"run_{index:05d}")
+            finished = os.path.exists(os.path.join(output_path, result_store.manifest_name))
+        if arguments.resume and finished:
+            continue
+        checkpoint = None
+        if arguments.checkpoint_dir is not None and arguments.model == "final":
+            checkpoint = SimulationCheckpoint(os.path.join(arguments.checkpoint_dir, f"run_{index:05d}.checkpoint.npz"),
+                                              every=arguments.checkpoint_every, resume=arguments.resume)
+        recorder = None
+        if arguments.recorder is not None:
+            recorder = TrajectoryRecorder(arguments.recorder, every=arguments.record_every,
+                                          capacity=arguments.record_capacity)
+        plot_file = None
+        if arguments.plot_dir is not None:
+            plot_file = os.path.join(arguments.plot_dir, f"run_{index:05d}.{arguments.plot_format}")
+        results = simulate(params, model=arguments.model, plot=arguments.plot, integrator=arguments.integrator,
+                           recorder=recorder, checkpoint=checkpoint, plot_file=plot_file,
+                           ivp_method=arguments.ivp_method, sample_spacing=arguments.sample_spacing)
+        # Event times from the solve_ivp model are saved as one array per event
+        events = {f"event_{name}": times for name, times in results.get("events", {}).items()}
+        if arguments.format == "npz":
+            # Scalar results are saved as 0-d arrays, with an empty string standing in for a None termination_event
+            arrays = {name: value for name, value in results.items() if isinstance(value, np.ndarray)}
+            scalars = {name: "" if value is None else value
+                       for name, value in result_store.scalar_results(results).items()}
+            np.savez(output_path, **arrays, **scalars, **events, **params)
+        else:
+            result_store.save_run(output_path, {**results, **events}, params)
+        if checkpoint is not None:
+            os.remove(checkpoint.path)  # the run is saved, its checkpoint is no longer needed
+    print(f"Wrote {len(parameter_sets)} runs to {arguments.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
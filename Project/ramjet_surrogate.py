@@ -0,0 +1,184 @@
+# Surrogate model of the ramjet flight model built from parameter sweep results. Once a sweep has covered a design
+# space, most questions ("max altitude for intake_area=0.8, lifting_area=28") are interpolation queries. A
+# RamjetSurrogate fits a radial basis function interpolant of every summary metric over the swept parameters, measures
+# its own error on runs held out of the fit, and answers queries inside the trusted region (inside the swept ranges
+# and close to a swept case) from the interpolant. Queries outside it are simulated instead.
+#
+# Example, from inside the Project folder:
+#     python ramjet_surrogate.py sweep.csv --mass0 20000 --velocity-mag 300 --angle-of-attack 5 \
+#         --lifting-area 28 --intake-area 0.8
+
+import argparse
+
+import numpy as np
+from scipy.interpolate import RBFInterpolator
+from scipy.spatial import cKDTree
+
+from ramjet_parameter_sweep import parameter_names, metric_names, read_sweep_table, run_case, run_sweep
+
+
+class RamjetSurrogate:
+    """
+    RBF interpolants of the sweep metrics over the parameters that vary in the sweep
+    :param rows:            list(dict) :: sweep rows with every parameter and metric, as run_sweep() returns them
+    :param holdout_fraction: float, optional :: share of the rows held out to measure the error, 0 to skip
+    :param kernel:          str, optional :: RBFInterpolator kernel
+    :param smoothing:       float, optional :: RBFInterpolator smoothing, 0 interpolates the runs exactly
+    :param trust_radius:    float, optional :: furthest a query may be from a swept case, in parameters scaled to
+                            [0, 1] over their swept range. Defaults to twice the median distance between neighbouring
+                            cases
+    :param integrator:      str, optional :: integrator used for queries outside the trusted region
+    :param seed:            int, optional :: seed for picking the held out rows
+    """
+
+    def __init__(self, rows, holdout_fraction=0.2, kernel="thin_plate_spline", smoothing=0.0, trust_radius=None,
+                 integrator="euler", seed=None):
+        parameters = np.array([[row[name] for name in parameter_names] for row in rows], dtype=float)
+        metrics = np.array([[row[name] for name in metric_names] for row in rows], dtype=float)
+        self.kernel = kernel
+        self.smoothing = smoothing
+        self.integrator = integrator
+
+        # Parameters held constant in the sweep are not interpolated over, queries have to match them
+        self.lower = parameters.min(axis=0)
+        self.upper = parameters.max(axis=0)
+        self.varying = self.upper > self.lower
+        if not np.any(self.varying):
+            raise ValueError("The sweep does not vary any parameter")
+        points = self.scale(parameters)
+
+        # Error on held out runs, measured with interpolants fitted to the remaining runs
+        self.errors = {}
+        if holdout_fraction > 0:
+            rng = np.random.default_rng(seed)
+            held_out = rng.permutation(len(rows))[:int(round(holdout_fraction * len(rows)))]
+            training = np.setdiff1d(np.arange(len(rows)), held_out)
+            interpolants = self.fit(points[training], metrics[training])
+            for column, name in enumerate(metric_names):
+                actual = metrics[held_out, column]
+                if name not in interpolants or not np.any(np.isfinite(actual)):
+                    continue
+                finite = np.isfinite(actual)
+                error = interpolants[name](points[held_out][finite]) - actual[finite]
+                spread = np.ptp(metrics[np.isfinite(metrics[:, column]), column])
+                self.errors[name] = {"rmse": float(np.sqrt(np.mean(error ** 2))),
+                                     "max_abs": float(np.max(np.abs(error))),
+                                     "relative_rmse": float(np.sqrt(np.mean(error ** 2)) / spread) if spread else 0.0,
+                                     "held_out_runs": int(finite.sum())}
+
+        # Final interpolants use every run
+        self.metrics = metrics
+        self.interpolants = self.fit(points, metrics)
+        self.tree = cKDTree(points)
+        if trust_radius is None:
+            distances = self.tree.query(points, k=2)[0][:, 1]
+            trust_radius = 2.0 * float(np.median(distances))
+        self.trust_radius = trust_radius
+
+    @classmethod
+    def from_table(cls, file_name, **options):
+        return cls(read_sweep_table(file_name), **options)
+
+    def scale(self, parameters):
+        return (parameters[:, self.varying] - self.lower[self.varying]) / (self.upper - self.lower)[self.varying]
+
+    def fit(self, points, metrics):
+        # One interpolant per metric over the runs where it is finite (time_to_ground is NaN for runs that never
+        # come down), metrics with too few finite runs have none
+        interpolants = {}
+        for column, name in enumerate(metric_names):
+            finite = np.isfinite(metrics[:, column])
+            if finite.sum() <= points.shape[1] + 1:
+                continue
+            interpolants[name] = RBFInterpolator(points[finite], metrics[finite, column], kernel=self.kernel,
+                                                 smoothing=self.smoothing)
+        return interpolants
+
+    def trusted(self, cases):
+        """
+        Checks which cases the surrogate answers itself
+        :param cases:   array-like(n, 5) :: cases in the order of parameter_names
+        :return:        NumPy array(n) of bool :: True where the case is inside the swept ranges, matches the
+                        parameters held constant and lies within trust_radius of a swept case
+        """
+        cases = np.atleast_2d(np.asarray(cases, dtype=float))
+        fixed = ~self.varying
+        inside = np.all(np.isclose(cases[:, fixed], self.lower[fixed]), axis=1)
+        inside &= np.all((cases[:, self.varying] >= self.lower[self.varying]) &
+                         (cases[:, self.varying] <= self.upper[self.varying]), axis=1)
+        distances = self.tree.query(self.scale(cases))[0]
+        return inside & (distances <= self.trust_radius)
+
+    def predict(self, cases):
+        """
+        Evaluates the interpolants without any trust check
+        :param cases:   array-like(n, 5) :: cases in the order of parameter_names
+        :return:        dict :: metric name to NumPy array(n), NaN for metrics without an interpolant and where the
+                        metric is NaN for the nearest swept case
+        """
+        cases = np.atleast_2d(np.asarray(cases, dtype=float))
+        points = self.scale(cases)
+        nearest = self.tree.query(points)[1]
+        predictions = {}
+        for column, name in enumerate(metric_names):
+            if name in self.interpolants:
+                predictions[name] = np.where(np.isnan(self.metrics[nearest, column]), np.nan,
+                                             self.interpolants[name](points))
+            else:
+                predictions[name] = np.full(len(cases), np.nan)
+        return predictions
+
+    def query(self, cases, processes=None):
+        """
+        Answers cases from the surrogate where it is trusted and by simulation elsewhere
+        :param cases:       array-like(n, 5) :: cases in the order of parameter_names
+        :param processes:   int, optional :: worker processes for the simulated cases
+        :return:            list(dict) :: one row per case like run_sweep() returns, with "source" set to
+                            "surrogate" or "simulation"
+        """
+        cases = np.atleast_2d(np.asarray(cases, dtype=float))
+        trusted = self.trusted(cases)
+        predictions = self.predict(cases)
+        rows = []
+        for index, case in enumerate(cases):
+            row = dict(zip(parameter_names, case.tolist()))
+            row.update({name: float(predictions[name][index]) for name in metric_names})
+            row["source"] = "surrogate"
+            rows.append(row)
+
+        simulate = ~trusted
+        if np.any(simulate):
+            if np.count_nonzero(simulate) == 1:
+                simulated = [run_case(tuple(cases[simulate][0]), self.integrator)]
+            else:
+                simulated = run_sweep(cases[simulate].tolist(), processes=processes, integrator=self.integrator)
+            for index, row in zip(np.flatnonzero(simulate), simulated):
+                rows[index] = {**row, "source": "simulation"}
+        return rows
+
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description="Answer ramjet design queries from a surrogate of a sweep table")
+    parser.add_argument("sweep_table", help="CSV file written by ramjet_parameter_sweep.py")
+    parser.add_argument("--mass0", type=float, required=True, help="initial mass (kg)")
+    parser.add_argument("--velocity-mag", type=float, required=True, help="initial speed (m/s)")
+    parser.add_argument("--angle-of-attack", type=float, required=True, help="angle of attack (degrees)")
+    parser.add_argument("--lifting-area", type=float, required=True, help="lifting area (m^2)")
+    parser.add_argument("--intake-area", type=float, required=True, help="intake area (m^2)")
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of the sweep held out to measure error")
+    arguments = parser.parse_args()
+
+    surrogate = RamjetSurrogate.from_table(arguments.sweep_table, holdout_fraction=arguments.holdout, seed=0)
+    for name, error in surrogate.errors.items():
+        print(f"{name}: held out RMSE {error['rmse']:.4g} ({100 * error['relative_rmse']:.2f}% of range), "
+              f"max error {error['max_abs']:.4g} over {error['held_out_runs']} runs")
+    row = surrogate.query([[arguments.mass0, arguments.velocity_mag, arguments.angle_of_attack,
+                            arguments.lifting_area, arguments.intake_area]])[0]
+    print(f"Answered by {row['source']}:")
+    for name in metric_names:
+        print(f"  {name}: {row[name]:.6g}")
+
+
+if __name__ == "__main__":
+    main()
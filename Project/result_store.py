@@ -0,0 +1,79 @@
+# On-disk storage of ramjet runs for later analysis. save_run() writes every time series of a run to its own .npy
+# file in a run directory, next to a JSON manifest holding the parameter set, the scalar results and the shape and
+# dtype of every array. load_run() opens the arrays memory-mapped, so hundreds of runs can be opened at once and
+# sliced without reading whole trajectories into RAM (an .npz archive cannot be memory-mapped, hence one file per
+# array). The manifest is written last, so a directory without one holds an unfinished run and is ignored.
+#
+# Example, from inside the Project folder:
+#     for name, run in open_runs("ramjet_runs"):
+#         print(name, run["parameters"]["intake_area"], run["position_values"][::1000, 1].max())
+
+import json
+import os
+
+import numpy as np
+
+manifest_name = "manifest.json"
+
+
+# Function to convert a scalar result to a JSON value, returning None for anything that is not a plain scalar
+def json_scalar(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    return None
+
+
+# Function to pick the results that are plain scalars (final_mass, rhs_evaluations, termination_event, ...) as JSON
+# values. None is kept, it is the termination_event of a run that no terminal event stopped.
+def scalar_results(results):
+    return {name: json_scalar(value) for name, value in results.items()
+            if value is None or json_scalar(value) is not None}
+
+
+# Function to save one run to a directory of .npy files and a manifest. NumPy arrays in results are saved as arrays,
+# plain scalars go into the manifest and anything else is left out, as are the values of parameters that are not JSON
+# scalars.
+def save_run(directory, results, parameters=None):
+    os.makedirs(directory, exist_ok=True)
+    arrays = {}
+    for name, value in results.items():
+        if isinstance(value, np.ndarray):
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(value))
+            arrays[name] = {"shape": list(value.shape), "dtype": value.dtype.str}
+    values = scalar_results(results)
+
+    manifest = {"parameters": {name: json_scalar(value) for name, value in (parameters or {}).items()},
+                "values": values, "arrays": arrays}
+    temporary_path = os.path.join(directory, manifest_name + ".tmp")
+    with open(temporary_path, "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(temporary_path, os.path.join(directory, manifest_name))
+
+
+# Function to read a run's manifest
+def read_manifest(directory):
+    with open(os.path.join(directory, manifest_name)) as file:
+        return json.load(file)
+
+
+# Function to open a run saved by save_run(). Returns a dictionary with the arrays (memory-mapped unless mmap_mode is
+# None), the scalar results and the parameter set under "parameters", so it can be used like the results of the model
+# that produced it.
+def load_run(directory, mmap_mode="r"):
+    manifest = read_manifest(directory)
+    run = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+           for name in manifest["arrays"]}
+    run.update(manifest["values"])
+    run["parameters"] = manifest["parameters"]
+    return run
+
+
+# Function to iterate over every finished run below a directory, yielding (run directory name, run) pairs in name
+# order. Runs are opened one at a time, memory-mapped, as the loop reaches them.
+def open_runs(root, mmap_mode="r"):
+    for name in sorted(os.listdir(root)):
+        directory = os.path.join(root, name)
+        if os.path.isfile(os.path.join(directory, manifest_name)):
+            yield name, load_run(directory, mmap_mode=mmap_mode)
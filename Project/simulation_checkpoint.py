@@ -0,0 +1,59 @@
+# Periodic checkpoints for long ramjet simulations. The integrators in final_ramet_powered_flight_model keep their
+# state in local variables, so a crash or a preempted job used to lose the whole run. Handing run_simulation() a
+# SimulationCheckpoint makes the integrator write its state vector, mass, loop position and the partially filled
+# result arrays to a single uncompressed .npz file every few steps, and with resume=True a restarted run carries on
+# from the last checkpoint instead of starting over. The file is written to a temporary name and renamed into place,
+# so a kill part way through a write leaves the previous checkpoint intact.
+
+import json
+import os
+
+import numpy as np
+
+
+class SimulationCheckpoint:
+    """
+    Where and how often an integrator checkpoints
+    :param path:    str :: checkpoint file to write (and resume from)
+    :param every:   int, optional :: steps between checkpoints
+    :param resume:  bool, optional :: continue from the checkpoint at path if one exists
+    """
+
+    def __init__(self, path, every=1000, resume=False):
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        self.path = path
+        self.every = every
+        self.resume = resume
+
+    def due(self, steps_done):
+        return steps_done % self.every == 0
+
+    def save(self, run_parameters, **arrays):
+        """
+        Writes a checkpoint atomically
+        :param run_parameters:  dict :: values identifying the run, checked again on resume
+        :param arrays:          NumPy arrays or numbers making up the integrator and recorder state
+        """
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "wb") as file:
+            np.savez(file, run_parameters=np.array(json.dumps(run_parameters, sort_keys=True)), **arrays)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self.path)
+
+    def load(self, run_parameters):
+        """
+        Returns the saved arrays when resuming from an existing checkpoint of the same run, otherwise None
+        :param run_parameters:  dict :: values identifying the run, must match the ones saved
+        :return:                dict or None :: the arrays passed to save()
+        """
+        if not self.resume or not os.path.exists(self.path):
+            return None
+        with np.load(self.path) as checkpoint:
+            arrays = {name: checkpoint[name] for name in checkpoint.files}
+        saved = json.loads(str(arrays.pop("run_parameters")))
+        current = json.loads(json.dumps(run_parameters, sort_keys=True))
+        if saved != current:
+            raise ValueError(f"Checkpoint {self.path} belongs to a different run: {saved} != {current}")
+        return arrays
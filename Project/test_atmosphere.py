@@ -0,0 +1,35 @@
+# Tests of the shared atmosphere lookup, run with python -m pytest from inside the Project folder
+
+import numpy as np
+
+from atmosphere import Atmosphere, data_table
+
+table_altitudes = np.array(data_table["Altitude (m)"], dtype=float)
+table_densities = np.array(data_table["Density (kg/m^3)"], dtype=float)
+# Altitudes between table breakpoints, where linear and log-linear interpolation differ
+mid_breakpoint_altitudes = np.array([500.0, 12345.0, 35000.0, 45000.0, 65000.0])
+
+
+def test_linear_lookup_matches_np_interp():
+    atmosphere = Atmosphere()
+    altitudes = np.linspace(-2000.0, 95000.0, 977)
+    expected = np.interp(altitudes, table_altitudes, table_densities)
+    np.testing.assert_allclose(atmosphere(altitudes), expected, rtol=1e-12)
+    np.testing.assert_allclose([atmosphere(altitude) for altitude in altitudes], expected, rtol=1e-12)
+
+
+def test_log_lookup_interpolates_log_density_of_the_table():
+    linear = Atmosphere()
+    logarithmic = Atmosphere(log_interpolation=True)
+    # Only the top breakpoint has zero density, and the altitudes tested all lie below it
+    log_densities = np.log(np.where(table_densities > 0, table_densities, 1.0))
+    expected = np.exp(np.interp(mid_breakpoint_altitudes, table_altitudes, log_densities))
+    np.testing.assert_allclose(logarithmic(mid_breakpoint_altitudes), expected, rtol=1e-12)
+    np.testing.assert_allclose([logarithmic(altitude) for altitude in mid_breakpoint_altitudes], expected, rtol=1e-12)
+    assert np.all(np.abs(logarithmic(mid_breakpoint_altitudes) - linear(mid_breakpoint_altitudes)) > 1e-3 * expected)
+
+
+def test_log_lookup_keeps_zero_density_cell_linear():
+    logarithmic = Atmosphere(log_interpolation=True)
+    assert np.isclose(logarithmic(85000.0), np.interp(85000.0, table_altitudes, table_densities), rtol=1e-12)
+    assert logarithmic(95000.0) == 0.0
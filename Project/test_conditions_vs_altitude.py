@@ -1,24 +1,24 @@
 # Air density data table pulled from Nasa's website
+#
+# Run as is this prints the thrust at a single test condition. With --envelope it evaluates thrust and fuel flow over a
+# whole altitude x velocity x intake area grid in one broadcast pass and saves the tables for the simulators to load
+# (see thrust_envelope), e.g. from inside the Project folder:
+#     python test_conditions_vs_altitude.py --envelope envelope.npz --velocity-range 0 6000 601
+import argparse
+
 import numpy as np
 
+from atmosphere import standard_atmosphere
+from thrust_envelope import save_envelope
+
 g = 9.81  # Gravitational constant (m/s^2)
 lift_coefficient = 0.5  # Lift coefficient *can't seem to find a good source to base this on for lifting body craft so this is bordering on being made up, simply a guess based on range of realworld values that exist.*
 y = 100000
 velocity = 100
-# Air density data table pulled from Nasa's website
-data_table = {
-    "Altitude (m)": [-1000, 0, 1000, 2000, 3000, 4000, 5000, 6000, 7000, 8000, 9000, 10000, 15000, 20000, 25000, 30000,
-                     40000, 50000, 60000, 70000, 80000, 90000],
-    "Density (kg/m^3)": [1.347, 1.225, 1.112, 1.007, 0.9093, 0.8194, 0.7364, 0.6601, 0.5900, 0.5258, 0.4671, 0.4135,
-                         0.1948, 0.08891, 0.04008, 0.01841, 0.003996, 0.001027, 0.0003097, 0.00008283, 0.00001846, 0.0]
-}
 
 def air_density_func(y):
-    # Retrieve altitude and density data from the data table
-    altitudes = data_table["Altitude (m)"]
-    densities = data_table["Density (kg/m^3)"]
-    # Interpolate air density based on altitude
-    return np.interp(y, altitudes, densities)
+    # Look up air density in the shared, precomputed atmosphere table
+    return standard_atmosphere(y)
 
 # Function to calculate thrust based on air density, velocity, and intake area
 def thrust_function(air_density, velocity, intake_area):
@@ -37,4 +37,42 @@ def thrust_function(air_density, velocity, intake_area):
     T = ((mass_flow_rate_of_fuel * g)*3200)
     return T, mass_flow_rate_of_fuel
 
-print(thrust_function(air_density_func(y), 100, 1))
\ No newline at end of file
+
+# Function to evaluate the thrust and fuel flow over every combination of the given altitudes, velocities and intake
+# areas. The axes are broadcast against each other, so the whole grid is a single NumPy pass and both tables come out
+# as (altitude, velocity, intake area) arrays.
+def envelope_tables(altitudes, velocities, intake_areas):
+    altitudes = np.asarray(altitudes, dtype=float)
+    velocities = np.asarray(velocities, dtype=float)
+    intake_areas = np.asarray(intake_areas, dtype=float)
+    air_density = air_density_func(altitudes)[:, np.newaxis]
+    thrust, fuel_flow = thrust_function(air_density[..., np.newaxis], velocities[np.newaxis, :, np.newaxis],
+                                        intake_areas[np.newaxis, np.newaxis, :])
+    return {"altitudes": altitudes, "velocities": velocities, "intake_areas": intake_areas, "thrust": thrust,
+            "fuel_flow": fuel_flow}
+
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description="Thrust at a test condition, or a full thrust envelope table")
+    parser.add_argument("--envelope", default=None, help="write the envelope tables to this .npz file")
+    parser.add_argument("--altitude-range", type=float, nargs=3, default=[-1000, 90000, 92],
+                        metavar=("START", "STOP", "POINTS"), help="altitude axis (m)")
+    parser.add_argument("--velocity-range", type=float, nargs=3, default=[0, 6000, 601],
+                        metavar=("START", "STOP", "POINTS"), help="velocity axis (m/s)")
+    parser.add_argument("--intake-range", type=float, nargs=3, default=[0.1, 1.5, 15],
+                        metavar=("START", "STOP", "POINTS"), help="intake area axis (m^2)")
+    arguments = parser.parse_args()
+
+    if arguments.envelope is None:
+        print(thrust_function(air_density_func(y), velocity, 1))
+        return
+    axes = [np.linspace(start, stop, int(points)) for start, stop, points in
+            (arguments.altitude_range, arguments.velocity_range, arguments.intake_range)]
+    envelope = envelope_tables(*axes)
+    save_envelope(envelope, arguments.envelope)
+    print(f"Wrote {envelope['thrust'].size} thrust and fuel flow points to {arguments.envelope}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,138 @@
+# Tests of the integrators of the final ramjet model, run with python -m pytest from inside the Project folder
+
+import numpy as np
+import pytest
+
+import final_ramet_powered_flight_model as flight_model
+
+
+def fly(angle_of_attack, integrator, **settings):
+    v0_horizontal, v0_vertical = flight_model.initial_velocity_components(300.0, angle_of_attack)
+    return flight_model.run_simulation(v0_horizontal, v0_vertical, 20000.0, 31.0, 0.8, integrator=integrator,
+                                       **settings)
+
+
+@pytest.mark.parametrize("angle_of_attack", [5.0, 10.0])
+def test_rk45_defaults_match_tight_tolerance_reference(angle_of_attack):
+    reference = fly(angle_of_attack, "rk45", rtol=1e-11, atol=1e-11)["final_position"][1]
+    rk45 = fly(angle_of_attack, "rk45")
+    euler = fly(angle_of_attack, "euler")
+    assert abs(rk45["final_position"][1] - reference) < 0.1
+    assert abs(rk45["final_position"][1] - reference) < abs(euler["final_position"][1] - reference)
+    assert rk45["rhs_evaluations"] < euler["rhs_evaluations"]
+
+
+def test_breakpoint_crossing():
+    spacing = (-1000.0, 1e-3, 91)
+    assert flight_model.atmosphere_breakpoint_crossed(1500.0, 2600.0, *spacing) == 2000.0
+    assert flight_model.atmosphere_breakpoint_crossed(2600.0, 1500.0, *spacing) == 2000.0
+    assert flight_model.atmosphere_breakpoint_crossed(1500.0, 1900.0, *spacing) is None
+    # A move starting on a breakpoint does not cross it again
+    assert flight_model.atmosphere_breakpoint_crossed(2000.0, 1500.0, *spacing) is None
+    assert flight_model.atmosphere_breakpoint_crossed(1999.9995, 2500.0, *spacing, tolerance=1e-6) is None
+    assert np.isclose(flight_model.hermite_crossing_fraction(0.0, 2.0, 2.0, 2.0, 1.0), 0.5)
+
+
+# Parameter sets for the ensemble tests, the last ones light enough to burn a fifth of their mass
+ensemble_cases = {"mass0": [20000.0, 20000.0, 8000.0, 3000.0], "velocity_mag": [300.0, 250.0, 300.0, 300.0],
+                  "angle_of_attack": [5.0, 0.0, 8.0, 5.0], "lifting_area": [31.0, 20.0, 25.0, 31.0],
+                  "intake_area": [0.8, 0.4, 1.2, 1.5], "lift_coefficient": [0.2, 0.3, 0.15, 0.25],
+                  "drag_coefficient": [0.025, 0.02, 0.03, 0.025], "specific_impulse": [3200.0, 2800.0, 3600.0, 3200.0],
+                  "methane_to_oxygen_ratio": [0.25, 0.22, 0.28, 0.25]}
+coefficient_names = ("lift_coefficient", "drag_coefficient", "specific_impulse", "methane_to_oxygen_ratio")
+
+
+def test_ensemble_matches_acceleration_function_steps():
+    cases = {name: np.array(values) for name, values in ensemble_cases.items()}
+    coefficients = {name: cases[name] for name in coefficient_names}
+    v0_horizontal, v0_vertical = flight_model.initial_velocity_components(cases["velocity_mag"],
+                                                                          cases["angle_of_attack"])
+    ensemble = flight_model.run_ensemble(v0_horizontal, v0_vertical, cases["mass0"], cases["lifting_area"],
+                                         cases["intake_area"], store_history=True, **coefficients)
+
+    # The same Euler loop as run_simulation(), stepping every craft through acceleration_function() at once
+    state = np.array([v0_horizontal, v0_vertical])
+    y = np.zeros(len(cases["mass0"]))
+    mass = cases["mass0"].copy()
+    altitudes, masses = [], []
+    for _ in ensemble["time_values"]:
+        a_horizontal, a_vertical, T, mass_flow_rate_of_fuel, delta_mass = flight_model.acceleration_function(
+            state, y, mass, cases["lifting_area"], cases["intake_area"], **coefficients)
+        state = state + np.array([a_horizontal, a_vertical]) * flight_model.dt
+        y = y + state[1] * flight_model.dt
+        mass = mass - mass_flow_rate_of_fuel * flight_model.dt
+        altitudes.append(y)
+        masses.append(mass)
+
+    assert mass[-1] < 0.85 * cases["mass0"][-1]  # the light craft really does burn a large share of its mass
+    np.testing.assert_allclose(ensemble["position_values"][:, 1], altitudes, rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(ensemble["mass_values"], masses, rtol=1e-12)
+    np.testing.assert_allclose(ensemble["final_velocity"], state, rtol=1e-9)
+    np.testing.assert_allclose(ensemble["max_altitude"], np.max(altitudes, axis=0), rtol=1e-9)
+
+
+@pytest.mark.parametrize("case", range(len(ensemble_cases["mass0"])))
+def test_ensemble_matches_run_simulation(case):
+    values = {name: float(ensemble_cases[name][case]) for name in ("mass0", "velocity_mag", "angle_of_attack",
+                                                                       "lifting_area", "intake_area")}
+    v0_horizontal, v0_vertical = flight_model.initial_velocity_components(values["velocity_mag"],
+                                                                          values["angle_of_attack"])
+    single = flight_model.run_simulation(v0_horizontal, v0_vertical, values["mass0"], values["lifting_area"],
+                                         values["intake_area"])
+    ensemble = flight_model.run_ensemble(v0_horizontal, v0_vertical, values["mass0"], values["lifting_area"],
+                                         values["intake_area"], store_history=True)
+    for name in ("velocity_values", "position_values", "thrust_values", "delta_mass_values"):
+        np.testing.assert_allclose(ensemble[name][..., 0], np.reshape(single[name], ensemble[name][..., 0].shape),
+                                   rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(ensemble["final_mass"][0], single["final_mass"], rtol=1e-12)
+
+
+def test_ensemble_time_to_ground_counts_only_after_apogee():
+    # At zero angle of attack the craft first sinks below its starting altitude, then climbs away
+    v0_horizontal, v0_vertical = flight_model.initial_velocity_components(200.0, 0.0)
+    ensemble = flight_model.run_ensemble(v0_horizontal, v0_vertical, 20000.0, 31.0, 0.8, store_history=True)
+    altitude = ensemble["position_values"][:, 1, 0]
+    assert altitude.min() < 0.0 and altitude[-1] > 10000.0
+    assert np.isnan(ensemble["time_to_ground"][0])
+
+    # Straight down from the start, on the other hand, the craft is on the ground after its first step
+    with np.errstate(over="ignore", invalid="ignore"):  # it keeps falling through the model's ground and diverges
+        falling = flight_model.run_ensemble(10.0, -50.0, 20000.0, 31.0, 0.1)
+    assert falling["time_to_ground"][0] == 0.0
+
+
+@pytest.mark.parametrize("number_of_points", [1000, 10001, 12345])
+def test_decimate_min_max_keeps_every_run_extreme(number_of_points):
+    rng = np.random.default_rng(7)
+    x_values = np.arange(number_of_points) * 0.01
+    y_values = np.cumsum(rng.normal(size=number_of_points))
+    y_values[number_of_points // 3] += 500.0  # a one sample spike must survive
+    pixels = 200
+    x_kept, y_kept = flight_model.decimate_min_max(x_values, y_values.reshape(-1, 1), pixels)
+    assert len(y_kept) <= 2 * pixels + 2
+    assert np.all(np.diff(x_kept) > 0)
+    assert x_kept[0] == x_values[0] and x_kept[-1] == x_values[-1]
+    assert y_kept.max() == y_values.max() and y_kept.min() == y_values.min()
+    # Each kept point is a real sample, and every run's extremes are among them
+    assert np.array_equal(y_values[np.searchsorted(x_values, x_kept)], y_kept)
+    run_length = -(-number_of_points // pixels)
+    for start in range(0, number_of_points, run_length):
+        run = y_values[start:start + run_length]
+        assert run.max() in y_kept and run.min() in y_kept
+
+
+def test_decimate_min_max_leaves_short_series_alone():
+    x_values = np.arange(100.0)
+    x_kept, y_kept = flight_model.decimate_min_max(x_values, x_values ** 2, 50)
+    assert np.array_equal(x_kept, x_values) and np.array_equal(y_kept, x_values ** 2)
+
+
+@pytest.mark.parametrize("integrator", flight_model.integrator_names)
+def test_progress_callback_reports_the_flight_without_changing_it(integrator):
+    fractions = []
+    reported = fly(5.0, integrator, progress=fractions.append)
+    # rk45 reports at the first accepted step past each report time, so less often when its steps are long
+    assert len(fractions) <= flight_model.progress_reports + 1
+    assert integrator == "rk45" or len(fractions) == flight_model.progress_reports
+    assert np.all(np.diff(fractions) > 0) and fractions[-1] == 1.0
+    np.testing.assert_array_equal(reported["position_values"], fly(5.0, integrator)["position_values"])
@@ -0,0 +1,49 @@
+# Tests of the angle of attack schedule optimizer, run with python -m pytest from inside the Project folder
+
+import numpy as np
+import pytest
+
+import ramjet_angle_schedule
+
+craft = {"mass": 20000.0, "velocity_mag": 300.0, "lifting_area": 31.0, "intake_area": 0.8}
+
+
+def test_schedule_angles_interpolate_each_craft_like_np_interp():
+    knots = np.array([0.0, 10.0, 40.0, 100.0])
+    angles = np.array([[0.0, 5.0, 10.0, 2.0], [8.0, 8.0, -4.0, 0.0], [1.0, 2.0, 3.0, 4.0]])
+    points = np.array([-5.0, 25.0, 250.0])
+    expected = [np.interp(point, knots, row) for point, row in zip(points, angles)]
+    assert np.allclose(ramjet_angle_schedule.schedule_angles(angles, knots, points), expected)
+    assert np.allclose(ramjet_angle_schedule.schedule_angles(angles, knots, 40.0), angles[:, 2])
+
+
+def test_batch_of_schedules_flies_like_each_schedule_alone():
+    knots = [0.0, 15.0, 30.0]
+    angles = np.array([[5.0, 5.0, 5.0], [2.0, 10.0, 0.0], [12.0, 4.0, 8.0]])
+    batch = ramjet_angle_schedule.fly_schedules(angles, knots, **craft, t_final=30.0)
+    for index, row in enumerate(angles):
+        alone = ramjet_angle_schedule.fly_schedules(row, knots, **craft, t_final=30.0)
+        for name, values in batch.items():
+            assert values[index] == pytest.approx(alone[name][0], rel=1e-12)
+
+
+@pytest.mark.parametrize("schedule_variable, knots", [("time", [0.0, 15.0, 30.0]), ("altitude", [0.0, 5e3, 2e4])])
+def test_optimized_schedule_climbs_higher_within_the_bounds(schedule_variable, knots):
+    result = ramjet_angle_schedule.optimize_schedule(knots, **craft, schedule_variable=schedule_variable,
+                                                     initial_angles=2.0, angle_bounds=(0.0, 12.0),
+                                                     max_iterations=5, t_final=30.0)
+    assert result["metrics"]["max_altitude"] > result["starting_metrics"]["max_altitude"]
+    assert np.all((result["angles"] >= 0.0) & (result["angles"] <= 12.0))
+    # The starting and the optimized schedule are flown alone, every gradient as an ensemble of 2K + 1 craft
+    assert result["craft_flown"] == 2 + (2 * len(knots) + 1) * (result["ensembles_flown"] - 2)
+
+
+def test_fuel_objective_burns_less_fuel():
+    result = ramjet_angle_schedule.optimize_schedule([0.0, 15.0, 30.0], **craft, objective="fuel_burned",
+                                                     initial_angles=10.0, max_iterations=5, t_final=30.0)
+    assert result["metrics"]["fuel_burned"] < result["starting_metrics"]["fuel_burned"]
+
+
+def test_bad_knots_are_rejected():
+    with pytest.raises(ValueError):
+        ramjet_angle_schedule.optimize_schedule([0.0, 20.0, 10.0], **craft)
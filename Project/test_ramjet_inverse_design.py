@@ -0,0 +1,34 @@
+# Tests of the inverse design solver, run with python -m pytest from inside the Project folder
+
+import numpy as np
+import pytest
+
+from ramjet_inverse_design import InverseDesignSolver
+
+
+def test_later_solves_start_from_cached_bracket():
+    solver = InverseDesignSolver()
+    solver.solve("intake_area", "max_altitude", 50000.0, 0.1, 1.5, tolerance=1e-2)
+    second = solver.solve("intake_area", "max_altitude", 60000.0, 0.1, 1.5, tolerance=1e-2)
+    fresh = InverseDesignSolver().solve("intake_area", "max_altitude", 60000.0, 0.1, 1.5, tolerance=1e-2)
+    assert second["flown"] < fresh["flown"]
+    assert abs(second["value"] - fresh["value"]) <= 1e-2
+    assert second["metric_value"] >= 60000.0
+    assert second["meets"] == "above"
+
+
+def test_at_most_target_met_only_at_the_low_end_finds_the_largest_value():
+    solver = InverseDesignSolver()
+    reference = solver.evaluate([[20000.0, 300.0, 5.0, 31.0, intake_area] for intake_area in (0.1, 1.5)])
+    target = float(np.mean(reference["fuel_burned"]))
+    solution = solver.solve("intake_area", "fuel_burned", target, 0.1, 1.5, sense="at_most", tolerance=1e-3)
+    low, high = solution["bracket"]
+    assert solution["meets"] == "below"
+    assert solution["value"] == low and high - low <= 1e-3
+    assert solution["metric_value"] <= target
+    assert solver.evaluate([[20000.0, 300.0, 5.0, 31.0, high]])["fuel_burned"][0] > target
+
+
+def test_target_met_at_neither_end_is_refused():
+    with pytest.raises(ValueError, match="either end"):
+        InverseDesignSolver().solve("intake_area", "max_altitude", 1e9, 0.1, 1.5)
@@ -0,0 +1,60 @@
+# Tests of the local job server, run with python -m pytest from inside the Project folder
+
+import asyncio
+import json
+
+import pytest
+
+from ramjet_job_server import JobServer, default_host, send_request
+
+params = {"mass0": 20000, "velocity_mag": 300, "angle_of_attack": 5, "lifting_area": 31, "intake_area": 0.8}
+
+
+# Function to send raw request lines and return one reply per line
+async def send_lines(port, lines):
+    reader, writer = await asyncio.open_connection(default_host, port)
+    try:
+        replies = []
+        for line in lines:
+            writer.write(line.encode() + b"\n")
+            await writer.drain()
+            replies.append(json.loads(await reader.readline()))
+        return replies
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+# Function to run a server with room for one finished job, submit two and watch both finish
+async def exercise_server(output_dir):
+    server = JobServer(str(output_dir), workers=1, max_finished=1)
+    port = await server.start(default_host, 0)
+    try:
+        bad_replies = await send_lines(port, ["[1, 2]", "5", json.dumps({"command": "submit", "params": [1, 2]})])
+        job_ids = []
+        for velocity_mag in (300, 310):
+            reply = (await send_request({"command": "submit", "params": {**params, "velocity_mag": velocity_mag}},
+                                        port=port))[0]
+            job_ids.append(reply["job_id"])
+            await send_request({"command": "watch", "job_id": reply["job_id"]}, port=port)
+        while server.tasks:
+            await asyncio.sleep(0.01)
+        listed = (await send_request({"command": "jobs"}, port=port))[0]["jobs"]
+        return bad_replies, job_ids, listed
+    finally:
+        await server.stop()
+
+
+def test_server_rejects_bad_requests_and_forgets_old_jobs(tmp_path):
+    bad_replies, job_ids, listed = asyncio.run(exercise_server(tmp_path))
+    assert all(reply["error"].startswith("TypeError") for reply in bad_replies)
+    assert [job["job_id"] for job in listed] == job_ids[1:]
+    assert listed[0]["status"] == "done"
+    assert (tmp_path / job_ids[0] / "manifest.json").exists()  # a forgotten job's run stays on disk
+
+
+@pytest.mark.parametrize("sample_spacing", [0.0, -0.01, float("nan"), float("inf"), 1e-6])
+def test_submit_rejects_unusable_sample_spacing(tmp_path, sample_spacing):
+    with pytest.raises(ValueError, match="sample_spacing"):
+        JobServer(str(tmp_path)).submit({**params, "fuel_mass": 5000}, model="solve_ivp",
+                                        sample_spacing=sample_spacing)
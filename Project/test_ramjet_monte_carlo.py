@@ -0,0 +1,31 @@
+# Tests of the Monte Carlo percentile estimates, run with python -m pytest from inside the Project folder
+
+import numpy as np
+
+from ramjet_monte_carlo import QuantileSketch
+
+probabilities = np.array([0.05, 0.5, 0.95])
+
+
+def test_sketch_tracks_exact_quantiles_over_batches():
+    rng = np.random.default_rng(3)
+    observations = np.stack([rng.normal(0.0, 1.0, 10000), rng.lognormal(0.0, 1.0, 10000),
+                             rng.uniform(-5.0, 5.0, 10000)])
+    sketch = QuantileSketch(probabilities, (3,))
+    for start in range(0, 10000, 700):
+        sketch.update(observations[:, start:start + 700])
+    expected = np.quantile(observations, probabilities, axis=1)
+    spread = np.quantile(observations, 0.75, axis=1) - np.quantile(observations, 0.25, axis=1)
+    assert np.all(np.abs(sketch.quantiles() - expected) < 0.02 * spread)
+
+
+def test_sketch_skips_non_finite_observations():
+    observations = np.array([[1.0, 2.0, np.nan, 3.0, np.inf, 4.0, 5.0], [np.nan] * 7])
+    sketch = QuantileSketch(probabilities, (2,))
+    sketch.update(observations[:, :3])
+    sketch.update(observations[:, 3:])
+    estimates = sketch.quantiles()
+    assert np.all(sketch.count == [5, 0])
+    assert abs(estimates[1, 0] - 3.0) < 0.05
+    assert np.all((estimates[:, 0] >= 1.0) & (estimates[:, 0] <= 5.0))
+    assert np.all(np.isnan(estimates[:, 1]))
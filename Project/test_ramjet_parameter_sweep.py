@@ -0,0 +1,54 @@
+# Tests of the parameter sweep runner, run with python -m pytest from inside the Project folder
+
+import numpy as np
+import pytest
+
+import final_ramet_powered_flight_model as flight_model
+from ramjet_parameter_sweep import run_sweep, run_sweep_trajectories
+from trajectory_recorder import TrajectoryRecorder
+
+# A craft that sinks below its starting altitude at launch and then climbs away, and a heavy one with hardly any lift
+# thrown up at 45 degrees, which falls back like a ball
+climbing_case = (20000.0, 200.0, 0.0, 31.0, 0.8)
+ballistic_case = (200000.0, 300.0, 45.0, 5.0, 0.1)
+
+
+def test_sweep_time_to_ground_counts_only_after_apogee():
+    climbing, ballistic = run_sweep([climbing_case, ballistic_case], processes=1)
+    results = flight_model.run_simulation(*flight_model.initial_velocity_components(200.0, 0.0), 20000.0, 31.0, 0.8)
+    assert results["position_values"][:, 1].min() < 0.0
+    assert climbing["max_altitude"] > 50000.0 and np.isnan(climbing["time_to_ground"])
+    # Roughly the flight time of a ball thrown up at 300 m/s and 45 degrees
+    assert abs(ballistic["time_to_ground"] - 2 * 300.0 * np.sin(np.radians(45.0)) / flight_model.g0) < 2.0
+
+
+def test_sweep_metrics_match_the_ensemble():
+    rows = run_sweep([climbing_case, ballistic_case], processes=1)
+    mass0, velocity_mag, angle_of_attack, lifting_area, intake_area = np.array([climbing_case, ballistic_case]).T
+    ensemble = flight_model.run_ensemble(*flight_model.initial_velocity_components(velocity_mag, angle_of_attack),
+                                         mass0, lifting_area, intake_area)
+    np.testing.assert_allclose([row["max_altitude"] for row in rows], ensemble["max_altitude"], rtol=1e-9)
+    np.testing.assert_allclose([row["time_to_ground"] for row in rows], ensemble["time_to_ground"])
+
+
+@pytest.mark.parametrize("integrator, record_every", [("euler", 7), ("rk4", 1)])
+def test_shared_memory_sweep_matches_a_serial_sweep(integrator, record_every):
+    cases = [climbing_case, ballistic_case, (20000.0, 300.0, 5.0, 31.0, 0.8)]
+    serial = run_sweep(cases, processes=1, integrator=integrator)
+    rows, block = run_sweep_trajectories(cases, processes=2, integrator=integrator, record_every=record_every)
+    try:
+        # Summaries come from every step whatever the recording stride, so they equal the plain sweep's exactly
+        for row, serial_row in zip(rows, serial):
+            assert row.keys() == serial_row.keys()
+            np.testing.assert_array_equal(list(row.values()), list(serial_row.values()))
+        histories = block.results()
+        for index, case in enumerate(cases):
+            mass0, velocity_mag, angle_of_attack, lifting_area, intake_area = case
+            recorder = TrajectoryRecorder(every=record_every)
+            with np.errstate(over="ignore", invalid="ignore"):
+                flight_model.run_simulation(*flight_model.initial_velocity_components(velocity_mag, angle_of_attack),
+                                            mass0, lifting_area, intake_area, integrator=integrator, recorder=recorder)
+            for name, values in recorder.results().items():
+                np.testing.assert_array_equal(histories[name][index], values)
+    finally:
+        block.close()
@@ -0,0 +1,25 @@
+# Tests of the multi-fidelity screening, run with python -m pytest from inside the Project folder
+
+import numpy as np
+
+from ramjet_parameter_sweep import build_grid, run_case
+from ramjet_screening import coarse_sweep, rank_rows
+
+cases = build_grid([20000.0], [200.0, 300.0], [3.0, 8.0], [20.0], [0.2, 1.0])
+
+
+def test_coarse_sweep_tracks_the_fine_metrics():
+    coarse_rows = coarse_sweep(cases, 0.1)
+    fine_rows = [run_case(case, "euler", 1e-6, 1e-6) for case in cases]
+    for coarse, fine in zip(coarse_rows, fine_rows):
+        assert abs(coarse["max_altitude"] - fine["max_altitude"]) < 2e-3 * fine["max_altitude"]
+        assert np.isnan(coarse["time_to_ground"]) == np.isnan(fine["time_to_ground"])
+        if not np.isnan(fine["time_to_ground"]):
+            assert abs(coarse["time_to_ground"] - fine["time_to_ground"]) <= 0.5
+
+
+def test_rank_rows_places_nan_metrics_by_policy():
+    rows = [{"time_to_ground": value} for value in (5.0, np.nan, 12.0, 8.0)]
+    assert rank_rows(rows, "time_to_ground", True, "last").tolist() == [2, 3, 0, 1]
+    assert rank_rows(rows, "time_to_ground", True, "first").tolist() == [1, 2, 3, 0]
+    assert rank_rows(rows, "time_to_ground", False, "drop").tolist() == [0, 3, 2]
@@ -0,0 +1,45 @@
+# Tests of the Sobol and Morris sensitivity estimators, run with python -m pytest from inside the Project folder
+
+import numpy as np
+import pytest
+
+import ramjet_sensitivity
+
+# Parameters of an additive test function, with ranges of different widths to check the scaling
+ranges = {"a": (0.0, 1.0), "b": (0.0, 2.0), "c": (5.0, 6.0)}
+
+
+# Function to evaluate two additive outputs, a + 2 b (linear) and a^2 + c (non-linear in a), for rows of (a, b, c)
+def additive_model(samples):
+    a, b, c = np.asarray(samples).T
+    return np.column_stack([a + 2.0 * b, a ** 2 + c])
+
+
+def test_sobol_indices_of_an_additive_function():
+    indices = ramjet_sensitivity.sobol_indices(2 ** 14, ranges=ranges, chunk_size=2 ** 12, seed=1,
+                                               evaluate=additive_model)
+    # Variances of the terms: a ~ U(0, 1) gives 1/12, 2 b with b ~ U(0, 2) gives 16/12, a^2 gives 4/45, c gives 1/12
+    linear = np.array([1.0, 16.0, 0.0]) / 17.0
+    quadratic = np.array([4.0 / 45.0, 0.0, 1.0 / 12.0]) / (4.0 / 45.0 + 1.0 / 12.0)
+    expected = np.column_stack([linear, quadratic])
+    assert indices["rows_used"] == 2 ** 14
+    assert np.allclose(indices["first_order"], expected, atol=0.02)
+    # Without interactions the total indices equal the first order ones
+    assert np.allclose(indices["total"], expected, atol=0.02)
+
+
+def test_morris_effects_of_an_additive_function():
+    indices = ramjet_sensitivity.morris_indices(200, ranges=ranges, seed=1, evaluate=additive_model)
+    # The linear output changes by its slope times the range width for a whole unit step of a parameter
+    assert np.allclose(indices["mu"][:, 0], [1.0, 4.0, 0.0])
+    assert np.allclose(indices["sigma"][:, 0], 0.0, atol=1e-6)
+    assert indices["mu_star"][1, 1] == 0.0 and indices["mu_star"][2, 1] == pytest.approx(1.0)
+    # a^2 has a slope that depends on where the step is taken, so its effects spread out
+    assert indices["sigma"][0, 1] > 0.1
+    assert indices["flights"] == 200 * (len(ranges) + 1)
+
+
+def test_default_evaluation_flies_the_ramjet_model():
+    indices = ramjet_sensitivity.sobol_indices(8, seed=0)
+    assert indices["first_order"].shape == (len(ramjet_sensitivity.default_ranges), 2)
+    assert indices["flights"] == 8 * (len(ramjet_sensitivity.default_ranges) + 2)
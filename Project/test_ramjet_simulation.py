@@ -0,0 +1,45 @@
+# Tests of the batch entry point's saved runs, run with python -m pytest from inside the Project folder
+
+import json
+import sys
+
+import numpy as np
+import pytest
+
+import ramjet_simulation
+import result_store
+
+params = {"mass0": 20000, "velocity_mag": 300, "angle_of_attack": 5, "lifting_area": 31, "intake_area": 0.8,
+          "fuel_mass": 5000}
+
+
+# Function to run the command line on one parameter set and return the saved run
+def saved_run(tmp_path, monkeypatch, model, output_format):
+    parameter_file = tmp_path / "runs.json"
+    parameter_file.write_text(json.dumps(params))
+    output_dir = tmp_path / "runs"
+    monkeypatch.setattr(sys, "argv", ["ramjet_simulation.py", str(parameter_file), "--model", model,
+                                      "--format", output_format, "--output-dir", str(output_dir)])
+    ramjet_simulation.main()
+    if output_format == "npz":
+        with np.load(output_dir / "run_00000.npz") as archive:
+            return {name: archive[name] for name in archive.files}
+    return result_store.load_run(str(output_dir / "run_00000"), mmap_mode=None)
+
+
+@pytest.mark.parametrize("output_format", ramjet_simulation.output_formats)
+def test_final_model_run_keeps_its_scalar_results(tmp_path, monkeypatch, output_format):
+    run = saved_run(tmp_path, monkeypatch, "final", output_format)
+    results = ramjet_simulation.simulate(params)
+    for name in ("final_mass", "rhs_evaluations"):
+        assert name in run
+        assert float(run[name]) == pytest.approx(results[name])
+
+
+@pytest.mark.parametrize("output_format", ramjet_simulation.output_formats)
+def test_solve_ivp_run_keeps_its_termination_event(tmp_path, monkeypatch, output_format):
+    run = saved_run(tmp_path, monkeypatch, "solve_ivp", output_format)
+    termination_event = ramjet_simulation.simulate(params, model="solve_ivp")["termination_event"]
+    expected = "" if termination_event is None and output_format == "npz" else termination_event
+    assert "termination_event" in run
+    assert (run["termination_event"][()] if output_format == "npz" else run["termination_event"]) == expected
@@ -0,0 +1,56 @@
+# Tests of the sweep surrogate, run with python -m pytest from inside the Project folder
+
+import itertools
+
+import numpy as np
+import pytest
+
+import ramjet_surrogate
+from ramjet_parameter_sweep import metric_names, parameter_names
+
+
+# Function to make sweep rows over intake and lifting area with smooth made up metrics, so no flight is simulated
+def sweep_rows():
+    rows = []
+    for intake_area, lifting_area in itertools.product(np.linspace(0.5, 1.0, 6), np.linspace(20.0, 40.0, 6)):
+        row = {"mass0": 20000.0, "velocity_mag": 300.0, "angle_of_attack": 5.0, "lifting_area": lifting_area,
+               "intake_area": intake_area}
+        row.update({"max_altitude": 1e4 * intake_area + 50.0 * lifting_area, "final_speed": 400.0 * intake_area,
+                    "fuel_burned": 3000.0 * intake_area ** 2,
+                    "time_to_ground": np.nan if intake_area > 0.75 else 100.0 + lifting_area})
+        rows.append(row)
+    return rows
+
+
+def test_surrogate_reproduces_its_training_points():
+    rows = sweep_rows()
+    surrogate = ramjet_surrogate.RamjetSurrogate(rows, holdout_fraction=0.0)
+    cases = [[row[name] for name in parameter_names] for row in rows]
+    assert np.all(surrogate.trusted(cases))
+    predictions = surrogate.predict(cases)
+    for name in metric_names:
+        expected = np.array([row[name] for row in rows])
+        assert np.allclose(predictions[name], expected, rtol=1e-8, atol=1e-6, equal_nan=True), name
+
+
+def test_held_out_error_is_small_for_smooth_metrics():
+    surrogate = ramjet_surrogate.RamjetSurrogate(sweep_rows(), holdout_fraction=0.2, seed=0)
+    assert surrogate.errors["final_speed"]["relative_rmse"] < 1e-3
+    assert surrogate.errors["max_altitude"]["relative_rmse"] < 1e-3
+
+
+def test_queries_outside_the_sweep_are_simulated(monkeypatch):
+    surrogate = ramjet_surrogate.RamjetSurrogate(sweep_rows(), holdout_fraction=0.0)
+    simulated = []
+
+    def fake_run_case(case, integrator):
+        simulated.append(case)
+        return {**dict(zip(parameter_names, case)), **{name: 0.0 for name in metric_names}}
+
+    monkeypatch.setattr(ramjet_surrogate, "run_case", fake_run_case)
+    inside = surrogate.query([[20000.0, 300.0, 5.0, 30.0, 0.7]])
+    outside = surrogate.query([[20000.0, 300.0, 5.0, 30.0, 1.5]])
+    assert inside[0]["source"] == "surrogate"
+    assert inside[0]["max_altitude"] == pytest.approx(1e4 * 0.7 + 50.0 * 30.0, rel=1e-3)
+    assert outside[0]["source"] == "simulation"
+    assert simulated == [(20000.0, 300.0, 5.0, 30.0, 1.5)]
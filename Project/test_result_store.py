@@ -0,0 +1,39 @@
+# Tests of the on-disk run store, run with python -m pytest from inside the Project folder
+
+import numpy as np
+
+import result_store
+
+results = {"time_values": np.linspace(0.0, 10.0, 1001), "position_values": np.arange(2002.0).reshape(1001, 2),
+           "thrust_values": np.ones((1001, 1), dtype=np.float32), "final_mass": np.float64(15000.5),
+           "rhs_evaluations": 1001, "termination_event": None, "solution": object()}
+parameters = {"mass0": 20000, "intake_area": np.float64(0.8), "engine_table": None}
+
+
+def test_saved_run_loads_back_memory_mapped(tmp_path):
+    result_store.save_run(str(tmp_path / "run"), results, parameters)
+    run = result_store.load_run(str(tmp_path / "run"))
+    for name in ("time_values", "position_values", "thrust_values"):
+        assert isinstance(run[name], np.memmap)
+        assert run[name].dtype == results[name].dtype
+        assert np.array_equal(run[name], results[name])
+    assert run["final_mass"] == 15000.5 and run["rhs_evaluations"] == 1001 and run["termination_event"] is None
+    assert "solution" not in run
+    assert run["parameters"] == {"mass0": 20000, "intake_area": 0.8, "engine_table": None}
+
+
+def test_manifest_records_every_array_shape_and_dtype(tmp_path):
+    result_store.save_run(str(tmp_path / "run"), results, parameters)
+    manifest = result_store.read_manifest(str(tmp_path / "run"))
+    assert manifest["arrays"] == {"time_values": {"shape": [1001], "dtype": "<f8"},
+                                  "position_values": {"shape": [1001, 2], "dtype": "<f8"},
+                                  "thrust_values": {"shape": [1001, 1], "dtype": "<f4"}}
+    assert manifest["values"] == {"final_mass": 15000.5, "rhs_evaluations": 1001, "termination_event": None}
+
+
+def test_open_runs_skips_unfinished_runs(tmp_path):
+    for name in ("run_b", "run_a"):
+        result_store.save_run(str(tmp_path / name), results, parameters)
+    (tmp_path / "run_c").mkdir()
+    np.save(tmp_path / "run_c" / "time_values.npy", results["time_values"])
+    assert [name for name, run in result_store.open_runs(str(tmp_path))] == ["run_a", "run_b"]
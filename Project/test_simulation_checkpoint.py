@@ -0,0 +1,56 @@
+# Tests of checkpointing and resuming a ramjet run, run with python -m pytest from inside the Project folder
+
+import numpy as np
+import pytest
+
+import final_ramet_powered_flight_model as final_model
+from simulation_checkpoint import SimulationCheckpoint
+from trajectory_recorder import TrajectoryRecorder
+
+case = (300.0, 0.0, 20000.0, 31.0, 0.8)
+
+
+class SimulatedCrash(Exception):
+    pass
+
+
+class CrashingCheckpoint(SimulationCheckpoint):
+    """
+    Checkpoint that stops the run, as a crash would, straight after its Nth save
+    :param crash_after: int :: number of saves before the run is stopped
+    """
+
+    def __init__(self, path, every, crash_after):
+        super().__init__(path, every=every)
+        self.saves_left = crash_after
+
+    def save(self, run_parameters, **arrays):
+        super().save(run_parameters, **arrays)
+        self.saves_left -= 1
+        if self.saves_left == 0:
+            raise SimulatedCrash
+
+
+@pytest.mark.parametrize("integrator", ("euler", "rk4", "rk45"))
+@pytest.mark.parametrize("mode", ("every", "envelope"))
+def test_resumed_run_matches_an_uninterrupted_run(tmp_path, integrator, mode):
+    path = str(tmp_path / "run.npz")
+    uninterrupted = final_model.run_simulation(*case, integrator=integrator,
+                                               recorder=TrajectoryRecorder(mode, every=25, capacity=200))
+    with pytest.raises(SimulatedCrash):
+        final_model.run_simulation(*case, integrator=integrator,
+                                   recorder=TrajectoryRecorder(mode, every=25, capacity=200),
+                                   checkpoint=CrashingCheckpoint(path, every=20, crash_after=3))
+    resumed = final_model.run_simulation(*case, integrator=integrator, recorder=TrajectoryRecorder("ring", capacity=1),
+                                         checkpoint=SimulationCheckpoint(path, every=20, resume=True))
+    for name, values in uninterrupted.items():
+        assert np.array_equal(resumed[name], values), name
+
+
+def test_checkpoint_of_a_different_run_is_refused(tmp_path):
+    path = str(tmp_path / "run.npz")
+    with pytest.raises(SimulatedCrash):
+        final_model.run_simulation(*case, checkpoint=CrashingCheckpoint(path, every=100, crash_after=1))
+    with pytest.raises(ValueError):
+        final_model.run_simulation(300.0, 0.0, 25000.0, 31.0, 0.8,
+                                   checkpoint=SimulationCheckpoint(path, every=100, resume=True))
@@ -0,0 +1,67 @@
+# Tests of the solve_ivp ramjet model, run with python -m pytest from inside the Project folder
+
+import numpy as np
+import pytest
+
+import ramjet_simulation
+import WIP_ramjet_powered_flight_solveIVP_method as solve_ivp_model
+
+params = {"mass0": 20000.0, "velocity_mag": 300.0, "angle_of_attack": 5.0, "lifting_area": 31.0, "intake_area": 0.8}
+
+
+def test_fuel_exhausted_ends_the_solve():
+    # A typical flight burns several hundred kilograms in its 100 s, so 200 kg of fuel runs out well before the end
+    results = solve_ivp_model.solve_flight(*params.values(), fuel_mass=200.0)
+    assert results["termination_event"] == "fuel_exhausted"
+    end = results["solution"].t_max
+    assert end < 100.0 and results["events"]["fuel_exhausted"][0] == pytest.approx(end)
+    assert results["solution"](end)[4] == pytest.approx(params["mass0"] - 200.0)
+
+
+def test_fuel_mass_is_required_and_checked():
+    with pytest.raises(KeyError, match="fuel_mass"):
+        ramjet_simulation.simulate(params, model="solve_ivp")
+    with pytest.raises(ValueError, match="fuel_mass"):
+        solve_ivp_model.solve_flight(*params.values(), fuel_mass=25000.0)
+    assert ramjet_simulation.simulate({**params, "fuel_mass": 200.0},
+                                      model="solve_ivp")["termination_event"] == "fuel_exhausted"
+
+
+def test_simulate_keeps_the_dense_solution_and_resamples_on_demand():
+    results = ramjet_simulation.simulate({**params, "fuel_mass": 5000.0}, model="solve_ivp")
+    assert len(results["time_values"]) < 1000  # the solver's own steps, not a resampled grid
+    sampled = solve_ivp_model.sample_flight(results, spacing=0.01)
+    assert len(sampled["time_values"]) == 10001
+    assert sampled["vertical_position_values"][-1] == pytest.approx(results["vertical_position_values"][-1])
+
+
+# Function to take the central difference Jacobian of state_derivative, with steps scaled to each state component
+def finite_difference_jacobian(state, angle_of_attack, lifting_area, intake_area):
+    jacobian = np.zeros((5, 5))
+    for column in range(5):
+        step = 1e-6 * max(abs(state[column]), 1.0)
+        offset = np.zeros(5)
+        offset[column] = step
+        forward = solve_ivp_model.state_derivative(0.0, state + offset, angle_of_attack, lifting_area, intake_area)
+        backward = solve_ivp_model.state_derivative(0.0, state - offset, angle_of_attack, lifting_area, intake_area)
+        jacobian[:, column] = (forward - backward) / (2 * step)
+    return jacobian
+
+
+# Altitudes sit between the atmosphere table's rows, 1 km apart, where the interpolated density is smooth
+@pytest.mark.parametrize("state", [[300.0, 20.0, 0.0, 137.0, 20000.0], [850.0, -40.0, 5e4, 12345.0, 19000.0],
+                                   [1500.0, 200.0, 2e5, 41234.0, 15000.0]])
+@pytest.mark.parametrize("angle_of_attack", [0.0, 5.0, 12.0])
+def test_state_jacobian_matches_finite_differences(state, angle_of_attack):
+    state = np.array(state)
+    analytic = solve_ivp_model.state_jacobian(0.0, state, angle_of_attack, 31.0, 0.8)
+    numerical = finite_difference_jacobian(state, angle_of_attack, 31.0, 0.8)
+    assert np.allclose(analytic, numerical, rtol=1e-5, atol=1e-12 * np.abs(numerical).max())
+
+
+def test_implicit_solve_with_the_analytic_jacobian_matches_a_finite_difference_one():
+    analytic = solve_ivp_model.solve_flight(*params.values(), fuel_mass=5000.0, method="Radau")
+    numerical = solve_ivp_model.solve_flight(*params.values(), fuel_mass=5000.0, method="Radau",
+                                             analytic_jacobian=False)
+    assert analytic["solver_stats"]["njev"] > 0
+    assert analytic["solution"](60.0) == pytest.approx(numerical["solution"](60.0), rel=1e-3)
@@ -0,0 +1,40 @@
+# Tests of the thrust envelope tables and lookups, run with python -m pytest from inside the Project folder
+
+import warnings
+
+import numpy as np
+import pytest
+
+import final_ramet_powered_flight_model as final_model
+from test_conditions_vs_altitude import envelope_tables
+from thrust_envelope import ThrustEnvelope
+
+tables = envelope_tables(np.linspace(-1000.0, 90000.0, 92), np.linspace(0.0, 3000.0, 301), [0.4, 0.8, 1.2])
+
+
+# Function to build a lookup over the test tables
+def make_envelope(out_of_grid="warn"):
+    return ThrustEnvelope(tables["altitudes"], tables["velocities"], tables["intake_areas"], tables["thrust"],
+                          tables["fuel_flow"], out_of_grid=out_of_grid)
+
+
+def test_lookup_inside_grid_matches_engine_formula():
+    envelope = make_envelope()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        thrust, fuel_flow = envelope(12000.0, 1234.5, 0.8)
+        above_atmosphere = envelope(np.array([95000.0, 130000.0]), 2000.0, 0.8)
+    expected = final_model.thrust_function(final_model.air_density_func(12000.0), 1234.5, 0.8)
+    assert thrust == pytest.approx(expected[0]) and fuel_flow == pytest.approx(expected[1])
+    assert np.all(above_atmosphere[0] == 0.0)
+
+
+@pytest.mark.parametrize("velocity", [3500.0, np.array([1000.0, 3500.0])])
+def test_lookup_outside_grid_warns_or_raises(velocity):
+    with pytest.warns(RuntimeWarning, match="velocities"):
+        make_envelope()(20000.0, velocity, 0.8)
+    with pytest.raises(ValueError, match="intake_areas"):
+        make_envelope("raise")(20000.0, 1000.0, 1.5)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        make_envelope("clamp")(20000.0, velocity, 0.8)
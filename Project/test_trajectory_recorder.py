@@ -0,0 +1,70 @@
+# Tests of the trajectory recorder modes, run with python -m pytest from inside the Project folder
+
+import numpy as np
+import pytest
+
+from trajectory_recorder import TrajectoryRecorder, row_width
+
+
+# Function to build the rows of a synthetic flight whose time column counts steps and altitude is a parabola
+def synthetic_rows(number_of_steps):
+    rows = np.zeros((number_of_steps, row_width))
+    rows[:, 0] = np.arange(number_of_steps)
+    rows[:, 6] = 1000.0 - (np.arange(number_of_steps) - number_of_steps / 3) ** 2  # position_values y
+    return rows
+
+
+# Function to feed rows to a recorder one step at a time
+def record_all(recorder, rows):
+    for row in rows:
+        recorder.record(row)
+    return recorder
+
+
+def test_every_keeps_each_nth_step_and_the_last():
+    rows = synthetic_rows(103)
+    recorder = record_all(TrajectoryRecorder("every", every=10), rows)
+    assert np.array_equal(recorder.results()["time_values"], np.append(np.arange(0, 103, 10), 102))
+
+
+def test_every_with_capacity_doubles_the_stride_when_full():
+    rows = synthetic_rows(1000)
+    recorder = record_all(TrajectoryRecorder("every", every=1, capacity=64), rows)
+    times = recorder.results()["time_values"]
+    assert len(times) <= 64 + 1
+    assert times[0] == 0 and times[-1] == 999
+    assert np.all(np.diff(times[:-1]) == recorder.every)
+
+
+def test_envelope_keeps_the_extremes_of_every_column():
+    rows = synthetic_rows(1001)
+    recorder = record_all(TrajectoryRecorder("envelope", every=7, capacity=32), rows)
+    results = recorder.results()
+    assert len(recorder.rows()) <= 32
+    assert results["position_values"][:, 1].max() == rows[:, 6].max()
+    assert results["position_values"][:, 1].min() == rows[:, 6].min()
+    assert results["time_values"].min() == 0 and results["time_values"].max() == 1000
+
+
+def test_ring_keeps_the_most_recent_steps_in_order():
+    rows = synthetic_rows(250)
+    recorder = record_all(TrajectoryRecorder("ring", capacity=40), rows)
+    assert np.array_equal(recorder.rows(), rows[-40:])
+
+
+@pytest.mark.parametrize("mode", ("every", "envelope", "ring"))
+def test_checkpoint_arrays_rebuild_an_identical_recorder(mode):
+    rows = synthetic_rows(300)
+    recorder = record_all(TrajectoryRecorder(mode, every=3, capacity=20), rows[:155])
+    resumed = record_all(TrajectoryRecorder.from_checkpoint(recorder.checkpoint_arrays()), rows[155:])
+    record_all(recorder, rows[155:])
+    assert np.array_equal(resumed.rows(), recorder.rows())
+
+
+def test_bad_arguments_are_rejected():
+    with pytest.raises(ValueError):
+        TrajectoryRecorder("sparse")
+    with pytest.raises(ValueError):
+        TrajectoryRecorder("ring")
+    with pytest.raises(ValueError):
+        TrajectoryRecorder("every", every=0)
@@ -0,0 +1,166 @@
+# Precomputed engine tables for the ramjet models. test_conditions_vs_altitude.py evaluates thrust and fuel flow over
+# an altitude x velocity x intake area grid and saves them with save_envelope(); a ThrustEnvelope loads such a file
+# and interpolates the tables, so a simulator can take its engine performance from the table
+# (run_simulation(..., engine_table=...)) instead of the engine formulas. That is how tabulated engine data from
+# elsewhere, a higher fidelity engine model for instance, gets into the simulators. Lift and drag stay with the
+# models' own formulas, no simulator reads aerodynamic tables.
+#
+# The axes are uniform grids, so a lookup is an index computation and a trilinear interpolation like the atmosphere
+# lookup. Thrust is proportional to density x velocity x intake area, so with the altitude grid on the 1000 m
+# breakpoints of the density table the interpolation reproduces the engine formula exactly inside the grid. Values
+# outside the grid are clamped to its edges, which is wrong for velocity and intake area (thrust keeps growing with
+# both), so by default such a lookup warns and out_of_grid="raise" makes it an error. Altitudes beyond the ends of the
+# atmosphere table are fine, the density and so every table is constant there.
+
+import warnings
+
+import numpy as np
+
+from atmosphere import standard_atmosphere
+
+# Tables saved in an envelope file, and the axes they span
+engine_tables = ("thrust", "fuel_flow")  # (altitude, velocity, intake area)
+axis_names = ("altitudes", "velocities", "intake_areas")
+# What a lookup outside the grid does: warn and clamp, raise a ValueError, or clamp silently
+out_of_grid_modes = ("warn", "raise", "clamp")
+
+
+# Function to save an envelope to a compact binary .npz file, tables as float32 and axes as float64
+def save_envelope(envelope, file_name):
+    arrays = {name: np.asarray(envelope[name], dtype=np.float64) for name in axis_names}
+    arrays.update({name: np.asarray(envelope[name], dtype=np.float32) for name in engine_tables})
+    np.savez(file_name, **arrays)
+
+
+class ThrustEnvelope:
+    """
+    Trilinear lookup of the thrust and fuel flow tables of an envelope
+    :param altitudes:       NumPy array :: evenly spaced altitude axis (m)
+    :param velocities:      NumPy array :: evenly spaced velocity axis (m/s)
+    :param intake_areas:    NumPy array :: evenly spaced intake area axis (m^2), may hold a single area
+    :param thrust:          NumPy array(altitudes, velocities, intake_areas) :: thrust (N)
+    :param fuel_flow:       NumPy array(altitudes, velocities, intake_areas) :: fuel mass flow rate (kg/s)
+    :param file_name:       str, optional :: file the tables came from, identifies the table in checkpoints
+    :param out_of_grid:     str, optional :: one of out_of_grid_modes, what a lookup outside the grid does
+    """
+
+    def __init__(self, altitudes, velocities, intake_areas, thrust, fuel_flow, file_name=None, out_of_grid="warn"):
+        if out_of_grid not in out_of_grid_modes:
+            raise ValueError(f"Unknown out_of_grid '{out_of_grid}', expected one of {out_of_grid_modes}")
+        self.axes = [np.asarray(axis, dtype=float) for axis in (altitudes, velocities, intake_areas)]
+        for name, axis in zip(axis_names, self.axes):
+            steps = np.diff(axis)
+            if len(axis) > 1 and (np.any(steps <= 0) or not np.allclose(steps, steps[0], rtol=1e-9, atol=0)):
+                raise ValueError(f"The {name} axis must be evenly spaced and increasing")
+        self.starts = [float(axis[0]) for axis in self.axes]
+        self.inverse_steps = [1.0 / float(axis[1] - axis[0]) if len(axis) > 1 else 0.0 for axis in self.axes]
+        self.last_cells = [max(len(axis) - 2, 0) for axis in self.axes]
+        # Interpolating thrust and fuel flow together shares the index arithmetic
+        self.tables = np.stack([np.asarray(thrust, dtype=float), np.asarray(fuel_flow, dtype=float)], axis=-1)
+        self.file_name = file_name
+        self.out_of_grid = out_of_grid
+
+        # Range of every axis a lookup may use without clamping, with a little slack for rounding. Altitude is open
+        # ended on the sides where the grid reaches the end of the atmosphere table.
+        self.bounds = []
+        for axis in self.axes:
+            slack = 1e-9 * max(abs(axis[0]), abs(axis[-1]), 1.0)
+            self.bounds.append([float(axis[0]) - slack, float(axis[-1]) + slack])
+        if self.axes[0][0] <= standard_atmosphere.minimum_altitude:
+            self.bounds[0][0] = -np.inf
+        if self.axes[0][-1] >= standard_atmosphere.maximum_altitude:
+            self.bounds[0][1] = np.inf
+
+        # Python float copies for the scalar path, indexing a flat list is far cheaper than creating NumPy scalars
+        self.scalar_tables = self.tables.ravel().tolist()
+        self.scalar_strides = [stride // self.tables.itemsize for stride in self.tables.strides[:3]]
+        self.scalar_corners = [(sum(offset * stride for offset, stride in zip(corner, self.scalar_strides)), corner)
+                               for corner in np.ndindex(2, 2, 2)
+                               if not any(offset and len(axis) == 1 for offset, axis in zip(corner, self.axes))]
+
+    @classmethod
+    def load(cls, file_name, out_of_grid="warn"):
+        with np.load(file_name) as envelope:
+            return cls(envelope["altitudes"], envelope["velocities"], envelope["intake_areas"], envelope["thrust"],
+                       envelope["fuel_flow"], file_name=file_name, out_of_grid=out_of_grid)
+
+    def outside_grid(self, name, value):
+        """
+        Warns about or raises for a lookup outside the grid, as out_of_grid says
+        :param name:    str :: name of the axis, one of axis_names
+        :param value:   float :: value outside it
+        """
+        axis = self.axes[axis_names.index(name)]
+        message = (f"{name} {value:g} is outside the envelope grid [{axis[0]:g}, {axis[-1]:g}]"
+                   f"{'' if self.file_name is None else f' of {self.file_name}'}")
+        if self.out_of_grid == "raise":
+            raise ValueError(message)
+        warnings.warn(f"{message}, using the value at its edge", RuntimeWarning, stacklevel=3)
+
+    def __call__(self, altitude, velocity, intake_area):
+        """
+        Interpolates thrust and fuel flow
+        :param altitude:    float or NumPy array :: altitude(s) (m)
+        :param velocity:    float or NumPy array :: speed(s) through the intake (m/s)
+        :param intake_area: float or NumPy array :: intake area(s) (m^2)
+        :return:            tuple :: thrust (N) and fuel flow (kg/s), broadcast to the shape of the arguments
+        """
+        if np.ndim(altitude) == 0 and np.ndim(velocity) == 0 and np.ndim(intake_area) == 0:
+            return self.lookup_scalar(float(altitude), float(velocity), float(intake_area))
+        cells = []
+        fractions = []
+        for name, value, start, inverse_step, last_cell, axis, (lower, upper) in zip(
+                axis_names, (altitude, velocity, intake_area), self.starts, self.inverse_steps, self.last_cells,
+                self.axes, self.bounds):
+            value = np.asarray(value, dtype=float)
+            if self.out_of_grid != "clamp":
+                outside = (value < lower) | (value > upper)
+                if np.any(outside):
+                    self.outside_grid(name, value[outside].flat[0])
+            position = np.clip((value - start) * inverse_step, 0.0, len(axis) - 1)
+            cell = np.minimum(position.astype(np.intp), last_cell)
+            cells.append(cell)
+            fractions.append(position - cell)
+        cells = np.broadcast_arrays(*cells)
+        fractions = np.broadcast_arrays(*fractions)
+
+        # Weighted sum over the corners of the cell, axes of length one contribute a single corner
+        result = 0.0
+        for corner in np.ndindex(2, 2, 2):
+            if any(offset and len(axis) == 1 for offset, axis in zip(corner, self.axes)):
+                continue
+            weight = 1.0
+            for offset, fraction in zip(corner, fractions):
+                weight = weight * (fraction if offset else 1.0 - fraction)
+            result = result + weight[..., np.newaxis] * self.tables[cells[0] + corner[0], cells[1] + corner[1],
+                                                                    cells[2] + corner[2]]
+        return result[..., 0], result[..., 1]
+
+    def lookup_scalar(self, altitude, velocity, intake_area):
+        """
+        Interpolates thrust and fuel flow at a single point with plain Python arithmetic
+        :param altitude:    float :: altitude (m)
+        :param velocity:    float :: speed through the intake (m/s)
+        :param intake_area: float :: intake area (m^2)
+        :return:            tuple :: thrust (N) and fuel flow (kg/s)
+        """
+        base = 0
+        fractions = []
+        for name, value, start, inverse_step, last_cell, axis, stride, (lower, upper) in zip(
+                axis_names, (altitude, velocity, intake_area), self.starts, self.inverse_steps, self.last_cells,
+                self.axes, self.scalar_strides, self.bounds):
+            if (value < lower or value > upper) and self.out_of_grid != "clamp":
+                self.outside_grid(name, value)
+            position = min(max((value - start) * inverse_step, 0.0), len(axis) - 1.0)
+            cell = min(int(position), last_cell)
+            base += cell * stride
+            fractions.append(position - cell)
+        thrust = 0.0
+        fuel_flow = 0.0
+        for offset, corner in self.scalar_corners:
+            weight = 1.0
+            for corner_offset, fraction in zip(corner, fractions):
+                weight *= fraction if corner_offset else 1.0 - fraction
+            thrust += weight * self.scalar_tables[base + offset]
+            fuel_flow += weight * self.scalar_tables[base + offset + 1]
+        return thrust, fuel_flow
@@ -0,0 +1,189 @@
+# Bounded-memory storage for the time series of a ramjet flight. The integrators in final_ramet_powered_flight_model
+# hand every step to a TrajectoryRecorder instead of writing into full length arrays, and the recorder decides what to
+# keep. Results come back with the same keys and column layout as run_simulation() always returned, so plotting and
+# summaries work on any mode.
+#
+# Modes:
+#   every     keep every Nth step (N = every). With a capacity, whenever the buffer fills every other stored sample is
+#             dropped and N doubles, so memory stays fixed however long the run
+#   envelope  keep the minimum and maximum of every column over buckets of N steps, stored as a min row followed by a
+#             max row so plots of the result trace the full envelope of the signal and extremes such as the maximum
+#             altitude are kept exactly. With a capacity, neighbouring buckets are merged when the buffer fills
+#   ring      keep only the most recent capacity steps, every is ignored
+# In 'every' mode the last step of a run is always kept as well, whatever the stride.
+
+import numpy as np
+
+# Columns of a recorded row, the keys results() returns them under and how many columns each one spans
+channels = (("time_values", 1), ("acceleration_values", 2), ("velocity_values", 2), ("position_values", 2),
+            ("thrust_values", 1), ("delta_mass_values", 1))
+row_width = sum(width for name, width in channels)
+recorder_modes = ("every", "envelope", "ring")
+
+
+class TrajectoryRecorder:
+    """
+    Stores recorded flight steps in a fixed or growing buffer according to mode
+    :param mode:        str :: one of recorder_modes
+    :param every:       int, optional :: steps between kept samples ('every') or steps per bucket ('envelope')
+    :param capacity:    int, optional :: most rows held at once, required for 'ring', unbounded growth if None
+    :param expected_steps: int, optional :: number of steps the run will take, used to size the buffer up front
+    """
+
+    def __init__(self, mode="every", every=1, capacity=None, expected_steps=None):
+        if mode not in recorder_modes:
+            raise ValueError(f"Unknown recorder mode '{mode}', expected one of {recorder_modes}")
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        if mode == "ring" and capacity is None:
+            raise ValueError("A ring recorder needs a capacity")
+        if capacity is not None and capacity < (2 if mode == "every" else 4 if mode == "envelope" else 1):
+            raise ValueError("capacity is too small for the recorder mode")
+        if mode != "ring" and capacity is not None and capacity % 2:
+            capacity -= 1  # compaction halves the buffer, and envelope rows come in min/max pairs
+
+        self.mode = mode
+        self.every = every
+        self.capacity = capacity
+        if capacity is not None:
+            size = capacity
+        elif expected_steps is not None:
+            size = max(1, -(-expected_steps // every) * (2 if mode == "envelope" else 1))
+        else:
+            size = 1024
+        self.buffer = np.zeros((size, row_width))
+        self.stored = 0  # rows in use (for 'ring', rows written in total)
+        self.steps = 0  # steps seen
+        self.last_row = None
+        self.last_stored_step = -1
+        self.bucket_min = None
+        self.bucket_max = None
+
+    def record(self, row):
+        """
+        Takes one step of the flight
+        :param row: sequence(row_width) :: time, the acceleration, velocity and position components, thrust and
+                    delta_mass of the step, in the order of channels
+        """
+        step = self.steps
+        self.steps += 1
+        self.last_row = row
+        if self.mode == "every":
+            if step % self.every == 0:
+                self.store(row)
+                self.last_stored_step = step
+        elif self.mode == "envelope":
+            row = np.asarray(row, dtype=float)
+            if self.bucket_min is None:
+                self.bucket_min = row.copy()
+                self.bucket_max = row.copy()
+            else:
+                np.minimum(self.bucket_min, row, out=self.bucket_min)
+                np.maximum(self.bucket_max, row, out=self.bucket_max)
+            if self.steps % self.every == 0:
+                self.flush_bucket()
+        else:
+            self.buffer[self.stored % self.capacity] = row
+            self.stored += 1
+
+    def store(self, row):
+        if self.stored == len(self.buffer):
+            if self.capacity is None:
+                self.buffer = np.concatenate([self.buffer, np.zeros_like(self.buffer)])
+            else:
+                self.compact()
+        self.buffer[self.stored] = row
+        self.stored += 1
+
+    def compact(self):
+        # Halve the rows held and double the steps each row stands for
+        if self.mode == "every":
+            kept = self.buffer[0:self.stored:2]
+            self.stored = len(kept)
+            self.buffer[:self.stored] = kept
+        else:
+            minima = self.buffer[0:self.stored:2]
+            maxima = self.buffer[1:self.stored:2]
+            pairs = self.stored // 4
+            merged_min = np.minimum(minima[0:2 * pairs:2], minima[1:2 * pairs:2])
+            merged_max = np.maximum(maxima[0:2 * pairs:2], maxima[1:2 * pairs:2])
+            leftover = self.buffer[4 * pairs:self.stored].copy()
+            self.buffer[0:2 * pairs:2] = merged_min
+            self.buffer[1:2 * pairs:2] = merged_max
+            self.buffer[2 * pairs:2 * pairs + len(leftover)] = leftover
+            self.stored = 2 * pairs + len(leftover)
+        self.every *= 2
+
+    def flush_bucket(self):
+        if self.bucket_min is None:
+            return
+        self.store(self.bucket_min)
+        self.store(self.bucket_max)
+        self.bucket_min = None
+        self.bucket_max = None
+
+    def rows(self):
+        """
+        Returns the recorded rows in time order
+        :return: NumPy array(n, row_width) :: one row per kept sample
+        """
+        if self.mode == "ring":
+            if self.stored <= self.capacity:
+                return self.buffer[:self.stored]
+            start = self.stored % self.capacity
+            return np.concatenate([self.buffer[start:], self.buffer[:start]])
+        if self.mode == "envelope":
+            self.flush_bucket()
+            return self.buffer[:self.stored]
+        if self.last_row is not None and self.last_stored_step != self.steps - 1:
+            return np.vstack([self.buffer[:self.stored], self.last_row])
+        return self.buffer[:self.stored]
+
+    def results(self):
+        """
+        Returns the recorded time series under the keys run_simulation() uses
+        :return: dict :: time_values(n), acceleration_values(n, 2), velocity_values(n, 2), position_values(n, 2),
+                 thrust_values(n, 1) and delta_mass_values(n, 1)
+        """
+        rows = self.rows()
+        results = {}
+        column = 0
+        for name, width in channels:
+            results[name] = rows[:, column] if name == "time_values" else rows[:, column:column + width]
+            column += width
+        return results
+
+    def checkpoint_arrays(self):
+        """
+        Returns the recorder's state as arrays for a SimulationCheckpoint
+        :return: dict :: arrays that from_checkpoint() rebuilds the recorder from
+        """
+        return {"recorder_mode": np.array(self.mode), "recorder_every": self.every,
+                "recorder_capacity": -1 if self.capacity is None else self.capacity,
+                "recorder_buffer": self.buffer[:len(self.buffer) if self.mode == "ring" else self.stored],
+                "recorder_size": len(self.buffer), "recorder_stored": self.stored, "recorder_steps": self.steps,
+                "recorder_last_row": np.empty(0) if self.last_row is None else np.asarray(self.last_row, float),
+                "recorder_last_stored_step": self.last_stored_step,
+                "recorder_bucket_min": np.empty(0) if self.bucket_min is None else self.bucket_min,
+                "recorder_bucket_max": np.empty(0) if self.bucket_max is None else self.bucket_max}
+
+    @classmethod
+    def from_checkpoint(cls, arrays):
+        """
+        Rebuilds a recorder from the arrays checkpoint_arrays() returned
+        :param arrays:  dict :: arrays loaded from a checkpoint
+        :return:        TrajectoryRecorder :: recorder ready to carry on recording
+        """
+        capacity = int(arrays["recorder_capacity"])
+        recorder = cls(str(arrays["recorder_mode"]), every=int(arrays["recorder_every"]),
+                       capacity=None if capacity < 0 else capacity)
+        recorder.buffer = np.zeros((int(arrays["recorder_size"]), row_width))
+        saved_rows = arrays["recorder_buffer"]
+        recorder.buffer[:len(saved_rows)] = saved_rows
+        recorder.stored = int(arrays["recorder_stored"])
+        recorder.steps = int(arrays["recorder_steps"])
+        recorder.last_row = arrays["recorder_last_row"] if arrays["recorder_last_row"].size else None
+        recorder.last_stored_step = int(arrays["recorder_last_stored_step"])
+        recorder.bucket_min = arrays["recorder_bucket_min"].copy() if arrays["recorder_bucket_min"].size else None
+        recorder.bucket_max = arrays["recorder_bucket_max"].copy() if arrays["recorder_bucket_max"].size else None
+        return recorder
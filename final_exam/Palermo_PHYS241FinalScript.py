@@ -1,5 +1,10 @@
 # Riley_Palermo_PHYS241FinalScript.py
+import argparse
+import csv
+import glob
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import matplotlib.pyplot as plt
@@ -30,8 +35,88 @@ def parse_file_name(filename):
     return chemical_symbol, crystal_symmetry_symbol, density_functional_exchange_acronym
 
 
+# Ending of the energy-volume data files, named <element>.<symmetry>.<functional>.volumes_energies.dat
+data_file_ending = ".volumes_energies.dat"
+# Fewest data points an equation of state fit takes, one per parameter (curve_fit raises a TypeError on fewer)
+minimum_data_points = 4
+# Columns of the table written by batch mode
+eos_table_columns = ["file", "element", "symmetry", "functional", "eos", "E0 (eV/atom)", "K0 (GPa)", "K0'",
+                     "V0 (Angstrom^3/atom)", "error"]
+
+
+# Function to split a data file name into its chemical symbol, crystal symmetry and approximation acronym. Unlike
+# parse_file_name(), which exits, it raises a ValueError for a name that is not
+# <element>.<symmetry>.<functional>.volumes_energies.dat
+def parse_data_file_name(file_name):
+    fields = file_name[:-len(data_file_ending)].split('.') if file_name.endswith(data_file_ending) else []
+    if len(fields) != 3 or not all(fields):
+        raise ValueError(f"File name is not <element>.<symmetry>.<functional>{data_file_ending}")
+    return tuple(fields)
+
+
+# Function to fit an equation of state to one data file and return its parameters in eV, GPa and Angstrom^3. A file
+# that is badly named or cannot be read or fit gets NaN parameters and the reason in "error", so one bad file does not
+# stop a batch
+def fit_data_file(file_path, eos='vinet'):
+    file_name = os.path.basename(file_path)
+    row = {"file": file_name, "element": "", "symmetry": "", "functional": "", "eos": eos, "error": ""}
+    try:
+        row["element"], row["symmetry"], row["functional"] = parse_data_file_name(file_name)
+        data = read_two_columns_text(file_path)
+        if data.ndim != 2 or data.shape[1] < minimum_data_points:
+            raise ValueError(f"{data.size // 2} data points, an equation of state fit needs at least "
+                             f"{minimum_data_points}")
+        quadratic_coefficients = calculate_quadratic_fit(data)
+        eos_fit, eos_parameters = fit_eos(data[0], data[1], quadratic_coefficients, eos=eos)
+    except (OSError, ValueError, RuntimeError) as error:
+        eos_parameters = [np.nan] * 4
+        row["error"] = str(error)
+
+    row["E0 (eV/atom)"] = convert_units(eos_parameters[0], 'rydberg/atom', 'eV/atom')
+    row["K0 (GPa)"] = convert_units(eos_parameters[1], 'rydberg/bohr3', 'GPa')
+    row["K0'"] = eos_parameters[2]
+    row["V0 (Angstrom^3/atom)"] = convert_units(eos_parameters[3], 'bohr3/atom', 'Angstrom3/atom')
+    return row
+
+
+# Function to fit every data file in a directory on a pool of worker processes, returning one row per file sorted
+# by file name. Every file with the data file ending is included, so badly named ones show up as error rows.
+def fit_data_directory(directory, eos='vinet', processes=None):
+    file_paths = sorted(glob.glob(os.path.join(directory, "*" + data_file_ending)))
+    if not file_paths:
+        return []
+    # A few chunks per worker keeps the pool busy without sending every file as its own task
+    chunk_size = max(1, len(file_paths) // (4 * (processes or os.cpu_count() or 1)))
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(fit_data_file, file_paths, [eos] * len(file_paths), chunksize=chunk_size))
+
+
+# Function to write the rows of a batch fit to a CSV table
+def write_eos_table(rows, file_name):
+    with open(file_name, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=eos_table_columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
 # Main function to perform the tasks
 def main():
+    parser = argparse.ArgumentParser(description="Fit and plot an equation of state, or fit a directory of data files")
+    parser.add_argument("--batch", metavar="DIRECTORY", default=None,
+                        help=f"fit every *{data_file_ending} file in DIRECTORY and write one table instead")
+    parser.add_argument("--eos", choices=['murnaghan', 'birch-murnaghan', 'vinet'], default='vinet',
+                        help="equation of state to fit in batch mode")
+    parser.add_argument("--output", default="eos_parameters.csv", help="table written in batch mode")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: all cores)")
+    arguments = parser.parse_args()
+
+    if arguments.batch is not None:
+        rows = fit_data_directory(arguments.batch, eos=arguments.eos, processes=arguments.processes)
+        write_eos_table(rows, arguments.output)
+        failed = sum(1 for row in rows if row["error"])
+        print(f"Fit {len(rows) - failed} of {len(rows)} files in {arguments.batch}, wrote {arguments.output}")
+        return
+
     # Part 1: Fit an Equation of State
     file_name = "Si.Fd-3m.GGA-PBEsol.volumes_energies.dat"
     chemical_symbol, crystal_symmetry, approximation_acronym = parse_file_name(file_name)
@@ -10,9 +10,10 @@ def calculate_quadratic_fit(data: np.ndarray) -> np.ndarray:
     """
     Fits a quadratic polynomial to the provided data and returns the coefficients.
     :param data: np.ndarray: The data points to fit the quadratic polynomial.
-    :return: np.ndarray: The coefficients of the fitted quadratic polynomial.
+    :return: np.ndarray: The coefficients of the fitted quadratic polynomial, lowest order first (c0, c1, c2) as
+        equation_of_state.fit_eos expects them.
     """
     x_values = data[0]
     y_values = data[1]
-    quadratic_coefficients = np.polyfit(x_values, y_values, 2)
+    quadratic_coefficients = np.polynomial.polynomial.polyfit(x_values, y_values, 2)
     return quadratic_coefficients
@@ -20,45 +20,109 @@ def fit_eos(volumes, energies, quadratic_coefficients, eos='vinet', number_of_po
 
     starting at volumes[0] and ending at volume[-1]
     """
-    from scipy.optimize import curve_fit
-
-    # Dictionary holding lambda functions from current module.
-    lambda_dictionary = {
-        'vinet': globals()['vinet'],
-        'murnaghan': globals()['murnaghan'],
-        'birch-murnaghan': globals()['birch_murnaghan']
-    }
-
     # Get extremes of data and calculate range
 
     minimum_volume = np.amin(volumes)
     maximum_volume = np.amax(volumes)
 
+    # Get realistic equation of state fit
+
+    initial_parameters = eos_starting_parameters(quadratic_coefficients)
+    eos_parameters, eos_covariances = fit_eos_parameters(volumes, energies, initial_parameters, eos=eos)
+    fit_curve_volumes = np.linspace(minimum_volume, maximum_volume, num=number_of_points)
+    eos_fit_curve = eos_functions[eos.lower()](fit_curve_volumes,
+                                               eos_parameters[0], eos_parameters[1], eos_parameters[2],
+                                               eos_parameters[3])
+
+    return eos_fit_curve, eos_parameters
+
+
+def eos_starting_parameters(quadratic_coefficients):
+    """
+    Returns starting values for an equation of state fit from a quadratic polynomial fit to the data
+    :param quadratic_coefficients:  list(3) :: coefficients of the quadratic polynomial, lowest order first
+    :return:                        list(4) :: starting E_0, K_0, K_0' and V_0
+    """
     # for y = c0 + c1 x + c2 x^2
     #   axis of symmetry: x = -c1 / (2 c2)
     quadratic_axis_of_symmetry = -quadratic_coefficients[1] / (2 * quadratic_coefficients[2])
     #   minimum: y = -c1^2 / (4 c2)  + c0
     quadratic_minimum = -quadratic_coefficients[1] ** 2 / (4 * quadratic_coefficients[2]) + quadratic_coefficients[0]
-    #   bulk modulus: K_0 = 2 * a / V_0 for E(V) = c2*V^2 + c1*V + E0
-    quadratic_bulk_modulus = 2. * quadratic_coefficients[2] / quadratic_axis_of_symmetry
+    #   bulk modulus: K_0 = V_0 E''(V_0) = 2 c2 V_0
+    quadratic_bulk_modulus = 2. * quadratic_coefficients[2] * quadratic_axis_of_symmetry
 
     bulk_modulus_derivative = 3.7
 
-    # Get realistic equation of state fit
+    return [quadratic_minimum, quadratic_bulk_modulus, bulk_modulus_derivative, quadratic_axis_of_symmetry]
 
-    initial_parameters = [quadratic_minimum, quadratic_bulk_modulus,
-                          bulk_modulus_derivative, quadratic_axis_of_symmetry]
 
-    eos_parameters, eos_covariances = curve_fit(lambda_dictionary[eos.lower()], volumes, energies,
-                                                p0=initial_parameters, method='lm')  # ,
+def fit_eos_parameters(volumes, energies, initial_parameters, eos='vinet'):
+    """
+    Fits one equation of state to energy-volume data from given starting values
+    :param volumes:             NumPy array(N) :: volumes (x-values) to be fit
+    :param energies:            NumPy array(N) :: energies (y-values) to be fit
+    :param initial_parameters:  list(4) :: starting E_0, K_0, K_0' and V_0, see eos_starting_parameters()
+    :param eos:                 str :: equation of state name ('murnaghan', 'birch-murnaghan', 'vinet')
+    :return:                    tuple :: NumPy array(4) of fitted E_0, K_0, K_0', V_0 and NumPy array(4, 4) of their
+                                         covariances
+    """
+    from scipy.optimize import curve_fit
+
+    return curve_fit(eos_functions[eos.lower()], volumes, energies, p0=initial_parameters, method='lm',
+                     jac=eos_jacobians[eos.lower()])  # ,
     # x_scale=[10**np.floor(np.log10(np.amin(np.abs(energies)))), 100, 1,
     #         10**np.floor(np.log10(np.amin(np.abs(volumes))))])
-    fit_curve_volumes = np.linspace(minimum_volume, maximum_volume, num=number_of_points)
-    eos_fit_curve = lambda_dictionary[eos.lower()](fit_curve_volumes,
-                                                   eos_parameters[0], eos_parameters[1], eos_parameters[2],
-                                                   eos_parameters[3])
 
-    return eos_fit_curve, eos_parameters
+
+def fit_all_eos(volumes, energies, quadratic_coefficients=None, forms=None, number_of_points=50):
+    """
+    Fits every registered equation of state from one quadratic starting guess and ranks the fits by the Akaike
+    information criterion. All forms have four parameters, so the Bayesian criterion gives the same order and the
+    ranking comes down to the residual sum of squares; both criteria are reported for comparison with other models.
+    :param volumes:                 NumPy array(N) :: volumes (x-values) to be fit
+    :param energies:                NumPy array(N) :: energies (y-values) to be fit
+    :param quadratic_coefficients:  list(3), optional :: quadratic polynomial coefficients, lowest order first, fit
+                                                         to the data here if not given
+    :param forms:                   list, optional :: equation of state names to fit, all of eos_functions if None
+    :param number_of_points:        int, optional :: number of points to evaluate each fit function on
+    :return:                        dict :: 'fits' maps each form to its 'parameters', 'covariances', 'residuals'
+                                            (data minus fit), 'residual_sum_of_squares', 'aic', 'bic' and 'fit_curve',
+                                            or to an 'error' if it did not converge; 'ranking' lists the converged
+                                            forms best first and 'fit_curve_volumes' is the grid of the fit curves
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    volumes = np.asarray(volumes, dtype=float)
+    energies = np.asarray(energies, dtype=float)
+    forms = list(eos_functions) if forms is None else [form.lower() for form in forms]
+    if quadratic_coefficients is None:
+        quadratic_coefficients = np.polynomial.polynomial.polyfit(volumes, energies, 2)
+    initial_parameters = eos_starting_parameters(quadratic_coefficients)
+    fit_curve_volumes = np.linspace(np.amin(volumes), np.amax(volumes), num=number_of_points)
+    number_of_data = len(volumes)
+
+    def fit_form(form):
+        try:
+            eos_parameters, eos_covariances = fit_eos_parameters(volumes, energies, initial_parameters, eos=form)
+        except (RuntimeError, ValueError) as error:
+            return {'error': str(error)}
+        residuals = energies - eos_functions[form](volumes, *eos_parameters)
+        residual_sum_of_squares = float(np.sum(residuals ** 2))
+        # Least-squares likelihood: n ln(RSS / n) plus the penalty for the number of parameters
+        log_likelihood_term = number_of_data * np.log(residual_sum_of_squares / number_of_data)
+        return {'parameters': eos_parameters, 'covariances': eos_covariances, 'residuals': residuals,
+                'residual_sum_of_squares': residual_sum_of_squares,
+                'aic': float(log_likelihood_term + 2 * len(eos_parameters)),
+                'bic': float(log_likelihood_term + len(eos_parameters) * np.log(number_of_data)),
+                'fit_curve': eos_functions[form](fit_curve_volumes, *eos_parameters)}
+
+    # The forms fit independently, so they run side by side on threads; each fit is too small to repay starting
+    # worker processes
+    with ThreadPoolExecutor(max_workers=len(forms)) as executor:
+        fits = dict(zip(forms, executor.map(fit_form, forms)))
+
+    ranking = sorted((form for form in forms if 'error' not in fits[form]), key=lambda form: fits[form]['aic'])
+    return {'fits': fits, 'ranking': ranking, 'fit_curve_volumes': fit_curve_volumes}
 
 
 def murnaghan(volumes, equilibrium_energy, bulk_modulus, bulk_modulus_derivative, equilibrium_volume):
@@ -87,6 +151,34 @@ def murnaghan(volumes, equilibrium_energy, bulk_modulus, bulk_modulus_derivative
                                   (volumes / (bulk_modulus_derivative * equilibrium_volume)) - (1.0 / k0pm1)))
 
 
+def murnaghan_jacobian(volumes, equilibrium_energy, bulk_modulus, bulk_modulus_derivative, equilibrium_volume):
+    """
+    Derivatives of the Murnaghan equation of state with respect to E_0, K_0, K_0' and V_0
+
+    :param volumes:                 NumPy array of volumes per atom
+
+    :param equilibrium_energy:      equilibrium energy E_0
+
+    :param bulk_modulus:            bulk modulus K_0 = ∂^E/(∂V)^2 / V_0
+
+    :param bulk_modulus_derivative: pressure derivative of bulk modulus ∂K_0/∂P
+
+    :param equilibrium_volume:      equilibrium volume V_0
+
+    :return:                        NumPy array(N, 4) of ∂E/∂E_0, ∂E/∂K_0, ∂E/∂K_0', ∂E/∂V_0 at volumes
+    """
+    k0pm1 = bulk_modulus_derivative - 1.0  # K_0' - 1
+    reduced_volumes = np.asarray(volumes, dtype=float) / equilibrium_volume
+    power_term = np.power(reduced_volumes, -k0pm1) / (bulk_modulus_derivative * k0pm1)
+    bracket = power_term + reduced_volumes / bulk_modulus_derivative - 1.0 / k0pm1
+    bracket_derivative = (-power_term * (np.log(reduced_volumes) + 1.0 / bulk_modulus_derivative + 1.0 / k0pm1) -
+                          reduced_volumes / bulk_modulus_derivative ** 2 + 1.0 / k0pm1 ** 2)
+    return np.column_stack([np.ones_like(reduced_volumes),
+                            equilibrium_volume * bracket,
+                            bulk_modulus * equilibrium_volume * bracket_derivative,
+                            bulk_modulus * (np.power(reduced_volumes, -k0pm1) - 1.0) / k0pm1])
+
+
 def birch_murnaghan(volumes, equilibrium_energy, bulk_modulus, bulk_modulus_derivative, equilibrium_volume):
     """
     Birch-Murnaghan equation of state: E(V) = E_0 + (9/16) K_0 V_0 {[ (V / V_0)^(-(2/3)) - 1 ]^3 K_0' +
@@ -111,6 +203,35 @@ def birch_murnaghan(volumes, equilibrium_energy, bulk_modulus, bulk_modulus_deri
             np.power(reduced_volume_area - 1., 2.) * (6. - 4. * reduced_volume_area))
 
 
+def birch_murnaghan_jacobian(volumes, equilibrium_energy, bulk_modulus, bulk_modulus_derivative, equilibrium_volume):
+    """
+    Derivatives of the Birch-Murnaghan equation of state with respect to E_0, K_0, K_0' and V_0
+
+    :param volumes:                 NumPy array of volumes per atom
+
+    :param equilibrium_energy:      equilibrium energy E_0
+
+    :param bulk_modulus:            bulk modulus K_0 = ∂^E/(∂V)^2 / V_0
+
+    :param bulk_modulus_derivative: pressure derivative of bulk modulus ∂K_0/∂P
+
+    :param equilibrium_volume:      equilibrium volume V_0
+
+    :return:                        NumPy array(N, 4) of ∂E/∂E_0, ∂E/∂K_0, ∂E/∂K_0', ∂E/∂V_0 at volumes
+    """
+    reduced_volume_area = np.power(np.asarray(volumes, dtype=float) / equilibrium_volume, -2. / 3.)
+    strain = reduced_volume_area - 1.
+    bracket = np.power(strain, 3.) * bulk_modulus_derivative + np.power(strain, 2.) * (6. - 4. * reduced_volume_area)
+    # d(bracket)/d(reduced_volume_area), and d(reduced_volume_area)/dV_0 = (2/3) reduced_volume_area / V_0
+    bracket_derivative = (3. * bulk_modulus_derivative * np.power(strain, 2.) +
+                          2. * strain * (6. - 4. * reduced_volume_area) - 4. * np.power(strain, 2.))
+    return np.column_stack([np.ones_like(reduced_volume_area),
+                            (9. * equilibrium_volume / 16.) * bracket,
+                            (9. * bulk_modulus * equilibrium_volume / 16.) * np.power(strain, 3.),
+                            (9. * bulk_modulus / 16.) *
+                            (bracket + (2. / 3.) * reduced_volume_area * bracket_derivative)])
+
+
 def vinet(volumes, equilibrium_energy, bulk_modulus, bulk_modulus_derivative, equilibrium_volume):
     """
     Vinet equation of state: E(V) = E_0 + (2 K_0 V_0 / (K_0' - 1)^2) *
@@ -149,6 +270,49 @@ def vinet(volumes, equilibrium_energy, bulk_modulus, bulk_modulus_derivative, eq
     return vinet_eos
 
 
+def vinet_jacobian(volumes, equilibrium_energy, bulk_modulus, bulk_modulus_derivative, equilibrium_volume):
+    """
+    Derivatives of the Vinet equation of state with respect to E_0, K_0, K_0' and V_0
+
+    :param volumes:                 NumPy array of volumes per atom
+
+    :param equilibrium_energy:      equilibrium energy E_0
+
+    :param bulk_modulus:            bulk modulus K_0 = ∂^E/(∂V)^2 / V_0
+
+    :param bulk_modulus_derivative: pressure derivative of bulk modulus ∂K_0/∂P
+
+    :param equilibrium_volume:      equilibrium volume V_0
+
+    :return:                        NumPy array(N, 4) of ∂E/∂E_0, ∂E/∂K_0, ∂E/∂K_0', ∂E/∂V_0 at volumes
+    """
+    k0pm1 = bulk_modulus_derivative - 1  # K_0' - 1
+    reduced_volume_lengths = np.cbrt(np.asarray(volumes, dtype=float) / equilibrium_volume)
+    strain = reduced_volume_lengths - 1.
+    # 5 + 3 (V / V_0)^(1/3) (K_0' - 1) - 3 K_0' = 2 + 3 (K_0' - 1) ((V / V_0)^(1/3) - 1)
+    exponential_factor = np.exp(-1.5 * k0pm1 * strain)
+    bracket = 2. - (2. + 3. * k0pm1 * strain) * exponential_factor
+    return np.column_stack([np.ones_like(reduced_volume_lengths),
+                            2. * equilibrium_volume * bracket / k0pm1 ** 2,
+                            2. * bulk_modulus * equilibrium_volume * (4.5 * strain ** 2 * exponential_factor / k0pm1 -
+                                                                      2. * bracket / k0pm1 ** 3),
+                            2. * bulk_modulus * bracket / k0pm1 ** 2 -
+                            3. * bulk_modulus * strain * reduced_volume_lengths * exponential_factor])
+
+
+# Equations of state fit_eos and fit_all_eos know, with their closed-form parameter Jacobians, so the optimizer needs
+# no finite differences
+eos_functions = {
+    'vinet': vinet,
+    'murnaghan': murnaghan,
+    'birch-murnaghan': birch_murnaghan
+}
+eos_jacobians = {
+    'vinet': vinet_jacobian,
+    'murnaghan': murnaghan_jacobian,
+    'birch-murnaghan': birch_murnaghan_jacobian
+}
+
 if __name__ == "__main__":
     # import matplotlib
     # matplotlib.use('macosx')
@@ -161,13 +325,17 @@ if __name__ == "__main__":
     test_volumes = np.array([10, 11, 12, 13, 14])
     starting_coefficients = np.polynomial.polynomial.polyfit(test_volumes, test_energies, 2)
 
-    equations_of_state = ['murnaghan', 'birch-murnaghan', 'vinet']
+    eos_fits = fit_all_eos(test_volumes, test_energies, starting_coefficients, number_of_points=fit_point_number)
+    equations_of_state = list(eos_fits['fits'])
     figures, axes = plt.subplots(nrows=len(equations_of_state))
 
     for index, eos_form in enumerate(equations_of_state):
-        eos, eos_parameters = fit_eos(test_volumes, test_energies, starting_coefficients, eos=eos_form,
-                                      number_of_points=fit_point_number)
-        axes[index].plot(np.linspace(10, 14, num=fit_point_number), eos)
+        eos_fit = eos_fits['fits'][eos_form]
+        if 'fit_curve' in eos_fit:
+            axes[index].plot(eos_fits['fit_curve_volumes'], eos_fit['fit_curve'])
         axes[index].scatter(test_volumes, test_energies)
         axes[index].text(12, -19, eos_form.title(), ha='center', va='center')
+    for rank, eos_form in enumerate(eos_fits['ranking'], start=1):
+        print(f"{rank}. {eos_form}: RSS {eos_fits['fits'][eos_form]['residual_sum_of_squares']:.4g}, "
+              f"AIC {eos_fits['fits'][eos_form]['aic']:.3f}, BIC {eos_fits['fits'][eos_form]['bic']:.3f}")
     plt.show()
@@ -0,0 +1,47 @@
+"""
+Tests of the batch mode of the final script, run with python -m pytest from inside the final_exam folder
+"""
+
+import math
+import shutil
+
+import numpy as np
+
+import Palermo_PHYS241FinalScript as final_script
+
+si_file = "Si.Fd-3m.GGA-PBEsol.volumes_energies.dat"
+
+
+def test_batch_reports_a_short_file_as_an_error_row(tmp_path):
+    shutil.copy(si_file, tmp_path / si_file)
+    short_file = "Ge.Fd-3m.GGA-PBE.volumes_energies.dat"
+    np.savetxt(tmp_path / short_file, np.loadtxt(si_file)[3:6])
+    rows = final_script.fit_data_directory(str(tmp_path), processes=2)
+    assert [row["file"] for row in rows] == [short_file, si_file]
+    short, si = rows
+    assert "at least 4" in short["error"] and math.isnan(short["K0 (GPa)"])
+    assert short["element"] == "Ge"
+    assert si["error"] == "" and 80.0 < si["K0 (GPa)"] < 110.0
+
+
+def test_batch_reports_badly_named_files_as_error_rows(tmp_path):
+    badly_named = ["Si.volumes_energies.dat", "Si.Fd-3m.GGA.PBE.volumes_energies.dat", "Si..GGA.volumes_energies.dat"]
+    for file_name in badly_named + [si_file]:
+        shutil.copy(si_file, tmp_path / file_name)
+    (tmp_path / "notes.txt").write_text("not a data file")
+    rows = {row["file"]: row for row in final_script.fit_data_directory(str(tmp_path), processes=2)}
+    assert sorted(rows) == sorted(badly_named + [si_file])
+    for file_name in badly_named:
+        assert "File name" in rows[file_name]["error"] and math.isnan(rows[file_name]["E0 (eV/atom)"])
+    assert rows[si_file]["error"] == ""
+    assert (rows[si_file]["element"], rows[si_file]["symmetry"], rows[si_file]["functional"]) == \
+        ("Si", "Fd-3m", "GGA-PBEsol")
+
+
+def test_batch_table_has_one_line_per_file(tmp_path):
+    shutil.copy(si_file, tmp_path / si_file)
+    shutil.copy(si_file, tmp_path / "Si.volumes_energies.dat")
+    table = tmp_path / "table.csv"
+    final_script.write_eos_table(final_script.fit_data_directory(str(tmp_path), processes=1), str(table))
+    lines = table.read_text().splitlines()
+    assert lines[0].split(",") == final_script.eos_table_columns and len(lines) == 3
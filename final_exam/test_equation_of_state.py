@@ -0,0 +1,69 @@
+"""
+Tests of the equations of state and their fits, run with python -m pytest from inside the final_exam folder
+"""
+
+import numpy as np
+import pytest
+
+from equation_of_state import eos_functions, eos_jacobians, eos_starting_parameters, fit_all_eos, fit_eos_parameters
+
+si_file = "Si.Fd-3m.GGA-PBEsol.volumes_energies.dat"
+# Volumes (bohr^3/atom) and parameters (Ry/atom, Ry/bohr^3, unitless, bohr^3/atom) like those of the Si data file,
+# plus a softer and a stiffer material
+parameter_sets = [(-22.678, 0.0061, 4.2, 270.6), (-10.0, 0.002, 3.5, 120.0), (-50.0, 0.03, 5.5, 80.0)]
+
+
+def finite_difference_jacobian(eos, volumes, parameters):
+    """
+    Returns the central difference derivatives of an equation of state with respect to its four parameters
+    :param eos:         str :: equation of state name, a key of eos_functions
+    :param volumes:     NumPy array(N) :: volumes to evaluate at
+    :param parameters:  tuple(4) :: E_0, K_0, K_0' and V_0
+    :return:            NumPy array(N, 4) :: derivatives at volumes
+    """
+    jacobian = np.zeros((len(volumes), 4))
+    jacobian[:, 0] = 1.0
+    # E_0 only shifts the energies, so it is left out of the differences, where it would cancel most of their digits
+    parameters = (0.0,) + tuple(parameters[1:])
+    for column in range(1, 4):
+        step = 1e-6 * abs(parameters[column])
+        forward = list(parameters)
+        backward = list(parameters)
+        forward[column] += step
+        backward[column] -= step
+        jacobian[:, column] = (eos_functions[eos](volumes, *forward) - eos_functions[eos](volumes, *backward)) / \
+            (2 * step)
+    return jacobian
+
+
+@pytest.mark.parametrize("eos", list(eos_functions))
+@pytest.mark.parametrize("parameters", parameter_sets)
+def test_jacobian_matches_finite_differences(eos, parameters):
+    volumes = np.linspace(0.85, 1.2, 15) * parameters[3]
+    analytic = eos_jacobians[eos](volumes, *parameters)
+    numerical = finite_difference_jacobian(eos, volumes, parameters)
+    assert analytic.shape == (len(volumes), 4)
+    # Each column is compared on its own scale, the parameters differ by orders of magnitude
+    assert np.all(np.abs(analytic - numerical) <= 1e-6 * np.abs(numerical).max(axis=0))
+
+
+def test_fit_all_eos_matches_serial_fits_of_the_si_data():
+    volumes, energies = np.loadtxt(si_file).T
+    quadratic_coefficients = np.polynomial.polynomial.polyfit(volumes, energies, 2)
+    eos_fits = fit_all_eos(volumes, energies, quadratic_coefficients)
+    assert sorted(eos_fits['ranking']) == sorted(eos_functions)
+    aic = [eos_fits['fits'][eos]['aic'] for eos in eos_fits['ranking']]
+    assert aic == sorted(aic)
+    assert fit_all_eos(volumes, energies)['ranking'] == eos_fits['ranking']  # fits its own quadratic when not given
+    for eos in eos_functions:
+        serial_parameters, serial_covariances = fit_eos_parameters(volumes, energies,
+                                                                   eos_starting_parameters(quadratic_coefficients),
+                                                                   eos=eos)
+        fit = eos_fits['fits'][eos]
+        np.testing.assert_allclose(fit['parameters'], serial_parameters, rtol=1e-12)
+        np.testing.assert_allclose(fit['covariances'], serial_covariances, rtol=1e-9)
+        np.testing.assert_allclose(fit['residuals'], energies - eos_functions[eos](volumes, *serial_parameters),
+                                   atol=1e-12)
+        # Si in diamond structure: V_0 near 270 bohr^3/atom and K_0 near 0.0064 Ry/bohr^3 (about 94 GPa)
+        assert 260.0 < fit['parameters'][3] < 280.0 and 0.005 < fit['parameters'][1] < 0.008
+        assert fit['residual_sum_of_squares'] < 1e-8